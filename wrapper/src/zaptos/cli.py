@@ -1,17 +1,106 @@
 import click
-import os
+import importlib
 import json
 from .config import config
-from .client import ZaptosClient
-from .ghl import GHLClient
 
 class ContextObj:
-    def __init__(self):
+    # The API clients are built on first use, so commands that never reach
+    # the network (help, local campaign bookkeeping) skip httpx entirely.
+    # zaptosd passes in `clients`, a cache that outlives the command, so its
+    # connection pools and rate limiters stay warm between commands.
+    def __init__(self, clients=None, http2=False):
         self.config = config
-        self.client = None
-        self.ghl_client = None
+        self._client = None
+        self._ghl_client = None
+        self._clients = clients if clients is not None else {}
+        self._client_options = {'http2': True} if http2 else {}
 
-@click.group()
+    @property
+    def client(self):
+        if self._client is None and self.config.zaptos_instance and self.config.zaptos_token:
+            key = ('zaptos', self.config.zaptos_instance, self.config.zaptos_token, self.config.zaptos_rate_limit)
+            if key not in self._clients:
+                from .client import ZaptosClient
+                client = ZaptosClient(
+                    instance=self.config.zaptos_instance,
+                    token=self.config.zaptos_token,
+                    **self._client_options
+                )
+                if self.config.zaptos_rate_limit:
+                    client.set_rate_limit(self.config.zaptos_rate_limit)
+                self._clients[key] = client
+            self._client = self._clients[key]
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def ghl_client(self):
+        if self._ghl_client is None and self.config.ghl_api_key:
+            key = ('ghl', self.config.ghl_api_key, self.config.ghl_location_id, self.config.ghl_rate_limit)
+            if key not in self._clients:
+                from .ghl import GHLClient
+                client = GHLClient(
+                    api_key=self.config.ghl_api_key,
+                    location_id=self.config.ghl_location_id,
+                    **self._client_options
+                )
+                if self.config.ghl_rate_limit:
+                    client.set_rate_limit(self.config.ghl_rate_limit)
+                self._clients[key] = client
+            self._ghl_client = self._clients[key]
+        return self._ghl_client
+
+    @ghl_client.setter
+    def ghl_client(self, client):
+        self._ghl_client = client
+
+class LazyGroup(click.Group):
+    """Group that imports a subcommand's module only when it is run.
+
+    `lazy_subcommands` maps each name to ("module:attribute", short help);
+    the help text lets `--help` list the commands without importing them.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_subcommands and name not in self.commands:
+            module_name, attribute = self.lazy_subcommands[name][0].split(':')
+            self.add_command(getattr(importlib.import_module(module_name), attribute), name)
+        return super().get_command(ctx, name)
+
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if not command.hidden:
+                    rows.append((name, command.get_short_help_str(limit=formatter.width)))
+            else:
+                rows.append((name, self.lazy_subcommands[name][1]))
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+@click.group(cls=LazyGroup, lazy_subcommands={
+    'analytics': ('zaptos.endpoints.analytics:analytics', 'View analytics and reports'),
+    'campaigns': ('zaptos.endpoints.campaigns:campaigns', 'Manage bulk messaging campaigns'),
+    'contacts': ('zaptos.endpoints.contacts:contacts', 'Manage contacts and GHL sync'),
+    'conversations': ('zaptos.endpoints.conversations:conversations', 'Manage conversations (inbox)'),
+    'flows': ('zaptos.endpoints.flows:flows', 'Manage chatbot flows'),
+    'messages': ('zaptos.endpoints.messages:messages', 'Manage and send messages'),
+    'outbox': ('zaptos.endpoints.outbox:outbox', 'Queue messages locally and deliver them in the background'),
+    'templates': ('zaptos.endpoints.templates:templates', 'Manage message templates'),
+    'webhooks': ('zaptos.endpoints.webhooks:webhooks', 'Manage webhooks'),
+})
 @click.option('--instance', help='Override ZAPTOS_INSTANCE')
 @click.option('--token', help='Override ZAPTOS_TOKEN')
 @click.option('--ghl-key', help='Override GHL_API_KEY')
@@ -21,7 +110,8 @@ class ContextObj:
 @click.pass_context
 def cli(ctx, instance, token, ghl_key, ghl_location, output, debug):
     """Zaptos WhatsApp API CLI Wrapper"""
-    ctx.obj = ContextObj()
+    # zaptosd starts the command with its client cache as obj
+    ctx.obj = ContextObj(**(ctx.obj or {}))
 
     # Update config from options
     if instance:
@@ -34,29 +124,6 @@ def cli(ctx, instance, token, ghl_key, ghl_location, output, debug):
         ctx.obj.config.ghl_location_id = ghl_location
     ctx.obj.config.output = output
 
-    # Initialize clients if credentials are present
-    if ctx.obj.config.zaptos_instance and ctx.obj.config.zaptos_token:
-        ctx.obj.client = ZaptosClient(
-            instance=ctx.obj.config.zaptos_instance,
-            token=ctx.obj.config.zaptos_token
-        )
-
-    if ctx.obj.config.ghl_api_key:
-        ctx.obj.ghl_client = GHLClient(
-            api_key=ctx.obj.config.ghl_api_key,
-            location_id=ctx.obj.config.ghl_location_id
-        )
-
 # Helper to format output
 def echo_output(data):
     click.echo(json.dumps(data, indent=2))
-
-from .endpoints import messages, contacts, campaigns, conversations, templates, webhooks, analytics, flows
-cli.add_command(messages.messages)
-cli.add_command(contacts.contacts)
-cli.add_command(campaigns.campaigns)
-cli.add_command(conversations.conversations)
-cli.add_command(templates.templates)
-cli.add_command(webhooks.webhooks)
-cli.add_command(analytics.analytics)
-cli.add_command(flows.flows)
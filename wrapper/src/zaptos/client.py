@@ -1,47 +1,65 @@
 import httpx
-from typing import Optional, Dict, Any, Union
-
-class ZaptosClient:
-    def __init__(self, instance: str, token: str):
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List, Union
+from .config import get_data_file
+from .ratelimit import TokenBucket
+from .transport import (
+    IDEMPOTENCY_HEADER, ResponseTimings, RetryPolicy, asend_with_retry, new_idempotency_key, send_with_retry
+)
+
+class _ZaptosBase(ABC):
+    # Payload building shared by the sync and async clients. Every send_*
+    # method returns whatever _post returns: a dict for ZaptosClient, an
+    # awaitable resolving to that dict for AsyncZaptosClient.
+    def __init__(self, instance: str, token: str, retry: Optional[RetryPolicy] = None, rate_limit: Optional[float] = None):
+        self.instance = instance
         self.base_url = f"https://api.zaptoswpp.com/{instance}"
         self.headers = {"token": token}
-        self.client = httpx.Client(
-            base_url=self.base_url,
-            headers=self.headers,
-            timeout=30.0
-        )
-
-    def _post(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
-        response = self.client.post(endpoint, json=json)
-        response.raise_for_status()
-        return response.json()
-
-    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        response = self.client.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-
-    def _delete(self, endpoint: str) -> Dict[str, Any]:
-        response = self.client.delete(endpoint)
-        response.raise_for_status()
-        return response.json()
-
-    def send_text(self, number: str, text: str) -> Dict[str, Any]:
+        self.retry = retry or RetryPolicy()
+        self.limiter: Optional[TokenBucket] = None
+        # Every request attempt's latency and status, for AdaptiveLimit
+        self.timings = ResponseTimings()
+        if rate_limit:
+            self.set_rate_limit(rate_limit)
+
+    def set_rate_limit(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        """Cap requests at `rate` per second, shared with every client of the
+        same instance on this machine, across processes. A falsy rate removes
+        the cap."""
+        if not rate:
+            self.limiter = None
+            return
+        self.limiter = TokenBucket(get_data_file('ratelimit.db'), f"zaptos:{self.instance}", rate, burst)
+
+    @staticmethod
+    def _idempotency_headers(idempotency_key: Optional[str]) -> Dict[str, str]:
+        # Every POST carries a key so a retried send can be recognised as a duplicate
+        return {IDEMPOTENCY_HEADER: idempotency_key or new_idempotency_key()}
+
+    @abstractmethod
+    def _post(self, endpoint: str, json: Dict[str, Any], idempotency_key: Optional[str] = None) -> Any:
+        ...
+
+    @abstractmethod
+    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        ...
+
+    def send_text(self, number: str, text: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         return self._post("/send-text", json={
             "number": number,
             "text": text
-        })
+        }, idempotency_key=idempotency_key)
 
-    def send_image(self, number: str, url: str, caption: Optional[str] = None) -> Dict[str, Any]:
+    def send_image(self, number: str, url: str, caption: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "url": url
         }
         if caption:
             data["caption"] = caption
-        return self._post("/send-image", json=data)
+        return self._post("/send-image", json=data, idempotency_key=idempotency_key)
 
-    def send_buttons(self, number: str, title: str, buttons: list, description: Optional[str] = None) -> Dict[str, Any]:
+    def send_buttons(self, number: str, title: str, buttons: list, description: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "title": title,
@@ -49,9 +67,9 @@ class ZaptosClient:
         }
         if description:
             data["description"] = description
-        return self._post("/send-buttons", json=data)
+        return self._post("/send-buttons", json=data, idempotency_key=idempotency_key)
 
-    def send_list(self, number: str, title: str, sections: list, button_text: str, description: Optional[str] = None) -> Dict[str, Any]:
+    def send_list(self, number: str, title: str, sections: list, button_text: str, description: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "title": title,
@@ -60,15 +78,15 @@ class ZaptosClient:
         }
         if description:
             data["description"] = description
-        return self._post("/send-list", json=data)
+        return self._post("/send-list", json=data, idempotency_key=idempotency_key)
 
-    def send_carousel(self, number: str, cards: list) -> Dict[str, Any]:
+    def send_carousel(self, number: str, cards: list, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         return self._post("/send-carousel", json={
             "number": number,
             "cards": cards
-        })
+        }, idempotency_key=idempotency_key)
 
-    def send_location(self, number: str, latitude: str, longitude: str, address: Optional[str] = None, name: Optional[str] = None) -> Dict[str, Any]:
+    def send_location(self, number: str, latitude: str, longitude: str, address: Optional[str] = None, name: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "latitude": latitude,
@@ -78,16 +96,16 @@ class ZaptosClient:
             data["address"] = address
         if name:
             data["name"] = name
-        return self._post("/send-location", json=data)
+        return self._post("/send-location", json=data, idempotency_key=idempotency_key)
 
-    def send_contact(self, number: str, contact_name: str, contact_number: str) -> Dict[str, Any]:
+    def send_contact(self, number: str, contact_name: str, contact_number: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         return self._post("/send-contact", json={
             "number": number,
             "name": contact_name,
             "contactNumber": contact_number
-        })
+        }, idempotency_key=idempotency_key)
 
-    def send_document(self, number: str, url: str, filename: Optional[str] = None, caption: Optional[str] = None) -> Dict[str, Any]:
+    def send_document(self, number: str, url: str, filename: Optional[str] = None, caption: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "url": url
@@ -96,27 +114,118 @@ class ZaptosClient:
             data["filename"] = filename
         if caption:
             data["caption"] = caption
-        return self._post("/send-document", json=data)
+        return self._post("/send-document", json=data, idempotency_key=idempotency_key)
 
-    def send_audio(self, number: str, url: str) -> Dict[str, Any]:
+    def send_audio(self, number: str, url: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         return self._post("/send-audio", json={
             "number": number,
             "url": url
-        })
+        }, idempotency_key=idempotency_key)
 
-    def send_video(self, number: str, url: str, caption: Optional[str] = None) -> Dict[str, Any]:
+    def send_video(self, number: str, url: str, caption: Optional[str] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "number": number,
             "url": url
         }
         if caption:
             data["caption"] = caption
-        return self._post("/send-video", json=data)
+        return self._post("/send-video", json=data, idempotency_key=idempotency_key)
 
-    def send_sticker(self, number: str, url: str) -> Dict[str, Any]:
+    def send_sticker(self, number: str, url: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         return self._post("/send-sticker", json={
             "number": number,
             "url": url
-        })
+        }, idempotency_key=idempotency_key)
+
+    def check_numbers(self, numbers: List[str]) -> List[Dict[str, Any]]:
+        """Whether each number is on WhatsApp (one /chat/check call for all)."""
+        return self._post("/chat/check", json={"numbers": list(numbers)})
+
+    def instance_status(self) -> Dict[str, Any]:
+        """Connection state of the instance's WhatsApp session."""
+        return self._get("/instance/status")
 
     # Other endpoints will be added later or accessed via _get/_post
+
+
+class ZaptosClient(_ZaptosBase):
+    def __init__(self, instance: str, token: str, retry: Optional[RetryPolicy] = None, rate_limit: Optional[float] = None,
+                 http2: bool = False):
+        super().__init__(instance, token, retry, rate_limit)
+        # http2 needs the optional h2 package (pip install "zaptos[http2]")
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=30.0,
+            http2=http2
+        )
+
+    def _request(self, method: str, endpoint: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self.client.build_request(method, endpoint, **kwargs)
+        response = send_with_retry(self.client, request, self.retry, self.limiter, self.timings)
+        response.raise_for_status()
+        return response.json()
+
+    def _post(self, endpoint: str, json: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        return self._request("POST", endpoint, json=json, headers=self._idempotency_headers(idempotency_key))
+
+    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._request("GET", endpoint, params=params)
+
+    def _delete(self, endpoint: str) -> Dict[str, Any]:
+        return self._request("DELETE", endpoint)
+
+    def _put(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request("PUT", endpoint, json=json)
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __enter__(self) -> "ZaptosClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class AsyncZaptosClient(_ZaptosBase):
+    """Non-blocking variant of ZaptosClient.
+
+    Same send_* surface, but each call must be awaited, so one event loop can
+    keep many sends in flight over a single connection pool.
+    """
+
+    def __init__(self, instance: str, token: str, retry: Optional[RetryPolicy] = None, rate_limit: Optional[float] = None):
+        super().__init__(instance, token, retry, rate_limit)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=30.0
+        )
+
+    async def _request(self, method: str, endpoint: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self.client.build_request(method, endpoint, **kwargs)
+        response = await asend_with_retry(self.client, request, self.retry, self.limiter, self.timings)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post(self, endpoint: str, json: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request("POST", endpoint, json=json, headers=self._idempotency_headers(idempotency_key))
+
+    async def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._request("GET", endpoint, params=params)
+
+    async def _delete(self, endpoint: str) -> Dict[str, Any]:
+        return await self._request("DELETE", endpoint)
+
+    async def _put(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("PUT", endpoint, json=json)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncZaptosClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -1,12 +1,36 @@
 import os
+import click
 from pydantic import BaseModel, Field
 
+def get_data_file(filename: str) -> str:
+    """Path of a local state file inside the zaptos app directory."""
+    app_dir = click.get_app_dir('zaptos')
+    if not os.path.exists(app_dir):
+        os.makedirs(app_dir)
+    return os.path.join(app_dir, filename)
+
 class Config(BaseModel):
     zaptos_instance: str = Field(default_factory=lambda: os.getenv("ZAPTOS_INSTANCE", ""))
     zaptos_token: str = Field(default_factory=lambda: os.getenv("ZAPTOS_TOKEN", ""))
     ghl_api_key: str = Field(default_factory=lambda: os.getenv("GHL_API_KEY", ""))
     ghl_location_id: str = Field(default_factory=lambda: os.getenv("GHL_LOCATION_ID", ""))
 
+    # Requests per second shared by every process using the instance / GHL location (0 = no cap)
+    zaptos_rate_limit: float = Field(default_factory=lambda: float(os.getenv("ZAPTOS_RATE_LIMIT") or 0))
+    ghl_rate_limit: float = Field(default_factory=lambda: float(os.getenv("GHL_RATE_LIMIT") or 0))
+
+    # Instances campaigns spread their recipients over: "inst1:token1,inst2:token2"
+    zaptos_pool: str = Field(default_factory=lambda: os.getenv("ZAPTOS_POOL", ""))
+
+    # Seconds a /chat/check answer is trusted before the number is checked again
+    check_ttl: float = Field(default_factory=lambda: float(os.getenv("ZAPTOS_CHECK_TTL") or 7 * 24 * 3600))
+
+    # Calling code (e.g. 55) given to numbers that come without one
+    default_country: str = Field(default_factory=lambda: os.getenv("ZAPTOS_DEFAULT_COUNTRY", ""))
+
+    # Seconds a local contact index refresh stays valid before contacts list/get re-fetch
+    contact_index_ttl: float = Field(default_factory=lambda: float(os.getenv("ZAPTOS_CONTACT_TTL") or 3600))
+
     # Optional output format
     output: str = Field(default="json")
 
@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .phone import phone_key
+from .store import connect, migrate, transaction
+
+_MIGRATIONS = [
+    """
+    CREATE TABLE contacts (
+        key TEXT PRIMARY KEY,
+        number TEXT NOT NULL,
+        name TEXT,
+        ghl_id TEXT,
+        source TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE VIRTUAL TABLE contacts_fts USING fts5(name, content='contacts', content_rowid='rowid');
+    CREATE TRIGGER contacts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts (rowid, name) VALUES (new.rowid, new.name);
+    END;
+    CREATE TRIGGER contacts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    END;
+    CREATE TRIGGER contacts_au AFTER UPDATE OF name ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+        INSERT INTO contacts_fts (rowid, name) VALUES (new.rowid, new.name);
+    END;
+    CREATE TABLE refreshes (
+        source TEXT PRIMARY KEY,
+        refreshed_at REAL NOT NULL
+    );
+    """,
+]
+
+_COLUMNS = "number, name, ghl_id, source, updated_at"
+
+
+def zaptos_contact(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Index row for an item of GET /contacts or a /chat/details response."""
+    number = item.get("number") or item.get("phone") or (item.get("jid") or item.get("wa_chatid") or "").split("@")[0]
+    name = item.get("contactName") or item.get("name") or item.get("wa_contactName") or item.get("wa_name")
+    return {"number": number, "name": name}
+
+
+def _match_query(query: str) -> str:
+    # Every word as a quoted prefix, so user input never reaches FTS syntax
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in query.split())
+
+
+class ContactIndex:
+    """On-disk contact index keyed by normalized phone, with full-text search
+    on names.
+
+    Rows come from Zaptos (/contacts, /chat/details) and GHL; a later upsert
+    of the same phone fills in what it knows without erasing what it doesn't.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def upsert(self, contacts: Iterable[Dict[str, Any]], source: str) -> int:
+        """Insert or update contacts ({number, name?, ghl_id?}) in one transaction."""
+        now = time.time()
+        rows = [
+            (phone_key(c.get("number")), c["number"], c.get("name") or None, c.get("ghl_id"), source, now)
+            for c in contacts
+            if phone_key(c.get("number"))
+        ]
+        with transaction(self.conn, self._lock):
+            self.conn.executemany(
+                "INSERT INTO contacts (key, number, name, ghl_id, source, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET number = excluded.number,"
+                " name = COALESCE(excluded.name, name), ghl_id = COALESCE(excluded.ghl_id, ghl_id),"
+                " source = excluded.source, updated_at = excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def get(self, number: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(f"SELECT {_COLUMNS} FROM contacts WHERE key = ?", (phone_key(number),)).fetchone()
+        return dict(row) if row else None
+
+    def name(self, number: str) -> Optional[str]:
+        row = self.conn.execute("SELECT name FROM contacts WHERE key = ?", (phone_key(number),)).fetchone()
+        return row["name"] if row else None
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(f"SELECT {_COLUMNS} FROM contacts ORDER BY name LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Contacts whose name matches every word of `query` (as prefixes),
+        or whose phone contains its digits."""
+        digits = phone_key(query)
+        if digits and digits == query.strip().lstrip("+"):
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM contacts WHERE key LIKE ? ORDER BY name LIMIT ?", (f"%{digits}%", limit)
+            )
+        else:
+            rows = self.conn.execute(
+                f"SELECT {', '.join('c.' + c for c in _COLUMNS.split(', '))} FROM contacts_fts"
+                " JOIN contacts c ON c.rowid = contacts_fts.rowid"
+                " WHERE contacts_fts MATCH ? ORDER BY rank LIMIT ?",
+                (_match_query(query), limit),
+            )
+        return [dict(row) for row in rows]
+
+    def is_fresh(self, source: str, ttl: float) -> bool:
+        row = self.conn.execute("SELECT refreshed_at FROM refreshes WHERE source = ?", (source,)).fetchone()
+        return row is not None and time.time() - row["refreshed_at"] < ttl
+
+    def mark_refreshed(self, source: str) -> None:
+        with transaction(self.conn, self._lock):
+            self.conn.execute(
+                "INSERT INTO refreshes (source, refreshed_at) VALUES (?, ?)"
+                " ON CONFLICT (source) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+                (source, time.time()),
+            )
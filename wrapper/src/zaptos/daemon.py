@@ -0,0 +1,162 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from typing import Any, Dict, Iterator, Optional
+
+import click
+
+from .cli import cli
+from .config import Config, config
+from .frontend import _ENV_PREFIXES, socket_path
+
+
+@contextlib.contextmanager
+def _command_environment(env: Dict[str, str], cwd: Optional[str]) -> Iterator[None]:
+    """Apply a forwarded command's environment, config and working directory
+    for its duration, then put the daemon's own back."""
+    saved_env = {k: v for k, v in os.environ.items() if k.startswith(_ENV_PREFIXES)}
+    saved_config = {name: getattr(config, name) for name in Config.model_fields}
+    saved_cwd = os.getcwd()
+    for key in saved_env:
+        del os.environ[key]
+    os.environ.update({k: v for k, v in env.items() if k.startswith(_ENV_PREFIXES)})
+    try:
+        fresh = Config()
+        for name in Config.model_fields:
+            setattr(config, name, getattr(fresh, name))
+        if cwd:
+            os.chdir(cwd)
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        for key in [k for k in os.environ if k.startswith(_ENV_PREFIXES)]:
+            del os.environ[key]
+        os.environ.update(saved_env)
+        for name, value in saved_config.items():
+            setattr(config, name, value)
+
+
+@contextlib.contextmanager
+def _no_stdin() -> Iterator[None]:
+    # A forwarded command has no terminal; prompts see EOF and abort
+    saved, sys.stdin = sys.stdin, io.StringIO()
+    try:
+        yield
+    finally:
+        sys.stdin = saved
+
+
+class Daemon:
+    """Runs CLI commands in one long-lived process.
+
+    The API clients are cached across commands, keyed by their credentials,
+    so their keep-alive connection pools (HTTP/2 when h2 is installed) and
+    rate limiters stay warm. Commands run one at a time, since each swaps in
+    its own stdout, environment and working directory.
+    """
+
+    def __init__(self, http2: Optional[bool] = None):
+        self.clients: Dict[Any, Any] = {}
+        self.http2 = importlib.util.find_spec("h2") is not None if http2 is None else http2
+        self._lock = threading.Lock()
+
+    def run_command(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self._lock, _command_environment(request.get("env", {}), request.get("cwd")), \
+                contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr), _no_stdin():
+            try:
+                result = cli.main(
+                    list(request["argv"]), prog_name="zaptos", standalone_mode=False,
+                    obj={"clients": self.clients, "http2": self.http2},
+                )
+                exit_code = result if isinstance(result, int) else 0
+            except click.ClickException as e:
+                e.show()
+                exit_code = e.exit_code
+            except click.Abort:
+                click.echo("Aborted!", err=True)
+                exit_code = 1
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+        return {"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def close(self) -> None:
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.daemon.run_command(json.loads(line))
+        except (ValueError, KeyError) as e:
+            response = {"exit_code": 2, "stdout": "", "stderr": f"Bad request: {e}\n"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, daemon: Daemon):
+        self.path = path
+        self.daemon = daemon
+        _remove_stale_socket(path)
+        super().__init__(path, _Handler)
+        # Commands run with the daemon owner's credentials; keep others out
+        os.chmod(path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+def _remove_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise click.ClickException(f"zaptosd is already listening on {path}")
+
+
+@click.command()
+@click.option('--socket', 'path', help='Unix socket to listen on [default: ZAPTOS_SOCKET, else zaptosd.sock in the app dir]')
+@click.option('--http2/--no-http2', default=None, help='Use HTTP/2 [default: when the h2 package is installed]')
+def main(path, http2):
+    """Keep API connections warm for the zaptos CLI
+
+    While this runs, `zaptos` hands its commands to it over a Unix socket
+    instead of starting cold; long-running commands (campaigns start,
+    outbox drain, ...) still run in the caller's process.
+    """
+    path = path or socket_path()
+    daemon = Daemon(http2)
+    server = DaemonServer(path, daemon)
+    click.echo(f"zaptosd listening on {path}{' (HTTP/2)' if daemon.http2 else ''}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
@@ -1,30 +1,201 @@
 import click
-import json
-import csv
+import threading
 import time
 import uuid
 import os
 from datetime import datetime
 from ..cli import echo_output
-from ..config import config
-
-def get_campaigns_file():
-    app_dir = click.get_app_dir('zaptos')
-    if not os.path.exists(app_dir):
-        os.makedirs(app_dir)
-    return os.path.join(app_dir, 'campaigns.json')
-
-def load_campaigns():
-    filepath = get_campaigns_file()
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_campaigns(data):
-    filepath = get_campaigns_file()
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+from ..config import config, get_data_file
+from ..engine import AdaptiveLimit, SendEngine
+from ..phone import PhoneNormalizer
+from ..scheduler import FairQueue, StreamError
+from ..recipients import Projection, iter_csv_projected
+from ..sources import count_csv_rows, prefetch
+from ..spool import SpoolReader, SpoolWriter, index_path
+from ..store import CampaignStore, FOLDER_DONE_STATUSES, Watermark, idempotency_key, message_id_of
+from ..templating import TemplateError, compile_template
+from .contacts import get_contact_index
+
+# Numbers per /chat/check request
+CHECK_CHUNK_SIZE = 500
+NOT_ON_WHATSAPP = "Number is not on WhatsApp"
+# Longest a running campaign goes without re-reading its status (pause/cancel)
+STATUS_TICK = 1.0
+# Returned by CampaignRun.send for jobs dropped because the campaign stopped
+SKIPPED = object()
+
+class SourceError(Exception):
+    """Reading the campaign's recipients (CSV, GHL or spool) failed; the
+    original error is the cause."""
+
+def get_campaigns_db():
+    return get_data_file('campaigns.db')
+
+def get_checks_db():
+    return get_data_file('checks.db')
+
+def get_spool_path(campaign_id):
+    return get_data_file(f'campaign-{campaign_id}.spool')
+
+def get_store():
+    filepath = get_campaigns_db()
+    is_new = not os.path.exists(filepath)
+    store = CampaignStore(filepath)
+    if is_new:
+        # Carry over campaigns from the old JSON file, if any
+        store.import_json(os.path.join(os.path.dirname(filepath), 'campaigns.json'))
+    return store
+
+# The pool (and with it httpx) and the verifier are imported where they are
+# used, so commands that stay local (list, pause, resume) start quickly
+
+def get_verifier(client, chunk_size=CHECK_CHUNK_SIZE, refresh=False):
+    from ..verify import CheckCache, NumberVerifier
+    cache = CheckCache(get_checks_db())
+    return NumberVerifier(client, cache, 0 if refresh else config.check_ttl, chunk_size)
+
+def sending_client(ctx, pool_specs):
+    """What a campaign sends through: an InstancePool when --pool (or
+    ZAPTOS_POOL) lists instances, else the instance the CLI was given.
+    Raises ValueError for a malformed pool or one with nothing connected."""
+    specs = list(pool_specs) or ([config.zaptos_pool] if config.zaptos_pool else [])
+    if not specs:
+        return ctx.obj.client
+    from ..pool import InstancePool, parse_pool
+    pool = InstancePool.from_pairs(parse_pool(specs))
+    connected = pool.refresh()
+    if not any(connected.values()):
+        pool.close()
+        raise ValueError(f"None of the pool's instances is connected: {', '.join(connected)}")
+    down = [instance for instance, up in connected.items() if not up]
+    if down:
+        click.echo(f"Instances not connected, their numbers go to the others: {', '.join(down)}", err=True)
+    return pool
+
+def is_pool(client):
+    from ..pool import InstancePool
+    return isinstance(client, InstancePool)
+
+def echo_pool_stats(client):
+    if is_pool(client):
+        for instance, stats in client.stats.items():
+            click.echo(f"{instance}: {stats['sent']} sent, {stats['failed']} failed, "
+                       f"{stats['failovers']} failovers{'' if stats['healthy'] else ' (disconnected)'}", err=True)
+
+def echo_limit_stats(limit):
+    if limit is not None:
+        click.echo(f"Concurrency ended at {limit.window} of {limit.maximum} "
+                   f"({limit.increases} increases, {limit.decreases} decreases)", err=True)
+
+def index_names():
+    """Name lookup in the local contact index, opened on first use."""
+    index = None
+
+    def name(number):
+        nonlocal index
+        if index is None:
+            index = get_contact_index()
+        return index.name(number) or ''
+
+    return name
+
+def render_message(template, contact, number, names):
+    # {{name}} falls back to firstName, then to the local contact index
+    if 'name' in template.fields and not contact.get('name'):
+        contact = dict(contact, name=contact.get('firstName') or names(number))
+    return template.render(contact)
+
+def recipient_fields(template=None):
+    """Source fields a campaign reads: the number and what the template uses."""
+    fields = ['number', 'phone']
+    if template is not None:
+        fields.extend(sorted(template.fields))
+        if 'name' in template.fields:
+            fields.append('firstName')
+    return fields
+
+def campaign_contacts(ctx, campaign, template=None):
+    """The campaign's contacts as a stream of compact recipients holding only
+    the fields it uses, and their total (0 while unknown)."""
+    projection = Projection(recipient_fields(template))
+    if campaign['source'] == 'csv':
+        # Streamed rather than loaded, so memory stays flat for any file size
+        total = count_csv_rows(campaign['source_config'])
+        return prefetch(iter_csv_projected(campaign['source_config'], projection)), total
+
+    if campaign['source'] == 'ghl':
+        ghl_client = ctx.obj.ghl_client
+        if not ghl_client:
+            raise ValueError("GHL client not initialized")
+        # Streamed page by page; the total is known once the last page is read
+        return map(projection, ghl_client.iter_contacts(query=campaign['source_config'])), 0
+
+    return [], 0
+
+def submit_to_server(client, store, campaign, jobs, checkpoint, chunk_size, options):
+    """Queue rendered messages on the server-side bulk sender (/sender/advanced)
+    in chunks, recording each folder and its recipients as they are accepted."""
+    chunk = []
+
+    def flush():
+        payload = dict(options)
+        payload["info"] = f"{campaign['name']} ({campaign['id']})"
+        payload["messages"] = [{"number": number, "type": "text", "text": text} for _, number, text, _ in chunk]
+        # Keyed by the chunk's first row, so a resubmitted chunk can be deduplicated
+        result = client._post("/sender/advanced", json=payload,
+                              idempotency_key=idempotency_key(campaign['id'], f"chunk:{chunk[0][0]}"))
+
+        advanced = None
+        for seq, _, _, _ in chunk:
+            advanced = checkpoint.complete(seq) or advanced
+        store.record_folder(
+            campaign['id'],
+            result["folder_id"],
+            [(seq, number, key) for seq, number, _, key in chunk],
+            checkpoint=advanced,
+        )
+        click.echo(f"Queued {len(chunk)} messages in folder {result['folder_id']}", err=True)
+        chunk.clear()
+
+    for _, job in jobs:
+        chunk.append(job)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+# Polls in a row a folder may be absent from /sender/listfolders before it is
+# given up on as "missing"; the server drops finished folders from the listing
+MISSING_FOLDER_POLLS = 3
+
+def poll_folders(client, store, campaign_id):
+    """Refresh the counters of this campaign's unfinished server-side folders.
+    Returns True once every folder is done: by status, by its counts reaching
+    its total, or by going missing from the listing."""
+    pending = store.pending_folders(campaign_id)
+    if not pending:
+        return True
+
+    remote = {}
+    for folder in client._get("/sender/listfolders"):
+        remote[folder.get('id') or folder.get('folder_id')] = folder
+
+    done = True
+    for folder in pending:
+        info = remote.get(folder['folder_id'])
+        if info is None:
+            if store.miss_folder(folder['folder_id']) >= MISSING_FOLDER_POLLS:
+                store.update_folder(folder['folder_id'], 'missing', folder['sent'], folder['failed'])
+            else:
+                done = False
+            continue
+        sent = info.get('log_sucess', 0)  # Sic: the API spells it "sucess"
+        failed = info.get('log_failed', 0)
+        store.update_folder(folder['folder_id'], info.get('status'), sent, failed)
+        total = info.get('log_total')
+        if info.get('status') not in FOLDER_DONE_STATUSES and not (total and sent + failed >= total):
+            done = False
+    return done
 
 @click.group()
 def campaigns():
@@ -35,7 +206,8 @@ def campaigns():
 @click.option('--name', required=True, help='Campaign name')
 @click.option('--contacts', help='CSV file with contacts (header: number,name,...)')
 @click.option('--ghl-tag', help='GHL Tag to fetch contacts from')
-@click.option('--template', required=True, help='Template name or message content')
+@click.option('--template', required=True,
+              help='Message content; {{column}} placeholders take filters, e.g. {{firstName|default:"there"|title}}')
 @click.pass_context
 def create(ctx, name, contacts, ghl_tag, template):
     """Create a new campaign"""
@@ -43,6 +215,11 @@ def create(ctx, name, contacts, ghl_tag, template):
     if not contacts and not ghl_tag:
         click.echo("Error: Must provide --contacts or --ghl-tag", err=True)
         return
+    try:
+        compile_template(template)
+    except TemplateError as e:
+        click.echo(f"Error in template: {e}", err=True)
+        return
 
     campaign_id = str(uuid.uuid4())[:8]
     campaign = {
@@ -56,9 +233,7 @@ def create(ctx, name, contacts, ghl_tag, template):
         "stats": {"total": 0, "sent": 0, "failed": 0}
     }
 
-    data = load_campaigns()
-    data[campaign_id] = campaign
-    save_campaigns(data)
+    get_store().create_campaign(campaign)
 
     echo_output({"id": campaign_id, "status": "created", "message": f"Campaign '{name}' created."})
 
@@ -66,130 +241,595 @@ def create(ctx, name, contacts, ghl_tag, template):
 @click.option('--status', help='Filter by status')
 def list_campaigns(status):
     """List all campaigns"""
-    data = load_campaigns()
-    result = []
-    for cid, camp in data.items():
-        if status and camp.get('status') != status:
-            continue
-        result.append(camp)
-    echo_output(result)
+    echo_output(get_store().list_campaigns(status))
+
+@campaigns.command('prepare')
+@click.argument('id')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
+@click.pass_context
+def prepare(ctx, id, default_country):
+    """Resolve, normalize and render a campaign into a spool file
+
+    `start` then streams the pre-rendered messages from the memory-mapped
+    spool, with no source reads or rendering while sending.
+    """
+    store = get_store()
+    campaign = store.get_campaign(id)
+    if campaign is None:
+        click.echo(f"Error: Campaign {id} not found", err=True)
+        return
+    if campaign['status'] != 'created' or campaign['checkpoint']:
+        # Resume positions of a started campaign refer to its source rows
+        click.echo("Error: Campaign has already been started", err=True)
+        return
+
+    try:
+        template = compile_template(campaign['template'])
+        contacts, _ = campaign_contacts(ctx, campaign, template)
+        normalizer = PhoneNormalizer(default_country or config.default_country)
+        names = index_names()
+        path = get_spool_path(id)
+        with SpoolWriter(path) as spool:
+            for contact in contacts:
+                number = normalizer(contact.get('number') or contact.get('phone'))
+                if number:
+                    spool.append(number, render_message(template, contact, number, names))
+    except Exception as e:
+        click.echo(f"Error preparing campaign: {e}", err=True)
+        return
+
+    store.set_spool(id, path, spool.count)
+    echo_output({"id": id, "spool": path, "records": spool.count, "dropped": normalizer.dropped})
+
+class CampaignRun:
+    """One campaign being sent: its job stream and result bookkeeping.
+
+    Shared by `start` and `run-scheduler`. The stored status is re-read at
+    most every STATUS_TICK seconds; once it is no longer 'running' (paused or
+    cancelled) the job stream ends and jobs already queued are dropped
+    unsent, to be picked up again on resume.
+    """
+
+    def __init__(self, ctx, store, campaign, client, default_country=None, validate=False):
+        self.ctx = ctx
+        self.store = store
+        self.campaign = campaign
+        self.id = campaign['id']
+        self.client = client
+        self.validate = validate
+        # Parsed once; each recipient is then a single join
+        self.template = compile_template(campaign['template'])
+        self.normalizer = PhoneNormalizer(default_country or config.default_country)
+        self.names = index_names()
+        # Rows below the checkpoint were all resolved by an earlier run; the
+        # failed ones among them are tried again
+        self.checkpoint = Watermark(campaign['checkpoint'])
+        self.resume_from = campaign['checkpoint']
+        self.retry = store.failed_seqs(self.id, self.resume_from, except_error=NOT_ON_WHATSAPP)
+        self.spool = None
+        self.contacts = None
+        self.status = 'running'
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.finished = 0
+        self.exhausted = False
+
+    def open(self):
+        """Open the source and record the total. Raises ValueError for setup
+        problems and the source's own errors otherwise."""
+        if self.campaign['spool']:
+            self.spool = SpoolReader(self.campaign['spool'])
+            total = len(self.spool)
+        else:
+            self.contacts, total = campaign_contacts(self.ctx, self.campaign, self.template)
+        self.store.set_total(self.id, total)
+
+    def close(self):
+        if self.spool is not None:
+            self.spool.close()
+
+    def active(self, refresh=False):
+        now = time.monotonic()
+        if refresh or now - self._checked_at >= STATUS_TICK:
+            campaign = self.store.get_campaign(self.id)
+            self.status = campaign['status'] if campaign else 'deleted'
+            self._checked_at = now
+        return self.status == 'running'
+
+    def drained(self):
+        """Every job handed out so far has come back."""
+        with self._lock:
+            return self.finished == self.dispatched
+
+    def _skip(self, seq):
+        advanced = self.checkpoint.complete(seq)
+        if advanced is not None:
+            self.store.set_checkpoint(self.id, advanced)
+
+    def _spool_jobs(self):
+        # Pre-rendered by `prepare`: nothing to parse, fetch or render here
+        for seq in sorted(self.retry):
+            number, msg_text = self.spool[seq]
+            yield number, (seq, number, msg_text, idempotency_key(self.id, number))
+        for seq, number, msg_text in self.spool.iter_from(self.resume_from):
+            if self.store.recipient_status(self.id, number) in ('sent', 'queued'):
+                self._skip(seq)
+                continue
+            yield number, (seq, number, msg_text, idempotency_key(self.id, number))
+
+    def _source_jobs(self):
+        seq = -1
+        for seq, contact in enumerate(self.contacts):
+            if seq < self.resume_from and seq not in self.retry:
+                continue
+
+            # E.164 digits; malformed numbers and repeats are dropped here
+            number = self.normalizer(contact.get('number') or contact.get('phone'))
+            if not number:
+                self._skip(seq)
+                continue
+
+            # Sent or queued by an earlier run that stopped before the checkpoint caught up
+            if self.store.recipient_status(self.id, number) in ('sent', 'queued'):
+                self._skip(seq)
+                continue
+
+            msg_text = render_message(self.template, contact, number, self.names)
+            yield number, (seq, number, msg_text, idempotency_key(self.id, number))
+
+        if self.campaign['source'] == 'ghl':
+            self.store.set_total(self.id, seq + 1)
+        dropped = {reason: n for reason, n in self.normalizer.dropped.items() if n}
+        if dropped:
+            click.echo(f"Dropped numbers: {dropped}", err=True)
+
+    def _validated(self, jobs):
+        # Runs ahead of the sender on prefetch's thread, a chunk at a time
+        from ..verify import chunked
+        verifier = get_verifier(self.client)
+        for chunk in chunked(jobs, CHECK_CHUNK_SIZE):
+            try:
+                verdicts = verifier.check([number for number, _ in chunk])
+            except Exception as e:
+                click.echo(f"Could not validate numbers, sending anyway: {e}", err=True)
+                verdicts = {}
+            for number, job in chunk:
+                if verdicts.get(number) is False:
+                    seq = job[0]
+                    self.store.record_result(self.id, number, 'failed', NOT_ON_WHATSAPP, seq=seq,
+                                             checkpoint=self.checkpoint.complete(seq))
+                else:
+                    yield number, job
+
+    def jobs(self):
+        """(number, job) pairs until the source ends or the campaign stops running."""
+        pipeline = self._spool_jobs() if self.spool is not None else self._source_jobs()
+        if self.validate:
+            pipeline = prefetch(self._validated(pipeline), size=CHECK_CHUNK_SIZE)
+        try:
+            while True:
+                try:
+                    item = next(pipeline)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    raise SourceError(str(e)) from e
+                if not self.active():
+                    return
+                with self._lock:
+                    self.dispatched += 1
+                yield item
+            self.exhausted = True
+        finally:
+            # Stops prefetch's reader before the source is closed
+            pipeline.close()
+
+    def send(self, job):
+        if not self.active():
+            return SKIPPED
+        seq, number, msg_text, key = job
+        # Recorded before sending: a crash leaves the recipient pending, not lost
+        self.store.record_result(self.id, number, 'pending', seq=seq, idempotency_key=key)
+        return self.client.send_text(number, msg_text, idempotency_key=key)
+
+    # Called from the engine's worker threads; the store serializes writes.
+    # A failed recipient is resolved too: the ledger has it as 'failed' and a
+    # restart retries it from there, so it does not hold the checkpoint back
+    def on_result(self, job, result, error):
+        seq, number = job[0], job[1]
+        try:
+            if result is SKIPPED:
+                return
+            advanced = self.checkpoint.complete(seq)
+            if error is None:
+                self.store.record_result(self.id, number, 'sent', message_id=message_id_of(result), checkpoint=advanced)
+                click.echo(f"Sent to {number}", err=True)
+            else:
+                self.store.record_result(self.id, number, 'failed', str(error), checkpoint=advanced)
+                click.echo(f"Failed to send to {number}: {error}", err=True)
+        finally:
+            with self._lock:
+                self.finished += 1
 
 @campaigns.command('start')
 @click.argument('id')
+@click.option('--workers', default=4, show_default=True, help='Concurrent senders')
+@click.option('--rate', type=float, help='Messages per second for the instance, shared across processes '
+                                       '[default: ZAPTOS_RATE_LIMIT, else 0.5; 0 = unthrottled]')
+@click.option('--engine', 'engine_name', type=click.Choice(['local', 'server']), default='local', show_default=True,
+              help='Send from this process, or queue everything on the server-side bulk sender')
+@click.option('--pool', 'pool_specs', multiple=True, metavar='INSTANCE:TOKEN',
+              help='Spread recipients over several instances (repeatable or comma-separated) '
+                   '[default: ZAPTOS_POOL]; --workers and --rate then apply per instance')
+@click.option('--adaptive', is_flag=True,
+              help='Keep between 1 and --workers sends in flight, growing while responses stay fast '
+                   'and halving on 429/5xx or latency spikes')
+@click.option('--detach', is_flag=True, help='Leave the sending to `campaigns run-scheduler` and return at once')
+@click.option('--weight', type=float, help='Share of the instance relative to other scheduled campaigns [default: 1]')
+@click.option('--chunk-size', default=500, show_default=True, help='Messages per /sender/advanced request (server engine)')
+@click.option('--delay-min', default=5, show_default=True, help='Minimum seconds between messages (server engine)')
+@click.option('--delay-max', default=15, show_default=True, help='Maximum seconds between messages (server engine)')
+@click.option('--scheduled-for', type=int, help='Unix ms timestamp or minutes from now (server engine)')
+@click.option('--wait/--no-wait', default=False, help='Poll until the server finishes (server engine)')
+@click.option('--poll-interval', default=10.0, show_default=True, help='Seconds between progress polls')
+@click.option('--timeout', 'wait_timeout', type=float, help='Stop waiting after this many seconds (with --wait)')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
+@click.option('--validate', 'validate_numbers', is_flag=True,
+              help='Check numbers with /chat/check (or the cache) and skip those not on WhatsApp')
 @click.pass_context
-def start(ctx, id):
-    """Start a campaign"""
-    data = load_campaigns()
-    if id not in data:
+def start(ctx, id, workers, rate, engine_name, pool_specs, adaptive, detach, weight, chunk_size, delay_min, delay_max, scheduled_for, wait,
+          poll_interval, wait_timeout, default_country, validate_numbers):
+    """Start a campaign
+
+    Blocks until the campaign is sent, paused or cancelled, unless --detach
+    hands it to `campaigns run-scheduler`.
+    """
+    store = get_store()
+    campaign = store.get_campaign(id)
+    if campaign is None:
         click.echo(f"Error: Campaign {id} not found", err=True)
         return
 
-    campaign = data[id]
-    if campaign['status'] == 'completed':
-        click.echo("Campaign already completed", err=True)
+    if campaign['status'] in ('completed', 'cancelled'):
+        click.echo(f"Campaign already {campaign['status']}", err=True)
         return
 
-    client = ctx.obj.client
+    # Sending it here too would race the scheduler over the same recipients
+    if not detach and campaign['engine'] == 'scheduler' and campaign['status'] == 'running':
+        click.echo(f"Error: Campaign {id} is running under `campaigns run-scheduler`; "
+                   f"run `zaptos campaigns pause {id}` first", err=True)
+        return
+
+    if weight is not None:
+        if weight <= 0:
+            click.echo("Error: --weight must be positive", err=True)
+            return
+        store.set_weight(id, weight)
+
+    if detach:
+        try:
+            compile_template(campaign['template'])
+        except TemplateError as e:
+            click.echo(f"Error in template: {e}", err=True)
+            return
+        store.set_engine(id, 'scheduler')
+        store.set_status(id, 'running')
+        echo_output(store.get_campaign(id))
+        return
+
+    try:
+        client = sending_client(ctx, pool_specs)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
     if not client:
         click.echo("Error: Zaptos client not initialized", err=True)
         return
+    if engine_name == 'server' and is_pool(client):
+        click.echo("Error: --pool works with the local engine only", err=True)
+        return
+
+    try:
+        run = CampaignRun(ctx, store, campaign, client, default_country, validate_numbers)
+    except TemplateError as e:
+        click.echo(f"Error in template: {e}", err=True)
+        return
 
     click.echo(f"Starting campaign {campaign['name']}...", err=True)
-    campaign['status'] = 'running'
-    save_campaigns(data)
+    store.set_status(id, 'running')
 
     # Fetch contacts
-    target_contacts = []
-    if campaign['source'] == 'csv':
+    try:
+        run.open()
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    except Exception as e:
+        click.echo(f"Error reading {'spool' if campaign['spool'] else 'CSV'}: {e}", err=True)
+        store.set_status(id, 'failed')
+        return
+
+    if run.checkpoint.value:
+        click.echo(f"Resuming from recipient {run.checkpoint.value}", err=True)
+
+    if engine_name == 'server':
+        store.set_engine(id, 'server')
+        options = {"delayMin": delay_min, "delayMax": delay_max}
+        if scheduled_for is not None:
+            options["scheduled_for"] = scheduled_for
         try:
-            with open(campaign['source_config'], 'r') as f:
-                reader = csv.DictReader(f)
-                target_contacts = list(reader)
+            submit_to_server(client, store, campaign, run.jobs(), run.checkpoint, chunk_size, options)
+        except SourceError as e:
+            click.echo(f"Error reading source: {e}", err=True)
+            store.set_status(id, 'failed')
+            return
         except Exception as e:
-            click.echo(f"Error reading CSV: {e}", err=True)
-            campaign['status'] = 'failed'
-            save_campaigns(data)
+            # Chunks accepted so far are recorded; starting again resumes after them
+            click.echo(f"Error submitting to server: {e}", err=True)
+            store.set_status(id, 'failed')
             return
+        finally:
+            run.close()
 
-    elif campaign['source'] == 'ghl':
-        ghl_client = ctx.obj.ghl_client
-        if not ghl_client:
-            click.echo("Error: GHL client not initialized", err=True)
-            return
-        target_contacts = ghl_client.get_contacts_by_tag(campaign['source_config'])
-
-    # Send messages
-    total = len(target_contacts)
-    campaign['stats']['total'] = total
-    sent = campaign['stats'].get('sent', 0)
-    failed = campaign['stats'].get('failed', 0)
-
-    # Simple loop (blocking)
-    # In a real app this might be backgrounded or resumed
-    for contact in target_contacts:
-        # Check if already processed (naive check, assumes generic run)
-        # For robustness we'd need a per-contact status in DB
-
-        number = contact.get('number') or contact.get('phone')
-        if not number:
-            continue
+        deadline = time.monotonic() + wait_timeout if wait_timeout is not None else None
+        finished = poll_folders(client, store, id)
+        while wait and not finished:
+            if deadline is not None and time.monotonic() >= deadline:
+                click.echo(f"Still sending after {wait_timeout:g}s; check on it with `campaigns status {id}`", err=True)
+                break
+            time.sleep(poll_interval)
+            finished = poll_folders(client, store, id)
+        if finished:
+            store.set_status(id, 'completed')
+        echo_output(store.get_campaign(id))
+        return
 
-        # Basic template rendering
-        msg_text = campaign['template']
-        # Replace placeholders like {{name}}
-        name = contact.get('name') or contact.get('firstName', '')
-        msg_text = msg_text.replace("{{name}}", name)
+    # Paced by the instance-wide limiter, which other processes share too
+    if rate is None:
+        rate = config.zaptos_rate_limit or 0.5
+    client.set_rate_limit(rate)
 
-        try:
-            client.send_text(number, msg_text)
-            sent += 1
-            click.echo(f"Sent to {number}", err=True)
-        except Exception as e:
-            failed += 1
-            click.echo(f"Failed to send to {number}: {e}", err=True)
+    store.set_engine(id, 'local')
+    if is_pool(client):
+        workers *= len(client)
+    limit = AdaptiveLimit(client.timings, maximum=workers) if adaptive else None
+    engine = SendEngine(workers=workers, limit=limit)
+    try:
+        engine.run(run.jobs(), run.send, run.on_result)
+    except Exception as e:
+        # Recipients sent so far stay in the ledger; fixing the source and
+        # starting again resumes from the checkpoint
+        click.echo(f"Error {'reading source' if isinstance(e, SourceError) else 'sending campaign'}: {e}", err=True)
+        store.set_status(id, 'failed')
+        return
+    finally:
+        run.close()
 
-        campaign['stats']['sent'] = sent
-        campaign['stats']['failed'] = failed
-        save_campaigns(data) # Save progress
+    if run.active(refresh=True):
+        store.set_status(id, 'completed')
+    else:
+        click.echo(f"Campaign {run.status}; stopped sending", err=True)
+    echo_limit_stats(limit)
+    echo_pool_stats(client)
+    echo_output(store.get_campaign(id))
 
-        time.sleep(2) # Rate limiting
+@campaigns.command('run-scheduler')
+@click.option('--workers', default=4, show_default=True, help='Concurrent senders shared by all campaigns')
+@click.option('--rate', type=float, help='Messages per second for the instance, shared across processes '
+                                       '[default: ZAPTOS_RATE_LIMIT, else 0.5; 0 = unthrottled]')
+@click.option('--pool', 'pool_specs', multiple=True, metavar='INSTANCE:TOKEN',
+              help='Spread recipients over several instances (repeatable or comma-separated) '
+                   '[default: ZAPTOS_POOL]; --workers and --rate then apply per instance')
+@click.option('--adaptive', is_flag=True,
+              help='Keep between 1 and --workers sends in flight, growing while responses stay fast '
+                   'and halving on 429/5xx or latency spikes')
+@click.option('--tick', default=STATUS_TICK, show_default=True, help='Seconds between checks for new, paused or cancelled campaigns')
+@click.option('--exit-when-idle', is_flag=True, help='Return once no scheduled campaign is running')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
+@click.option('--validate', 'validate_numbers', is_flag=True,
+              help='Check numbers with /chat/check (or the cache) and skip those not on WhatsApp')
+@click.pass_context
+def run_scheduler(ctx, workers, rate, pool_specs, adaptive, tick, exit_when_idle, default_country, validate_numbers):
+    """Send every detached campaign, sharing the instance fairly
 
-    campaign['status'] = 'completed'
-    save_campaigns(data)
-    echo_output(campaign)
+    Picks up running campaigns started with --detach (and resumed ones that
+    were) and interleaves them by weight within one rate budget. Campaigns
+    sent in the foreground by `campaigns start` are left to it. Pause,
+    resume and cancel take effect within one tick; a campaign whose source
+    fails is marked failed without stopping the others.
+    """
+    store = get_store()
+    try:
+        client = sending_client(ctx, pool_specs)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    if not client:
+        click.echo("Error: Zaptos client not initialized", err=True)
+        return
+
+    if rate is None:
+        rate = config.zaptos_rate_limit or 0.5
+    client.set_rate_limit(rate)
+    if is_pool(client):
+        workers *= len(client)
+
+    queue = FairQueue()
+    runs = {}
+
+    def sync():
+        scheduled = {c['id']: c for c in store.list_campaigns('running') if c['engine'] == 'scheduler'}
+        for cid, run in list(runs.items()):
+            if cid in scheduled and cid in queue:
+                queue.set_weight(cid, scheduled[cid]['weight'])
+                continue
+            # Its stream ended, or it was paused, cancelled or deleted; jobs
+            # already queued for it are skipped by send
+            queue.remove(cid)
+            if not run.drained():
+                continue
+            if cid in scheduled and run.exhausted:
+                store.set_status(cid, 'completed')
+                click.echo(f"Campaign {cid} completed", err=True)
+                del scheduled[cid]
+            run.close()
+            del runs[cid]
+        for cid, campaign in scheduled.items():
+            if cid in runs:
+                continue
+            try:
+                run = CampaignRun(ctx, store, campaign, client, default_country, validate_numbers)
+                run.open()
+            except Exception as e:
+                click.echo(f"Error starting campaign {cid}: {e}", err=True)
+                store.set_status(cid, 'failed')
+                continue
+            click.echo(f"Scheduling campaign {campaign['name']} ({cid})", err=True)
+            runs[cid] = run
+            queue.add(cid, run.jobs(), campaign['weight'])
+
+    def jobs():
+        next_sync = 0.0
+        while True:
+            if time.monotonic() >= next_sync:
+                sync()
+                next_sync = time.monotonic() + tick
+                if exit_when_idle and not runs:
+                    return
+            try:
+                item = queue.pop()
+            except StreamError as e:
+                # A broken source fails its own campaign; the others keep going
+                click.echo(f"Campaign {e.key} failed: {e.error}", err=True)
+                store.set_status(e.key, 'failed')
+                continue
+            if item is None:
+                time.sleep(max(next_sync - time.monotonic(), 0))
+                continue
+            cid, (number, job) = item
+            yield number, (runs[cid], job)
+
+    def on_result(payload, result, error):
+        run, job = payload
+        run.on_result(job, result, error)
+
+    limit = AdaptiveLimit(client.timings, maximum=workers) if adaptive else None
+    engine = SendEngine(workers=workers, queue_size=workers, limit=limit)
+    try:
+        engine.run(jobs(), lambda payload: payload[0].send(payload[1]), on_result)
+    except KeyboardInterrupt:
+        click.echo("Scheduler stopped", err=True)
+    finally:
+        for run in runs.values():
+            run.close()
+    echo_limit_stats(limit)
+    echo_pool_stats(client)
+
+@campaigns.command('resume')
+@click.argument('id')
+@click.option('--weight', type=float, help='New share of the instance relative to other scheduled campaigns')
+def resume(id, weight):
+    """Resume a paused campaign"""
+    store = get_store()
+    campaign = store.get_campaign(id)
+    if campaign is None:
+        click.echo("Campaign not found", err=True)
+        return
+    if campaign['status'] != 'paused':
+        click.echo(f"Error: Campaign is {campaign['status']}, not paused", err=True)
+        return
+    if weight is not None:
+        store.set_weight(id, weight)
+    store.set_status(id, 'running')
+    if campaign['engine'] != 'scheduler':
+        click.echo(f"Run `zaptos campaigns start {id}` to continue sending", err=True)
+    echo_output({"status": "running"})
+
+@campaigns.command('cancel')
+@click.argument('id')
+def cancel(id):
+    """Cancel a campaign; anything not yet sent is dropped"""
+    if get_store().set_status(id, 'cancelled'):
+        echo_output({"status": "cancelled"})
+    else:
+        click.echo("Campaign not found", err=True)
+
+@campaigns.command('validate')
+@click.argument('id')
+@click.option('--chunk-size', default=CHECK_CHUNK_SIZE, show_default=True, help='Numbers per /chat/check request')
+@click.option('--concurrency', default=4, show_default=True, help='Requests in flight')
+@click.option('--refresh', is_flag=True, help='Ignore cached answers')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
+@click.pass_context
+def validate(ctx, id, chunk_size, concurrency, refresh, default_country):
+    """Check which campaign numbers are on WhatsApp
+
+    Answers are cached for ZAPTOS_CHECK_TTL seconds, so `start --validate`
+    and later campaigns reuse them without calling the API again.
+    """
+    campaign = get_store().get_campaign(id)
+    if campaign is None:
+        click.echo(f"Error: Campaign {id} not found", err=True)
+        return
+
+    client = ctx.obj.client
+    if not client:
+        click.echo("Error: Zaptos client not initialized", err=True)
+        return
+
+    try:
+        contacts, _ = campaign_contacts(ctx, campaign)
+        normalizer = PhoneNormalizer(default_country or config.default_country)
+        numbers = (normalizer(c.get('number') or c.get('phone')) for c in contacts)
+        verifier = get_verifier(client, chunk_size, refresh)
+        errors = verifier.check_all((n for n in numbers if n), concurrency)
+        echo_output(dict(verifier.stats, dropped=normalizer.dropped, errors=errors))
+    except Exception as e:
+        click.echo(f"Error validating numbers: {e}", err=True)
 
 @campaigns.command('pause')
 @click.argument('id')
 def pause(id):
-    """Pause a campaign (Not fully implemented in blocking CLI)"""
-    # Since 'start' blocks, pause from another terminal would require updating the file
-    # and 'start' loop checking it.
-    data = load_campaigns()
-    if id in data:
-        data[id]['status'] = 'paused'
-        save_campaigns(data)
+    """Pause a campaign; its sender stops within a second and `resume` picks it up again"""
+    if get_store().set_status(id, 'paused'):
         echo_output({"status": "paused"})
     else:
          click.echo("Campaign not found", err=True)
 
 @campaigns.command('status')
 @click.argument('id')
-def status(id):
+@click.pass_context
+def status(ctx, id):
     """Get campaign status"""
-    data = load_campaigns()
-    if id in data:
-        echo_output(data[id])
-    else:
+    store = get_store()
+    campaign = store.get_campaign(id)
+    if not campaign:
         click.echo("Campaign not found", err=True)
+        return
+
+    # Server-side campaigns report progress through their folders
+    if campaign['engine'] == 'server' and campaign['status'] == 'running' and ctx.obj.client:
+        try:
+            if poll_folders(ctx.obj.client, store, id):
+                store.set_status(id, 'completed')
+            campaign = store.get_campaign(id)
+        except Exception as e:
+            click.echo(f"Error polling server progress: {e}", err=True)
+
+    echo_output(campaign)
 
 @campaigns.command('delete')
 @click.argument('id')
 def delete(id):
     """Delete a campaign"""
-    data = load_campaigns()
-    if id in data:
-        del data[id]
-        save_campaigns(data)
+    store = get_store()
+    campaign = store.get_campaign(id)
+    if campaign is not None and store.delete_campaign(id):
+        if campaign['spool']:
+            for path in (campaign['spool'], index_path(campaign['spool'])):
+                if os.path.exists(path):
+                    os.remove(path)
         echo_output({"status": "deleted"})
     else:
         click.echo("Campaign not found", err=True)
@@ -1,65 +1,111 @@
+import csv
+import threading
+import time
 import click
 from ..cli import echo_output
+from ..config import config, get_data_file
+from ..contactindex import ContactIndex, zaptos_contact
+from ..engine import SendEngine
+from ..phone import PhoneNormalizer, phone_key
+from ..syncstate import SyncState, content_hash
+
+# Per-contact failures listed in the sync-ghl summary; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def get_sync_db():
+    return get_data_file('sync.db')
+
+def get_sync_state():
+    return SyncState(get_sync_db())
+
+def get_contact_index_db():
+    return get_data_file('contacts.db')
+
+def get_contact_index():
+    return ContactIndex(get_contact_index_db())
 
 @click.group()
 def contacts():
     """Manage contacts and GHL sync"""
     pass
 
+# Keys of a wrapped GET /contacts answer that point at a further page
+PAGINATION_KEYS = ("hasMore", "next", "nextPage", "nextCursor", "cursor")
+
+def is_complete_listing(result, items):
+    """Whether a GET /contacts answer holds the whole address book. The API
+    documents a plain array; a wrapped answer that reports a larger total or
+    another page is partial."""
+    if isinstance(result, list):
+        return True
+    total = result.get("total")
+    if isinstance(total, int) and total > len(items):
+        return False
+    return not any(result.get(key) for key in PAGINATION_KEYS)
+
+def refresh_index(client, index):
+    """Reload the index from the Zaptos address book (GET /contacts).
+
+    A partial answer is indexed but not marked fresh, so the next lookup
+    asks again instead of hiding the missing contacts until the TTL ends.
+    """
+    result = client._get("/contacts")
+    items = result if isinstance(result, list) else result.get("contacts", [])
+    count = index.upsert((zaptos_contact(item) for item in items), 'zaptos')
+    if is_complete_listing(result, items):
+        index.mark_refreshed('zaptos')
+    else:
+        click.echo("Warning: Zaptos returned part of the address book; the index will be reloaded next time", err=True)
+    return count
+
 @contacts.command('list')
 @click.option('--limit', default=20, help='Limit results')
-@click.option('--query', help='Search query')
+@click.option('--query', help='Search by name (word prefixes) or phone digits')
+@click.option('--refresh', is_flag=True, help='Reload the local index from Zaptos first')
 @click.pass_context
-def list_contacts(ctx, limit, query):
-    """List contacts"""
+def list_contacts(ctx, limit, query, refresh):
+    """List contacts
+
+    Answered from the local contact index, which is reloaded from Zaptos
+    when --refresh is given or the last reload is older than
+    ZAPTOS_CONTACT_TTL seconds.
+    """
     client = ctx.obj.client
-    if not client:
-        click.echo("Error: Zaptos client not initialized.", err=True)
-        return
+    index = get_contact_index()
 
     try:
-        # Assuming Zaptos API endpoint for listing contacts
-        params = {"limit": limit}
-        if query:
-            params["query"] = query
-        result = client._get("/contacts", params=params)
-        echo_output(result)
+        if refresh or not index.is_fresh('zaptos', config.contact_index_ttl):
+            if not client:
+                click.echo("Error: Zaptos client not initialized.", err=True)
+                return
+            refresh_index(client, index)
+        echo_output(index.search(query, limit) if query else index.list(limit))
     except Exception as e:
         click.echo(f"Error listing contacts: {str(e)}", err=True)
 
 @contacts.command('get')
 @click.argument('number')
+@click.option('--refresh', is_flag=True, help='Fetch from Zaptos even if the contact is indexed')
 @click.pass_context
-def get_contact(ctx, number):
-    """Get contact details"""
+def get_contact(ctx, number, refresh):
+    """Get contact details
+
+    Served from the local contact index; numbers that are missing or older
+    than ZAPTOS_CONTACT_TTL seconds are fetched with /chat/details.
+    """
     client = ctx.obj.client
-    if not client:
-        click.echo("Error: Zaptos client not initialized.", err=True)
-        return
+    index = get_contact_index()
 
     try:
-        # Assuming Zaptos API endpoint for getting contact
-        # NOTE: API Spec in AGENTS.md only lists POST /contacts and GET /contacts
-        # But logically there should be a way to get a specific one, or filter by number in list.
-        # I'll try getting by number as a path param if supported or query param.
-        # For now I'll assume GET /contacts/<number> is valid or I filter the list.
-        # Let's try to fetch it specifically or filter.
-        # API spec says: GET /contacts # List contacts
-        # I'll use a filter on the list endpoint if no specific endpoint exists.
-
-        # Checking AGENTS.md again:
-        # GET  /contacts            # List contacts
-        # POST /contacts            # Create/update contact
-
-        # CLI design section says: zaptos contacts get <number>
-
-        # I will attempt GET /contacts?number=<number> or similar.
-        result = client._get(f"/contacts", params={"number": number})
-        # If result is a list, take the first one?
-        if isinstance(result, list) and len(result) > 0:
-             echo_output(result[0])
-        else:
-             echo_output(result)
+        contact = index.get(number)
+        if refresh or contact is None or time.time() - contact['updated_at'] >= config.contact_index_ttl:
+            if not client:
+                click.echo("Error: Zaptos client not initialized.", err=True)
+                return
+            details = client._post("/chat/details", json={"number": number})
+            index.upsert([dict(zaptos_contact(details), number=number)], 'zaptos')
+            contact = index.get(number)
+        echo_output(contact)
 
     except Exception as e:
         click.echo(f"Error getting contact: {str(e)}", err=True)
@@ -86,10 +132,21 @@ def create_contact(ctx, number, name):
 
 @contacts.command('sync-ghl')
 @click.option('--tag', help='Filter GHL contacts by tag')
-@click.option('--since', help='Filter by date')
+@click.option('--since', help='Only sync contacts updated after this date (overrides the saved mark for this run)')
+@click.option('--full', is_flag=True, help='Ignore the saved sync state and upsert every contact')
+@click.option('--page-size', default=100, show_default=True, type=click.IntRange(1, 100), help='Contacts per GHL page (at most 100)')
+@click.option('--concurrency', default=8, show_default=True, help='Parallel upserts into Zaptos')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
 @click.pass_context
-def sync_ghl(ctx, tag, since):
-    """Sync contacts from GoHighLevel"""
+def sync_ghl(ctx, tag, since, full, page_size, concurrency, default_country):
+    """Sync contacts from GoHighLevel
+
+    Incremental by default: contacts whose GHL dateUpdated is not newer than
+    the last fully synced one, or whose synced fields hash the same as last
+    time, are skipped. Phones are normalized to E.164 digits and duplicates
+    dropped. GHL pages are fetched ahead while `--concurrency` workers
+    upsert into Zaptos.
+    """
     client = ctx.obj.client
     ghl_client = ctx.obj.ghl_client
 
@@ -101,71 +158,166 @@ def sync_ghl(ctx, tag, since):
         return
 
     try:
-        click.echo("Fetching contacts from GHL...", err=True)
-        if tag:
-            ghl_contacts = ghl_client.get_contacts_by_tag(tag)
-        else:
-            ghl_contacts = ghl_client.get_contacts()
-
-        synced_count = 0
-        for contact in ghl_contacts:
-            # Normalize phone
-            phone = contact.get('phone')
-            name = contact.get('name') or f"{contact.get('firstName', '')} {contact.get('lastName', '')}".strip()
-
-            if phone and name:
-                 # Create in Zaptos
-                 # We can store GHL ID in metadata if Zaptos supports it, or just sync basic info
-                 try:
-                     client._post("/contacts", json={
-                         "number": phone,
-                         "name": name,
-                         # "metadata": {"ghl_id": contact.get('id')} # If supported
-                     })
-                     synced_count += 1
-                 except Exception as e:
-                     click.echo(f"Failed to sync contact {name} ({phone}): {e}", err=True)
-
-        click.echo(f"Synced {synced_count} contacts from GHL.", err=True)
-        echo_output({"synced": synced_count, "total_ghl": len(ghl_contacts)})
+        state = get_sync_state()
+        index = get_contact_index()
+        normalizer = PhoneNormalizer(default_country or config.default_country)
+        scope = f"{getattr(ghl_client, 'location_id', 'default')}:{tag or '*'}"
+        mark = since or (None if full else state.high_water(scope))
+        newest = mark
+        counts = {"synced": 0, "unchanged": 0, "failed": 0, "total_ghl": 0}
+        errors = []
+        lock = threading.Lock()
+
+        def jobs():
+            nonlocal newest
+            click.echo("Fetching contacts from GHL...", err=True)
+            # Streamed page by page, so any number of contacts fits in memory
+            for contact in ghl_client.iter_contacts(query=tag, page_size=page_size):
+                counts["total_ghl"] += 1
+                updated = contact.get('dateUpdated')
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+                if mark and updated and updated <= mark:
+                    with lock:
+                        counts["unchanged"] += 1
+                    continue
+
+                name = contact.get('name') or f"{contact.get('firstName', '')} {contact.get('lastName', '')}".strip()
+                if not name:
+                    continue
+                phone = normalizer(contact.get('phone'))
+                if not phone:
+                    continue
+
+                fields = {"number": phone, "name": name}
+                digest = content_hash(fields)
+                ghl_id = contact.get('id') or phone
+                if not full and state.is_unchanged(ghl_id, digest):
+                    with lock:
+                        counts["unchanged"] += 1
+                    continue
+                yield phone, (ghl_id, digest, fields)
+
+        def send(payload):
+            _, _, fields = payload
+            # We can store GHL ID in metadata if Zaptos supports it, or just sync basic info
+            return client._post("/contacts", json=fields)
+
+        def on_result(payload, result, error):
+            ghl_id, digest, fields = payload
+            if error is None:
+                state.record(ghl_id, digest)
+                index.upsert([dict(fields, ghl_id=ghl_id)], 'ghl')
+            with lock:
+                if error is None:
+                    counts["synced"] += 1
+                    return
+                counts["failed"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"id": ghl_id, "number": fields["number"], "error": str(error)})
+            click.echo(f"Failed to sync contact {fields['name']} ({fields['number']}): {error}", err=True)
+
+        SendEngine(workers=concurrency).run(jobs(), send, on_result)
+
+        # The mark only moves when nothing older was left behind; an explicit
+        # --since may have skipped contacts between the saved mark and it.
+        if not since and not counts["failed"] and newest and newest != mark:
+            state.set_high_water(scope, newest)
+
+        click.echo(f"Synced {counts['synced']} contacts from GHL ({counts['unchanged']} unchanged, {counts['failed']} failed).", err=True)
+        echo_output(dict(counts, dropped=normalizer.dropped, errors=errors))
 
     except Exception as e:
         click.echo(f"Error syncing contacts: {str(e)}", err=True)
 
+def read_numbers(numbers, file, normalizer):
+    """(number, name or None) pairs from arguments and a file of `number[,name]`
+    lines, normalized, with invalid numbers and repeats dropped by `normalizer`."""
+    rows = [(n, None) for n in numbers]
+    if file:
+        for row in csv.reader(file):
+            if row and phone_key(row[0]):  # skips blanks and a header line
+                rows.append((row[0], row[1].strip() if len(row) > 1 and row[1].strip() else None))
+    for number, name in rows:
+        number = normalizer(number)
+        if number:
+            yield number, name
+
 @contacts.command('push-ghl')
-@click.argument('number')
+@click.argument('numbers', nargs=-1)
+@click.option('--file', 'numbers_file', type=click.File('r'), help='File of "number[,name]" lines ("-" for stdin)')
+@click.option('--concurrency', default=8, show_default=True, help='Parallel writes into GHL')
+@click.option('--default-country', help='Calling code for numbers without one (default: ZAPTOS_DEFAULT_COUNTRY)')
 @click.pass_context
-def push_ghl(ctx, number):
-    """Push a contact to GoHighLevel"""
+def push_ghl(ctx, numbers, numbers_file, concurrency, default_country):
+    """Push contacts to GoHighLevel
+
+    GHL contacts are indexed by phone in one paginated pass, so each number
+    is updated if it already exists and created otherwise. Numbers given
+    without a name are looked up in Zaptos first.
+    """
     client = ctx.obj.client
     ghl_client = ctx.obj.ghl_client
 
     if not client or not ghl_client:
         click.echo("Error: Clients not initialized.", err=True)
         return
+    if not numbers and not numbers_file:
+        click.echo("Error: Give at least one number or --file.", err=True)
+        return
 
     try:
-        # Get contact from Zaptos
-        # Assuming we can fetch by number as per 'get' command logic
-        zaptos_contact = client._get(f"/contacts", params={"number": number})
-        # Handle list vs dict response
-        if isinstance(zaptos_contact, list):
-            if not zaptos_contact:
-                click.echo("Contact not found in Zaptos", err=True)
-                return
-            zaptos_contact = zaptos_contact[0]
+        normalizer = PhoneNormalizer(default_country or config.default_country)
+        click.echo("Indexing GHL contacts by phone...", err=True)
+        # Normalized like the numbers looked up in it, so national GHL phones match
+        index = ghl_client.phone_index(default_country=normalizer.default_country)
+        contact_index = get_contact_index()
+        counts = {"created": 0, "updated": 0, "failed": 0}
+        errors = []
+        lock = threading.Lock()
 
-        name = zaptos_contact.get('name', 'Unknown')
-        phone = zaptos_contact.get('number', number)
+        def zaptos_name(number):
+            known = contact_index.get(number)
+            if known and known['name']:
+                return known['name'], known['number']
+            zaptos_contact = client._get(f"/contacts", params={"number": number})
+            # Handle list vs dict response
+            if isinstance(zaptos_contact, list):
+                if not zaptos_contact:
+                    raise LookupError("Contact not found in Zaptos")
+                zaptos_contact = zaptos_contact[0]
+            return zaptos_contact.get('name', 'Unknown'), zaptos_contact.get('number', number)
 
-        # Create in GHL
-        ghl_data = {
-            "name": name,
-            "phone": phone
-        }
+        def send(payload):
+            number, name = payload
+            if name is None:
+                name, _ = zaptos_name(number)
+            phone = "+" + number
+            ghl_data = {"name": name, "phone": phone}
+            ghl_id = index.get(number)
+            if ghl_id:
+                ghl_client.update_contact(ghl_id, ghl_data)
+                outcome = "updated"
+            else:
+                created = ghl_client.create_contact(ghl_data)
+                ghl_id = (created.get('contact') or {}).get('id')
+                outcome = "created"
+            contact_index.upsert([{"number": phone, "name": name, "ghl_id": ghl_id}], 'ghl')
+            return outcome
 
-        result = ghl_client.create_contact(ghl_data)
-        echo_output(result)
+        def on_result(payload, result, error):
+            with lock:
+                if error is None:
+                    counts[result] += 1
+                    return
+                counts["failed"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"number": payload[0], "error": str(error)})
+            click.echo(f"Failed to push contact {payload[0]}: {error}", err=True)
+
+        jobs = ((number, (number, name)) for number, name in read_numbers(numbers, numbers_file, normalizer))
+        SendEngine(workers=concurrency).run(jobs, send, on_result)
+        echo_output(dict(counts, dropped=normalizer.dropped, errors=errors))
 
     except Exception as e:
         click.echo(f"Error pushing contact: {str(e)}", err=True)
@@ -1,13 +1,94 @@
 import click
 import json
 import os
+import threading
 from ..cli import echo_output
+from ..engine import SendEngine
 
 @click.group()
 def messages():
     """Manage and send messages"""
     pass
 
+def message_args(text, image, caption, buttons, list_msg, carousel, location, address, contact_name, contact_number,
+                 document, filename, audio, video, sticker):
+    """(kind, keyword arguments of the client's send_<kind>) for the options
+    given. Raises ValueError for missing or malformed content."""
+    options = {
+        "text": text, "image": image, "caption": caption, "buttons": buttons, "list": list_msg, "carousel": carousel,
+        "location": location, "address": address, "contact_name": contact_name, "contact_number": contact_number,
+        "document": document, "filename": filename, "audio": audio, "video": video, "sticker": sticker,
+    }
+    for name, value in options.items():
+        # send-batch jobs can carry any JSON type
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"'{name}' must be a string")
+
+    if text:
+        return "text", {"text": text}
+
+    if image:
+        return "image", {"url": image, "caption": caption}
+
+    if buttons:
+        # Parse buttons if string
+        try:
+            data = json.loads(buttons)
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON for buttons")
+
+        # If full structure provided
+        if isinstance(data, dict) and "buttons" in data and "title" in data:
+            return "buttons", {"title": data["title"], "buttons": data["buttons"], "description": data.get("description")}
+        raise ValueError("Buttons JSON must contain 'title' and 'buttons' array")
+
+    if list_msg:
+        try:
+            data = json.loads(list_msg)
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON for list")
+
+        if isinstance(data, dict) and "sections" in data and "title" in data and "buttonText" in data:
+            return "list", {"title": data["title"], "sections": data["sections"], "button_text": data["buttonText"],
+                            "description": data.get("description")}
+        raise ValueError("List JSON must contain 'title', 'sections', and 'buttonText'")
+
+    if carousel:
+        if os.path.exists(carousel):
+            with open(carousel, 'r') as f:
+                data = json.load(f)
+        else:
+            try:
+                data = json.loads(carousel)
+            except json.JSONDecodeError:
+                raise ValueError("Invalid JSON or file path for carousel")
+
+        cards = data.get("cards", data) if isinstance(data, dict) else data
+        return "carousel", {"cards": cards}
+
+    if location:
+        parts = location.split(',')
+        if len(parts) != 2:
+            raise ValueError("Location must be 'lat,long'")
+        return "location", {"latitude": parts[0].strip(), "longitude": parts[1].strip(), "address": address, "name": caption}
+
+    if contact_name and contact_number:
+        return "contact", {"contact_name": contact_name, "contact_number": contact_number}
+
+    if document:
+        return "document", {"url": document, "filename": filename, "caption": caption}
+
+    if audio:
+        return "audio", {"url": audio}
+
+    if video:
+        return "video", {"url": video, "caption": caption}
+
+    if sticker:
+        return "sticker", {"url": sticker}
+
+    raise ValueError("No message content provided. Use --text, --image, etc.")
+
 @messages.command()
 @click.argument('number')
 @click.option('--text', help='Text message content')
@@ -25,89 +106,31 @@ def messages():
 @click.option('--audio', help='Audio URL')
 @click.option('--video', help='Video URL')
 @click.option('--sticker', help='Sticker URL')
+@click.option('--async', 'queued', is_flag=True,
+              help='Queue the message in the local outbox and return its id at once; `zaptos outbox drain` sends it')
 @click.pass_context
-def send(ctx, number, text, image, caption, buttons, list_msg, carousel, location, address, contact_name, contact_number, document, filename, audio, video, sticker):
+def send(ctx, number, text, image, caption, buttons, list_msg, carousel, location, address, contact_name, contact_number,
+         document, filename, audio, video, sticker, queued):
     """Send a message to a number."""
-    client = ctx.obj.client
-    if not client:
+    # Queueing needs no HTTP client, so --async leaves it (and httpx) unloaded
+    if not queued and not ctx.obj.client:
         click.echo("Error: Zaptos client not initialized. Check credentials.", err=True)
         return
 
     try:
-        if text:
-            result = client.send_text(number, text)
-
-        elif image:
-            result = client.send_image(number, image, caption)
-
-        elif buttons:
-            # Parse buttons if string
-            try:
-                data = json.loads(buttons)
-            except json.JSONDecodeError:
-                click.echo("Error: Invalid JSON for buttons", err=True)
-                return
-
-            # If full structure provided
-            if "buttons" in data and "title" in data:
-                 result = client.send_buttons(number, data["title"], data["buttons"], data.get("description"))
-            else:
-                 click.echo("Error: Buttons JSON must contain 'title' and 'buttons' array", err=True)
-                 return
-
-        elif list_msg:
-             try:
-                data = json.loads(list_msg)
-             except json.JSONDecodeError:
-                click.echo("Error: Invalid JSON for list", err=True)
-                return
-
-             if "sections" in data and "title" in data and "buttonText" in data:
-                 result = client.send_list(number, data["title"], data["sections"], data["buttonText"], data.get("description"))
-             else:
-                 click.echo("Error: List JSON must contain 'title', 'sections', and 'buttonText'", err=True)
-                 return
-
-        elif carousel:
-            if os.path.exists(carousel):
-                with open(carousel, 'r') as f:
-                    data = json.load(f)
-            else:
-                try:
-                    data = json.loads(carousel)
-                except json.JSONDecodeError:
-                    click.echo("Error: Invalid JSON or file path for carousel", err=True)
-                    return
-
-            cards = data.get("cards", data) if isinstance(data, dict) else data
-            result = client.send_carousel(number, cards)
-
-        elif location:
-            parts = location.split(',')
-            if len(parts) != 2:
-                click.echo("Error: Location must be 'lat,long'", err=True)
-                return
-            result = client.send_location(number, parts[0].strip(), parts[1].strip(), address, name=caption)
-
-        elif contact_name and contact_number:
-            result = client.send_contact(number, contact_name, contact_number)
-
-        elif document:
-            result = client.send_document(number, document, filename, caption)
-
-        elif audio:
-            result = client.send_audio(number, audio)
-
-        elif video:
-            result = client.send_video(number, video, caption)
-
-        elif sticker:
-            result = client.send_sticker(number, sticker)
+        kind, args = message_args(text, image, caption, buttons, list_msg, carousel, location, address, contact_name,
+                                  contact_number, document, filename, audio, video, sticker)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
 
-        else:
-            click.echo("Error: No message content provided. Use --text, --image, etc.", err=True)
-            return
+    if queued:
+        from .outbox import get_outbox
+        echo_output({"id": get_outbox().enqueue(kind, number, args), "status": "pending"})
+        return
 
+    try:
+        result = getattr(ctx.obj.client, f"send_{kind}")(number, **args)
         echo_output(result)
 
     except Exception as e:
@@ -115,6 +138,79 @@ def send(ctx, number, text, image, caption, buttons, list_msg, carousel, locatio
         if ctx.obj.config.output == 'json':
              echo_output({"error": str(e)})
 
+def batch_job_args(job):
+    """message_args for one send-batch job, which uses the `send` option
+    names as keys; buttons, list and carousel may be given as JSON values."""
+    def option(key):
+        value = job.get(key)
+        return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+    return message_args(
+        option('text'), option('image'), option('caption'), option('buttons'), option('list'), option('carousel'),
+        option('location'), option('address'), option('contact_name'), option('contact_number'), option('document'),
+        option('filename'), option('audio'), option('video'), option('sticker'),
+    )
+
+@messages.command('send-batch')
+@click.argument('file', type=click.File('r'), default='-')
+@click.option('--workers', default=8, show_default=True, help='Concurrent senders')
+@click.option('--rate', type=float, help='Messages per second for the instance [default: ZAPTOS_RATE_LIMIT]')
+@click.pass_context
+def send_batch(ctx, file, workers, rate):
+    """Send messages read as NDJSON from FILE (default: stdin).
+
+    Each line is a job such as {"number": "5511999999999", "text": "Hi"},
+    with the same keys as the `send` options, plus optional "id" and
+    "idempotency_key". One NDJSON result line is written per job as it
+    completes, in completion order; "line" and "id" tie it to its job.
+    """
+    client = ctx.obj.client
+    if not client:
+        click.echo("Error: Zaptos client not initialized. Check credentials.", err=True)
+        return
+    if rate is not None:
+        client.set_rate_limit(rate)
+
+    lock = threading.Lock()
+    totals = {"sent": 0, "failed": 0}
+
+    def emit(job, result=None, error=None):
+        line = {"line": job["line"], "id": job.get("id"), "number": job.get("number")}
+        line.update({"ok": True, "result": result} if error is None else {"ok": False, "error": error})
+        with lock:
+            totals["sent" if error is None else "failed"] += 1
+            click.echo(json.dumps(line))
+
+    def jobs():
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            job = None
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("Job must be a JSON object")
+                job["line"] = line_number
+                if not job.get("number"):
+                    raise ValueError("Job has no number")
+                job["kind"], job["args"] = batch_job_args(job)
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                # A bad line gets an error result; the rest of the batch goes on
+                emit(job if isinstance(job, dict) else {"line": line_number}, error=str(e))
+                continue
+            yield str(job["number"]), job
+
+    def send_one(job):
+        return getattr(client, f"send_{job['kind']}")(
+            str(job["number"]), **job["args"], idempotency_key=job.get("idempotency_key")
+        )
+
+    def on_result(job, result, error):
+        emit(job, result, None if error is None else str(error))
+
+    SendEngine(workers=workers).run(jobs(), send_one, on_result)
+    click.echo(f"Sent {totals['sent']}, failed {totals['failed']}", err=True)
+
 @messages.command('list')
 @click.option('--contact', help='Filter by contact number')
 @click.option('--since', help='Filter messages since date')
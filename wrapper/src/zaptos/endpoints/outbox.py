@@ -0,0 +1,127 @@
+import threading
+import time
+import click
+from ..cli import echo_output
+from ..config import get_data_file
+from ..engine import SendEngine
+from ..outbox import Outbox, deliver, is_permanent, retry_delay
+
+# Returned for a message whose lease ran out while it waited in a lane
+SUPERSEDED = object()
+
+def get_outbox_db():
+    return get_data_file('outbox.db')
+
+def get_outbox():
+    return Outbox(get_outbox_db())
+
+@click.group()
+def outbox():
+    """Queue messages locally and deliver them in the background"""
+    pass
+
+@outbox.command('drain')
+@click.option('--batch', default=50, show_default=True, help='Messages claimed from the queue at a time')
+@click.option('--workers', default=4, show_default=True, help='Concurrent senders')
+@click.option('--rate', type=float, help='Messages per second for the instance [default: ZAPTOS_RATE_LIMIT]')
+@click.option('--max-attempts', default=5, show_default=True, help='Attempts before a message is marked failed')
+@click.option('--follow', is_flag=True, help='Keep waiting for new messages instead of returning once the queue is empty')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds between checks for new messages (--follow)')
+@click.pass_context
+def drain(ctx, batch, workers, rate, max_attempts, follow, poll_interval):
+    """Send every message that is due
+
+    Failures are retried with exponential backoff; 4xx answers (other than
+    408/429) fail at once. Messages whose retry is not due yet are left for
+    a later drain.
+    """
+    client = ctx.obj.client
+    if not client:
+        click.echo("Error: Zaptos client not initialized", err=True)
+        return
+    if rate is not None:
+        client.set_rate_limit(rate)
+
+    box = get_outbox()
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def jobs():
+        while True:
+            messages = box.claim(batch)
+            if not messages:
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+                continue
+            for message in messages:
+                yield message['number'], message
+
+    # A message can wait in a busy lane past its lease and be claimed again;
+    # only the latest claim sends it
+    def send(message):
+        if not box.start(message):
+            return SUPERSEDED
+        return deliver(client, message)
+
+    # Called from the engine's worker threads; the outbox serializes writes
+    def on_result(message, result, error):
+        if result is SUPERSEDED:
+            return
+        claim = message['claim']
+        if error is None:
+            box.complete(message['id'], result, claim)
+            outcome = "sent"
+        elif is_permanent(error) or message['attempts'] >= max_attempts:
+            box.fail(message['id'], str(error), claim=claim)
+            outcome = "failed"
+            click.echo(f"Failed to send {message['id']} to {message['number']}: {error}", err=True)
+        else:
+            box.fail(message['id'], str(error), time.time() + retry_delay(message['attempts']), claim)
+            outcome = "retrying"
+        with lock:
+            totals[outcome] += 1
+
+    try:
+        SendEngine(workers=workers, queue_size=batch).run(jobs(), send, on_result)
+    except KeyboardInterrupt:
+        # Claimed but unsent messages go back on the queue once their lease runs out
+        click.echo("Drain stopped", err=True)
+
+    echo_output({**totals, "pending": box.counts()["pending"]})
+
+@outbox.command('list')
+@click.option('--status', type=click.Choice(['pending', 'sending', 'sent', 'failed']), help='Filter by status')
+@click.option('--limit', default=100, show_default=True, help='Limit results')
+def list_messages(status, limit):
+    """List queued messages, oldest first"""
+    echo_output(get_outbox().list(status, limit))
+
+@outbox.command('status')
+@click.argument('id', required=False)
+def status(id):
+    """Show one queued message, or the count of messages per status"""
+    box = get_outbox()
+    if id is None:
+        echo_output(box.counts())
+        return
+    message = box.get(id)
+    if message is None:
+        click.echo("Message not found", err=True)
+        return
+    echo_output(message)
+
+@outbox.command('retry')
+@click.argument('id')
+def retry(id):
+    """Queue a failed message again"""
+    if get_outbox().retry(id):
+        echo_output({"status": "pending"})
+    else:
+        click.echo("No failed message with that id", err=True)
+
+@outbox.command('purge')
+@click.option('--older-than', default=7 * 24 * 3600.0, show_default=True, help='Seconds since a sent message was delivered')
+def purge(older_than):
+    """Delete delivered messages"""
+    echo_output({"deleted": get_outbox().purge_sent(older_than)})
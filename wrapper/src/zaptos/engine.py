@@ -0,0 +1,174 @@
+import queue
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .transport import ResponseTimings
+
+# A job is (key, payload). Jobs sharing a key always run on the same worker,
+# so they are sent in the order they were submitted.
+Job = Tuple[str, Any]
+ResultCallback = Callable[[Any, Any, Optional[BaseException]], None]
+
+_STOP = object()
+
+
+def _p95(latencies: List[float]) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class AdaptiveLimit:
+    """How many sends may be in flight, adjusted by AIMD.
+
+    Each time a window's worth of new responses has been recorded in
+    `timings`, they are judged. Any 429, 5xx or transport error, or a p95
+    latency above `spike_factor` times the baseline, cuts the window by
+    `decrease`. Otherwise the window grows by one, provided it was full.
+    The baseline is a slow moving average of p95, so a lasting change in
+    the server's speed becomes the new normal.
+    """
+
+    def __init__(self, timings: "ResponseTimings", minimum: int = 1, maximum: int = 16,
+                 initial: Optional[int] = None, decrease: float = 0.5, spike_factor: float = 2.0):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("need 1 <= minimum <= maximum")
+        self.timings = timings
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.limit = float(min(max(initial or minimum, minimum), maximum))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._cursor = timings.count
+        self._full = False
+        self._cond = threading.Condition()
+
+    @property
+    def window(self) -> int:
+        return int(self.limit)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.window:
+                self._cond.wait()
+            self.in_flight += 1
+            if self.in_flight >= self.window:
+                self._full = True
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._adjust()
+            self._cond.notify_all()
+
+    def _adjust(self) -> None:
+        if self.timings.count - self._cursor < self.window:
+            return
+        samples, self._cursor = self.timings.since(self._cursor)
+        if not samples:
+            return
+        p95 = _p95([seconds for seconds, _ in samples])
+        congested = any(status == 0 or status == 429 or status >= 500 for _, status in samples)
+        if self.baseline is None:
+            self.baseline = p95
+        elif p95 > self.spike_factor * self.baseline:
+            congested = True
+        self.baseline += 0.1 * (p95 - self.baseline)
+
+        if congested:
+            self.limit = max(float(self.minimum), self.limit * self.decrease)
+            self.decreases += 1
+        elif self._full and self.limit < self.maximum:
+            self.limit = min(float(self.maximum), self.limit + 1)
+            self.increases += 1
+        self._full = False
+
+
+class SendEngine:
+    """Bounded worker pool for sending messages.
+
+    Each worker owns a lane with a bounded queue; a job's lane is picked by
+    hashing its key (the recipient number), which keeps per-number ordering
+    while different numbers are sent concurrently. The bounded queues give
+    backpressure, so the job iterable is consumed only as fast as it is sent.
+    With an AdaptiveLimit, `workers` is the most that can be in flight and the
+    limit decides how many actually are.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 100, limit: Optional[AdaptiveLimit] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.limit = limit
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def stop(self) -> None:
+        """Stop handing out new jobs; jobs already in flight still finish."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def _lane(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def _worker(self, lane: "queue.Queue[Any]", send: Callable[[Any], Any], on_result: ResultCallback) -> None:
+        while True:
+            payload = lane.get()
+            if payload is _STOP:
+                return
+            if self._stop.is_set():
+                continue
+            if self.limit is not None:
+                self.limit.acquire()
+            try:
+                result, error = send(payload), None
+            except Exception as e:
+                result, error = None, e
+            finally:
+                if self.limit is not None:
+                    self.limit.release()
+            try:
+                on_result(payload, result, error)
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+
+    def run(self, jobs: Iterable[Job], send: Callable[[Any], Any], on_result: ResultCallback) -> None:
+        """Send every job and block until all of them are done.
+
+        `send` receives the job payload; `on_result(payload, result, error)`
+        is called from the worker threads, so it must be thread-safe.
+        """
+        lanes: List["queue.Queue[Any]"] = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        threads = [
+            threading.Thread(target=self._worker, args=(lane, send, on_result), daemon=True)
+            for lane in lanes
+        ]
+        for t in threads:
+            t.start()
+
+        try:
+            for key, payload in jobs:
+                if self._stop.is_set():
+                    break
+                lanes[self._lane(key)].put(payload)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for lane in lanes:
+                lane.put(_STOP)
+            for t in threads:
+                t.join()
+
+        if self._errors:
+            raise self._errors[0]
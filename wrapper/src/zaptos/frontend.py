@@ -0,0 +1,89 @@
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, List, Optional
+
+import click
+
+# Commands that run long or read stdin (including prompts) stay in the
+# caller's process: the daemon runs one command at a time and has no
+# terminal to read from
+DIRECT_COMMANDS = frozenset({
+    ("campaigns", "start"), ("campaigns", "run-scheduler"), ("campaigns", "prepare"), ("campaigns", "validate"),
+    ("contacts", "sync-ghl"), ("contacts", "push-ghl"),
+    ("flows", "test"),
+    ("messages", "send-batch"),
+    ("outbox", "drain"),
+})
+
+# Global options of `zaptos` that take a value
+_VALUE_OPTIONS = frozenset({"--instance", "--token", "--ghl-key", "--ghl-location", "--output"})
+# Environment forwarded with each command; the daemon's config is rebuilt from it
+_ENV_PREFIXES = ("ZAPTOS_", "GHL_")
+
+
+def socket_path() -> str:
+    return os.environ.get("ZAPTOS_SOCKET") or os.path.join(click.get_app_dir("zaptos"), "zaptosd.sock")
+
+
+def command_path(argv: List[str]) -> tuple:
+    """The (group, subcommand) names in argv, skipping global options."""
+    names = []
+    args = iter(argv)
+    for arg in args:
+        if arg in _VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            names.append(arg)
+            if len(names) == 2:
+                break
+    return tuple(names)
+
+
+def runs_direct(argv: List[str]) -> bool:
+    return command_path(argv) in DIRECT_COMMANDS
+
+
+def forward(argv: List[str], path: Optional[str] = None, timeout: float = 300.0) -> Optional[Dict[str, Any]]:
+    """Run argv on zaptosd and return its {exit_code, stdout, stderr}, or
+    None when no daemon is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": {k: v for k, v in os.environ.items() if k.startswith(_ENV_PREFIXES)},
+    }
+    with sock, sock.makefile("rwb") as stream:
+        sock.settimeout(timeout)
+        stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("zaptosd closed the connection without answering")
+    return json.loads(line)
+
+
+def main() -> None:
+    """`zaptos` entry point: hand the command to zaptosd when it is running
+    (set ZAPTOS_NO_DAEMON=1 to skip it), else run it here."""
+    argv = sys.argv[1:]
+    if not os.environ.get("ZAPTOS_NO_DAEMON") and not runs_direct(argv):
+        try:
+            response = forward(argv)
+        except (OSError, ValueError) as e:
+            # The command may already have run, so it is not retried here
+            click.echo(f"Error talking to zaptosd: {e}", err=True)
+            sys.exit(1)
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            sys.exit(response["exit_code"])
+
+    from .cli import cli
+    cli(prog_name="zaptos")
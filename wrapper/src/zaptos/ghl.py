@@ -1,9 +1,31 @@
+import asyncio
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, AsyncIterator
+from .config import get_data_file
+from .phone import normalize
+from .ratelimit import TokenBucket
+from .sources import prefetch
+from .transport import IDEMPOTENCY_HEADER, RetryPolicy, asend_with_retry, new_idempotency_key, send_with_retry
 
-class GHLClient:
-    def __init__(self, api_key: str, location_id: Optional[str] = None):
-        self.base_url = "https://rest.gohighlevel.com/v1"  # Assuming V1 for now, or check docs if available.
+GHL_BASE_URL = "https://rest.gohighlevel.com/v1"
+GHL_MAX_PAGE_SIZE = 100
+
+def _indexed_phone(contact: Dict[str, Any], default_country: Optional[str]) -> Optional[str]:
+    # The key phone_index files a contact under, or None to leave it out
+    number, _ = normalize(contact.get("phone"), default_country)
+    return number if contact.get("id") else None
+
+
+class _GHLBase:
+    # Header and parameter building shared by the sync and async GHL clients.
+    def __init__(
+        self,
+        api_key: str,
+        location_id: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        self.base_url = GHL_BASE_URL  # Assuming V1 for now, or check docs if available.
         # Actually, GHL has V2 API now (services.leadconnectorhq.com), but instructions mention "api_key" which is often V1.
         # However, for robustness, I'll stick to a generic implementation that can be adapted.
         # If the user provides an API Key, it's usually Bearer token in V2 or Authorization header in V1.
@@ -13,42 +35,126 @@ class GHLClient:
         }
         if location_id:
              self.location_id = location_id
+        self.retry = retry or RetryPolicy()
+        self.limiter: Optional[TokenBucket] = None
+        if rate_limit:
+            self.set_rate_limit(rate_limit)
+
+    def set_rate_limit(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        """Cap GHL requests at `rate` per second, shared across processes
+        with every client of the same location. A falsy rate removes the cap."""
+        if not rate:
+            self.limiter = None
+            return
+        key = f"ghl:{getattr(self, 'location_id', 'default')}"
+        self.limiter = TokenBucket(get_data_file('ratelimit.db'), key, rate, burst)
 
+    @staticmethod
+    def _idempotency_headers(idempotency_key: Optional[str]) -> Dict[str, str]:
+        return {IDEMPOTENCY_HEADER: idempotency_key or new_idempotency_key()}
+
+    def _contacts_params(self, query: Optional[str], limit: int) -> Dict[str, Any]:
+        # This is a simplified implementation. Real GHL API has specific search endpoints.
+        params: Dict[str, Any] = {"limit": limit}
+        if query:
+            params["query"] = query
+        if hasattr(self, 'location_id'):
+            params['locationId'] = self.location_id
+        return params
+
+    @staticmethod
+    def _page_size(page_size: int) -> int:
+        # GHL never returns more than GHL_MAX_PAGE_SIZE contacts per page; asking
+        # for more would make a full page look like the last one
+        return max(1, min(page_size, GHL_MAX_PAGE_SIZE))
+
+    @staticmethod
+    def _next_page_params(params: Dict[str, Any], result: Dict[str, Any], page_size: int) -> Optional[Dict[str, Any]]:
+        # GHL paginates with a cursor: the last contact's id and sort timestamp
+        contacts = result.get("contacts", [])
+        meta = result.get("meta") or {}
+        if len(contacts) < page_size or not meta.get("startAfterId"):
+            return None
+        params = dict(params, startAfterId=meta["startAfterId"])
+        if meta.get("startAfter") is not None:
+            params["startAfter"] = meta["startAfter"]
+        return params
+
+    def _with_location(self, contact_data: Dict[str, Any]) -> Dict[str, Any]:
+        if hasattr(self, 'location_id'):
+            contact_data['locationId'] = self.location_id
+        return contact_data
+
+
+class GHLClient(_GHLBase):
+    def __init__(
+        self,
+        api_key: str,
+        location_id: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit: Optional[float] = None,
+        http2: bool = False,
+    ):
+        super().__init__(api_key, location_id, retry, rate_limit)
+        # http2 needs the optional h2 package (pip install "zaptos[http2]")
         self.client = httpx.Client(
-            base_url="https://rest.gohighlevel.com/v1",
+            base_url=self.base_url,
             headers=self.headers,
-            timeout=30.0
+            timeout=30.0,
+            http2=http2
         )
 
-    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        response = self.client.get(endpoint, params=params)
+    def _request(self, method: str, endpoint: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self.client.build_request(method, endpoint, **kwargs)
+        response = send_with_retry(self.client, request, self.retry, self.limiter)
         response.raise_for_status()
         return response.json()
 
-    def _post(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
-        response = self.client.post(endpoint, json=json)
-        response.raise_for_status()
-        return response.json()
+    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._request("GET", endpoint, params=params)
+
+    def _post(self, endpoint: str, json: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        return self._request("POST", endpoint, json=json, headers=self._idempotency_headers(idempotency_key))
 
     def _put(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
-        response = self.client.put(endpoint, json=json)
-        response.raise_for_status()
-        return response.json()
+        return self._request("PUT", endpoint, json=json)
+
+    def close(self) -> None:
+        self.client.close()
 
     def get_contacts(self, query: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
-        # This is a simplified implementation. Real GHL API has specific search endpoints.
-        params = {"limit": limit}
-        if query:
-            params["query"] = query
-        if hasattr(self, 'location_id'):
-            params['locationId'] = self.location_id
+        return self._get("/contacts", params=self._contacts_params(query, limit)).get("contacts", [])
+
+    def _iter_contact_pages(self, query: Optional[str], page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        page_size = self._page_size(page_size)
+        params: Optional[Dict[str, Any]] = self._contacts_params(query, page_size)
+        while params is not None:
+            result = self._get("/contacts", params=params)
+            contacts = result.get("contacts", [])
+            if contacts:
+                yield contacts
+            params = self._next_page_params(params, result, page_size)
+
+    def iter_contacts(self, query: Optional[str] = None, page_size: int = GHL_MAX_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Every contact matching `query`, following GHL's pagination.
 
-        return self._get("/contacts", params=params).get("contacts", [])
+        The next page is fetched in the background while the current one is
+        consumed; at most two pages are held in memory.
+        """
+        for page in prefetch(self._iter_contact_pages(query, page_size), size=1):
+            yield from page
+
+    def phone_index(self, query: Optional[str] = None, default_country: Optional[str] = None) -> Dict[str, str]:
+        """Map of normalized phone (E.164 digits) -> GHL contact id, from one
+        paginated pass. Pass the `default_country` the looked-up numbers were
+        normalized with, so national numbers stored in GHL match them."""
+        return {
+            number: c["id"] for c in self.iter_contacts(query=query)
+            if (number := _indexed_phone(c, default_country))
+        }
 
     def create_contact(self, contact_data: Dict[str, Any]) -> Dict[str, Any]:
-        if hasattr(self, 'location_id'):
-            contact_data['locationId'] = self.location_id
-        return self._post("/contacts", json=contact_data)
+        return self._post("/contacts", json=self._with_location(contact_data))
 
     def update_contact(self, contact_id: str, contact_data: Dict[str, Any]) -> Dict[str, Any]:
         return self._put(f"/contacts/{contact_id}", json=contact_data)
@@ -59,4 +165,79 @@ class GHLClient:
         # V2 uses lookup? Or search.
         # I'll stick to a generic search for now, assuming the wrapper logic will handle filtering if API doesn't support direct tag filter in one go.
         # However, typical GHL usage involves GET /contacts with query.
-        return self.get_contacts(query=tag)
+        return list(self.iter_contacts(query=tag))
+
+
+class AsyncGHLClient(_GHLBase):
+    """Non-blocking variant of GHLClient built on httpx.AsyncClient."""
+
+    def __init__(
+        self,
+        api_key: str,
+        location_id: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        super().__init__(api_key, location_id, retry, rate_limit)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=30.0
+        )
+
+    async def _request(self, method: str, endpoint: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self.client.build_request(method, endpoint, **kwargs)
+        response = await asend_with_retry(self.client, request, self.retry, self.limiter)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._request("GET", endpoint, params=params)
+
+    async def _post(self, endpoint: str, json: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request("POST", endpoint, json=json, headers=self._idempotency_headers(idempotency_key))
+
+    async def _put(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("PUT", endpoint, json=json)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def get_contacts(self, query: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        result = await self._get("/contacts", params=self._contacts_params(query, limit))
+        return result.get("contacts", [])
+
+    async def iter_contacts(self, query: Optional[str] = None, page_size: int = GHL_MAX_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Every contact matching `query`; the next page is requested while
+        the current one is being consumed."""
+        page_size = self._page_size(page_size)
+        params = self._contacts_params(query, page_size)
+        pending: Optional["asyncio.Future[Dict[str, Any]]"] = asyncio.ensure_future(self._get("/contacts", params=params))
+        try:
+            while pending is not None:
+                result = await pending
+                next_params = self._next_page_params(params, result, page_size)
+                pending = None
+                if next_params is not None:
+                    params = next_params
+                    pending = asyncio.ensure_future(self._get("/contacts", params=params))
+                for contact in result.get("contacts", []):
+                    yield contact
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def phone_index(self, query: Optional[str] = None, default_country: Optional[str] = None) -> Dict[str, str]:
+        return {
+            number: c["id"] async for c in self.iter_contacts(query=query)
+            if (number := _indexed_phone(c, default_country))
+        }
+
+    async def create_contact(self, contact_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._post("/contacts", json=self._with_location(contact_data))
+
+    async def update_contact(self, contact_id: str, contact_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._put(f"/contacts/{contact_id}", json=contact_data)
+
+    async def get_contacts_by_tag(self, tag: str) -> List[Dict[str, Any]]:
+        return [contact async for contact in self.iter_contacts(query=tag)]
@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .store import connect, migrate, transaction
+
+_MIGRATIONS = [
+    """
+    CREATE TABLE outbox (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        number TEXT NOT NULL,
+        args TEXT NOT NULL,
+        idempotency_key TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        result TEXT,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX outbox_due ON outbox (status, next_attempt_at);
+    """,
+    # Token of the latest claim; only its holder may send or settle a message
+    "ALTER TABLE outbox ADD COLUMN claim TEXT;",
+]
+
+# The client's send_* methods a queued message can use
+KINDS = frozenset({
+    "text", "image", "buttons", "list", "carousel", "location", "contact", "document", "audio", "video", "sticker",
+})
+
+# A claimed message whose drainer has not started sending it, or reported
+# back, after this long is assumed lost with its process and handed out again
+LEASE_SECONDS = 300.0
+
+
+def is_permanent(error: BaseException) -> bool:
+    """Errors that retrying cannot fix: 4xx answers other than 408 and 429."""
+    # Deferred so queueing a message does not load the HTTP stack
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return 400 <= status < 500 and status not in (408, 429)
+    return isinstance(error, (TypeError, ValueError))
+
+
+def retry_delay(attempts: int, base: float = 2.0, cap: float = 600.0) -> float:
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+def deliver(client: Any, message: Dict[str, Any]) -> Any:
+    """Send a queued message with the client's send_<kind> method."""
+    send = getattr(client, f"send_{message['kind']}")
+    return send(message["number"], **message["args"], idempotency_key=message["idempotency_key"])
+
+
+def _to_dict(row: Any) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "number": row["number"],
+        "args": json.loads(row["args"]),
+        "idempotency_key": row["idempotency_key"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "error": row["error"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "created_at": row["created_at"],
+        "claim": row["claim"],
+    }
+
+
+class Outbox:
+    """Messages waiting to be sent, in a local SQLite queue.
+
+    `enqueue` is a single short insert, so callers return without waiting
+    on the API. A drainer claims due messages in batches, sends them and
+    records the outcome; failures are retried with backoff until
+    `max_attempts`. Each message keeps one idempotency key across attempts,
+    so a retry after a lost response is recognised as a duplicate. A claim
+    whose lease ran out is superseded by the next one, and `start` refuses
+    the stale copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def enqueue(self, kind: str, number: str, args: Dict[str, Any]) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown message kind: {kind}")
+        message_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO outbox (id, kind, number, args, idempotency_key, created_at, next_attempt_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (message_id, kind, number, json.dumps(args), str(uuid.uuid4()), now, now, now),
+            )
+        return message_id
+
+    def claim(self, limit: int, lease: float = LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Up to `limit` due messages, oldest first, marked as being sent."""
+        now = time.time()
+        claim = str(uuid.uuid4())
+        with transaction(self.conn, self._lock):
+            rows = self.conn.execute(
+                "SELECT * FROM outbox WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                " OR (status = 'sending' AND updated_at <= ?) ORDER BY created_at LIMIT ?",
+                (now, now - lease, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, claim = ?, updated_at = ? WHERE id = ?",
+                [(claim, now, row["id"]) for row in rows],
+            )
+        messages = [_to_dict(row) for row in rows]
+        for message in messages:
+            message["status"] = "sending"
+            message["attempts"] += 1
+            message["claim"] = claim
+        return messages
+
+    def start(self, message: Dict[str, Any]) -> bool:
+        """Renew a claimed message's lease just before it is sent. False if
+        the lease ran out and it was claimed again, or settled, meanwhile."""
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE outbox SET updated_at = ? WHERE id = ? AND status = 'sending' AND claim = ?",
+                (time.time(), message["id"], message["claim"]),
+            )
+        return cur.rowcount > 0
+
+    def complete(self, message_id: str, result: Any, claim: Optional[str] = None) -> None:
+        """Record a delivery; with `claim`, only if that claim still holds."""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'sent', error = NULL, result = ?, updated_at = ?"
+                " WHERE id = ? AND (? IS NULL OR claim = ?)",
+                (json.dumps(result), time.time(), message_id, claim, claim),
+            )
+
+    def fail(self, message_id: str, error: str, retry_at: Optional[float] = None, claim: Optional[str] = None) -> None:
+        """Record a failed attempt; the message is tried again at `retry_at`,
+        or never if it is None. With `claim`, only if that claim still holds."""
+        status = "failed" if retry_at is None else "pending"
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, error = ?, next_attempt_at = ?, updated_at = ?"
+                " WHERE id = ? AND (? IS NULL OR claim = ?)",
+                (status, error, retry_at or 0, time.time(), message_id, claim, claim),
+            )
+
+    def retry(self, message_id: str) -> bool:
+        """Queue a failed message again, with a fresh attempt budget."""
+        now = time.time()
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'failed'",
+                (now, now, message_id),
+            )
+        return cur.rowcount > 0
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+        return _to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        if status:
+            rows = self.conn.execute(
+                "SELECT * FROM outbox WHERE status = ? ORDER BY created_at LIMIT ?", (status, limit)
+            )
+        else:
+            rows = self.conn.execute("SELECT * FROM outbox ORDER BY created_at LIMIT ?", (limit,))
+        return [_to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def purge_sent(self, older_than: float) -> int:
+        with self._lock:
+            cur = self.conn.execute(
+                "DELETE FROM outbox WHERE status = 'sent' AND updated_at < ?", (time.time() - older_than,)
+            )
+        return cur.rowcount
@@ -0,0 +1,92 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+
+JID_SUFFIX = "@s.whatsapp.net"
+
+# E.164 allows at most 15 digits; nothing real is shorter than 8 with its country code
+_MIN_DIGITS = 8
+_MAX_DIGITS = 15
+# Longest national number (with area code) we expect without a country code
+_MAX_NATIONAL_DIGITS = 11
+
+_NON_DIGITS = re.compile(r"\D")
+
+MISSING = "missing"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+
+
+def phone_key(phone: Optional[str]) -> str:
+    """Digits of a phone number, so "+55 (11) 9999-0000" and "551199990000"
+    index the same contact."""
+    return _NON_DIGITS.sub("", phone or "")
+
+
+def normalize(number: Any, default_country: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """E.164 digits (no "+") for `number`, or None and the reason it was rejected.
+
+    Accepts international numbers with or without "+"/"00", WhatsApp JIDs and,
+    when `default_country` (a calling code such as "55") is given, national
+    numbers, whose trunk "0" is dropped.
+    """
+    if number is None:
+        return None, MISSING
+    text = str(number).strip()
+    if not text:
+        return None, MISSING
+    if "@" in text:
+        text, _, suffix = text.partition("@")
+        if "@" + suffix != JID_SUFFIX:
+            return None, INVALID  # groups, @lid and other non-phone JIDs
+        international = True
+    else:
+        international = text.startswith("+") or text.startswith("00")
+
+    digits = _NON_DIGITS.sub("", text)
+    if international and digits.startswith("00"):
+        digits = digits[2:]
+    elif not international and default_country and (
+        len(digits) <= _MAX_NATIONAL_DIGITS or not digits.startswith(default_country)
+    ):
+        digits = default_country + digits.lstrip("0")
+
+    if not _MIN_DIGITS <= len(digits) <= _MAX_DIGITS or digits[0] == "0":
+        return None, INVALID
+    return digits, None
+
+
+def to_jid(digits: str) -> str:
+    return digits + JID_SUFFIX
+
+
+class PhoneNormalizer:
+    """Normalizes and deduplicates the numbers of one contact source,
+    counting what it drops.
+
+    Seen numbers are kept as ints, which holds millions of them in a
+    fraction of the memory of the strings.
+    """
+
+    def __init__(self, default_country: Optional[str] = None):
+        self.default_country = phone_key(default_country) or None
+        self.seen: set = set()
+        self.kept = 0
+        self.dropped: Dict[str, int] = {MISSING: 0, INVALID: 0, DUPLICATE: 0}
+
+    def __call__(self, number: Any) -> Optional[str]:
+        """The normalized number, or None if it is invalid or already seen."""
+        digits, reason = normalize(number, self.default_country)
+        if digits is not None:
+            value = int(digits)
+            if value in self.seen:
+                reason = DUPLICATE
+            else:
+                self.seen.add(value)
+                self.kept += 1
+                return digits
+        assert reason is not None
+        self.dropped[reason] += 1
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {"kept": self.kept, "dropped": dict(self.dropped)}
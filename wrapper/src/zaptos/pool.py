@@ -0,0 +1,225 @@
+import bisect
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .client import ZaptosClient
+from .transport import _NOT_SENT_ERRORS, ResponseTimings
+
+# Points per instance on the hash ring; enough to split recipients evenly
+_REPLICAS = 128
+# An instance's /instance/status is asked at most this often after a failed send
+STATUS_INTERVAL = 5.0
+# How long a disconnected instance is left alone before it is checked again
+RECHECK_INTERVAL = 30.0
+
+
+class PoolUnavailable(RuntimeError):
+    pass
+
+
+def parse_pool(specs: Iterable[str]) -> List[Tuple[str, str]]:
+    """(instance, token) pairs from `instance:token` items, each of which may
+    itself be a comma-separated list (as in ZAPTOS_POOL)."""
+    pairs = []
+    for spec in specs:
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            instance, sep, token = item.partition(":")
+            if not sep or not instance or not token:
+                raise ValueError(f"Pool entries must be instance:token, got {item!r}")
+            pairs.append((instance, token))
+    if len({instance for instance, _ in pairs}) != len(pairs):
+        raise ValueError("Pool lists an instance more than once")
+    return pairs
+
+
+def _point(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes.
+
+    Each node owns `replicas` points on the ring and a key belongs to the
+    first point at or after its own hash. Adding or removing a node only
+    moves the keys that node gains or loses.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = _REPLICAS):
+        ring = sorted((_point(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self._points = [point for point, _ in ring]
+        self._nodes = [node for _, node in ring]
+        self.size = len(set(nodes))
+
+    def preference(self, key: str) -> Iterator[str]:
+        """Every node once, starting with the key's owner and walking clockwise."""
+        if not self._points:
+            return
+        start = bisect.bisect_left(self._points, _point(key))
+        seen = set()
+        for i in range(len(self._nodes)):
+            node = self._nodes[(start + i) % len(self._nodes)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == self.size:
+                    return
+
+    def owner(self, key: str) -> Optional[str]:
+        return next(self.preference(key), None)
+
+
+def is_connected(status: Any) -> bool:
+    """Whether an /instance/status answer says the WhatsApp session is up."""
+    if not isinstance(status, dict):
+        return False
+    inner = status.get("status")
+    if isinstance(inner, dict) and "connected" in inner:
+        return bool(inner["connected"])
+    instance = status.get("instance")
+    if isinstance(instance, dict) and "status" in instance:
+        return instance["status"] == "connected"
+    if isinstance(inner, str):
+        return inner == "connected"
+    return bool(status.get("connected"))
+
+
+class _Member:
+    __slots__ = ("client", "healthy", "checked_at", "sent", "failed", "failovers")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.healthy = True
+        self.checked_at = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.failovers = 0
+
+
+class InstancePool:
+    """Several Zaptos instances sending as one.
+
+    A number always goes to the same instance (consistent hashing), each
+    instance has its own rate limit, so throughput grows with the pool. When
+    a send fails the instance's /instance/status is checked; if it is
+    disconnected, its numbers move to the next instance on the ring until a
+    later check finds it connected again. The failed message itself moves
+    only if its request never reached the API; otherwise it may have gone
+    out, and the error is raised rather than risk sending it twice.
+
+    Offers the parts of ZaptosClient a campaign uses: send_text,
+    check_numbers, set_rate_limit and timings.
+    """
+
+    def __init__(self, clients: Sequence[Any], status_interval: float = STATUS_INTERVAL,
+                 recheck_interval: float = RECHECK_INTERVAL):
+        if not clients:
+            raise ValueError("An instance pool needs at least one instance")
+        self._members: Dict[str, _Member] = {client.instance: _Member(client) for client in clients}
+        # One record of response times for the whole pool
+        self.timings = ResponseTimings()
+        for client in clients:
+            client.timings = self.timings
+        self.ring = HashRing(list(self._members))
+        self.status_interval = status_interval
+        self.recheck_interval = recheck_interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]], **kwargs: Any) -> "InstancePool":
+        return cls([ZaptosClient(instance=instance, token=token) for instance, token in pairs], **kwargs)
+
+    @property
+    def instances(self) -> List[str]:
+        return list(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def set_rate_limit(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        """`rate` applies to each instance separately."""
+        for member in self._members.values():
+            member.client.set_rate_limit(rate, burst)
+
+    def close(self) -> None:
+        for member in self._members.values():
+            member.client.close()
+
+    def refresh(self) -> Dict[str, bool]:
+        """Check every instance now; returns which are connected."""
+        return {instance: self._check(instance) for instance in self._members}
+
+    def _check(self, instance: str) -> bool:
+        member = self._members[instance]
+        try:
+            connected = is_connected(member.client.instance_status())
+        except Exception:
+            connected = False
+        with self._lock:
+            member.healthy = connected
+            member.checked_at = time.monotonic()
+        return connected
+
+    def _usable(self, instance: str) -> bool:
+        member = self._members[instance]
+        if member.healthy:
+            return True
+        if time.monotonic() - member.checked_at >= self.recheck_interval:
+            return self._check(instance)
+        return False
+
+    def instance_for(self, number: str) -> str:
+        """The instance `number` is sent from right now."""
+        for instance in self.ring.preference(number):
+            if self._usable(instance):
+                return instance
+        raise PoolUnavailable("No instance in the pool is connected")
+
+    def send_text(self, number: str, text: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        tried = set()
+        while True:
+            instance = self.instance_for(number)
+            if instance in tried:
+                raise PoolUnavailable("No instance in the pool is connected")
+            member = self._members[instance]
+            try:
+                result = member.client.send_text(number, text, idempotency_key=idempotency_key)
+            except _NOT_SENT_ERRORS:
+                # Unreachable, and the message provably unsent: the next instance takes it
+                tried.add(instance)
+                with self._lock:
+                    member.failed += 1
+                    member.failovers += 1
+                    member.healthy = False
+                    member.checked_at = time.monotonic()
+                continue
+            except Exception:
+                with self._lock:
+                    member.failed += 1
+                    due = time.monotonic() - member.checked_at >= self.status_interval
+                # A disconnected instance stops getting later numbers, but this
+                # message may have been accepted, so it is not sent again elsewhere
+                if due:
+                    self._check(instance)
+                raise
+            with self._lock:
+                member.sent += 1
+            return result
+
+    def check_numbers(self, numbers: List[str]) -> List[Dict[str, Any]]:
+        for instance in self._members:
+            if self._usable(instance):
+                return self._members[instance].client.check_numbers(numbers)
+        raise PoolUnavailable("No instance in the pool is connected")
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                instance: {"healthy": m.healthy, "sent": m.sent, "failed": m.failed, "failovers": m.failovers}
+                for instance, m in self._members.items()
+            }
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from .store import connect, migrate, transaction
+
+_MIGRATIONS = [
+    """
+    CREATE TABLE buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """,
+]
+
+
+class TokenBucket:
+    """Token bucket whose state lives in a SQLite file.
+
+    Every process (and thread) opening the same file with the same key draws
+    from one budget: `rate` tokens per second, holding at most `burst`.
+    Each acquisition is a single short write transaction.
+    """
+
+    def __init__(self, path: str, key: str, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take `tokens` if available. Returns 0 on success, otherwise the
+        seconds to wait before they could be available."""
+        with transaction(self.conn, self._lock):
+            # Wall clock, since the state is shared between processes
+            now = time.time()
+            row = self.conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (self.key,)).fetchone()
+            if row is None:
+                available = self.burst
+            else:
+                elapsed = max(now - row["updated_at"], 0.0)
+                available = min(self.burst, row["tokens"] + elapsed * self.rate)
+
+            if available >= tokens:
+                available -= tokens
+                wait = 0.0
+            else:
+                wait = (tokens - available) / self.rate
+
+            self.conn.execute(
+                "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (self.key, available, now),
+            )
+        return wait
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` have been taken from the bucket."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
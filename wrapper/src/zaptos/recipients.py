@@ -0,0 +1,88 @@
+import csv
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Columns whose values repeat across rows are interned until this many distinct
+# values have been seen; past that the column is treated as unique per row
+_INTERN_LIMIT = 1024
+
+
+class Projection:
+    """The fields a campaign actually uses, projected out of each source row.
+
+    Shared by all the recipients it creates, so each of them holds just a
+    tuple of values. Low-cardinality columns (city, plan, ...) are interned,
+    so repeated values are stored once.
+    """
+
+    __slots__ = ("fields", "slots", "_seen")
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(fields))
+        self.slots: Dict[str, int] = {field: i for i, field in enumerate(self.fields)}
+        self._seen: Tuple[Optional[set], ...] = tuple(set() for _ in self.fields)
+
+    def _intern(self, i: int, value: Any) -> Any:
+        seen = self._seen[i]
+        if seen is None or not isinstance(value, str):
+            return value
+        if len(seen) >= _INTERN_LIMIT:
+            self._seen = self._seen[:i] + (None,) + self._seen[i + 1:]
+            return value
+        value = sys.intern(value)
+        seen.add(value)
+        return value
+
+    def __call__(self, row: Mapping) -> "Recipient":
+        return Recipient(self, tuple(self._intern(i, row.get(f)) for i, f in enumerate(self.fields)))
+
+    def from_values(self, values: Iterable[Any]) -> "Recipient":
+        return Recipient(self, tuple(self._intern(i, v) for i, v in enumerate(values)))
+
+
+class Recipient(Mapping):
+    """A projected source row: read-only mapping of the projection's fields."""
+
+    __slots__ = ("_projection", "_values")
+
+    def __init__(self, projection: Projection, values: Tuple[Any, ...]):
+        self._projection = projection
+        self._values = values
+
+    def __getitem__(self, field: str) -> Any:
+        return self._values[self._projection.slots[field]]
+
+    def get(self, field: str, default: Any = None) -> Any:
+        i = self._projection.slots.get(field)
+        if i is None:
+            return default
+        value = self._values[i]
+        return default if value is None else value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._projection.fields)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"Recipient({dict(self)!r})"
+
+
+def iter_csv_projected(path: str, projection: Projection) -> Iterator[Recipient]:
+    """Stream a CSV file as recipients holding only the projection's columns,
+    without building a dict for every row."""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = {name: i for i, name in enumerate(header)}
+        columns = [positions.get(field) for field in projection.fields]
+        for row in reader:
+            if not row:
+                continue
+            yield projection.from_values(
+                row[i] if i is not None and i < len(row) else None for i in columns
+            )
@@ -0,0 +1,73 @@
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+
+class StreamError(Exception):
+    """A stream raised while FairQueue.pop was drawing from it. The stream
+    has been dropped; `key` names it and the original error is the cause."""
+
+    def __init__(self, key: Hashable, error: BaseException):
+        super().__init__(f"{key}: {error}")
+        self.key = key
+        self.error = error
+
+
+class _Stream:
+    __slots__ = ("items", "weight", "vtime")
+
+    def __init__(self, items: Iterator[Any], weight: float, vtime: float):
+        self.items = items
+        self.weight = weight
+        self.vtime = vtime
+
+
+class FairQueue:
+    """Weighted fair interleaving of several job streams (stride scheduling).
+
+    Every stream has a virtual time that advances by 1/weight for each item
+    it hands out, and the stream with the lowest virtual time goes next. Over
+    any window streams get items in proportion to their weights; a stream
+    added later starts at the current minimum rather than catching up on
+    turns it never had.
+    """
+
+    def __init__(self) -> None:
+        self._streams: Dict[Hashable, _Stream] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._streams
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def add(self, key: Hashable, items: Iterable[Any], weight: float = 1.0) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        start = min((s.vtime for s in self._streams.values()), default=0.0)
+        self._streams[key] = _Stream(iter(items), weight, start)
+
+    def set_weight(self, key: Hashable, weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self._streams[key].weight = weight
+
+    def remove(self, key: Hashable) -> None:
+        self._streams.pop(key, None)
+
+    def pop(self) -> Optional[Tuple[Hashable, Any]]:
+        """The next (key, item), or None once every stream is exhausted.
+        Exhausted streams are dropped, and so are streams that raise: the
+        error comes out as StreamError, and the other streams carry on."""
+        while self._streams:
+            key = min(self._streams, key=lambda k: self._streams[k].vtime)
+            stream = self._streams[key]
+            try:
+                item = next(stream.items)
+            except StopIteration:
+                del self._streams[key]
+                continue
+            except Exception as e:
+                del self._streams[key]
+                raise StreamError(key, e) from e
+            stream.vtime += 1.0 / stream.weight
+            return key, item
+        return None
@@ -0,0 +1,80 @@
+import csv
+import queue
+import threading
+from typing import Any, Dict, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+_CHUNK_SIZE = 1 << 20
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def count_csv_rows(path: str) -> int:
+    """Number of data rows in a CSV file, from a raw newline count.
+
+    Reads the file in binary chunks without parsing it, so it is cheap even
+    for millions of rows. Quoted fields spanning several lines make it an
+    overestimate.
+    """
+    lines = 0
+    last = b""
+    with open(path, 'rb') as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            lines += chunk.count(b"\n")
+            last = chunk
+    if last and not last.endswith(b"\n"):
+        lines += 1
+    return max(lines - 1, 0)  # minus the header
+
+
+def iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream a CSV file as one dict per row without loading it whole."""
+    with open(path, 'r', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def prefetch(iterable: Iterable[T], size: int = 256) -> Iterator[T]:
+    """Read `iterable` ahead on a background thread, holding at most `size`
+    items, so parsing overlaps with whatever consumes the items.
+
+    Exceptions raised by the source are re-raised in the consumer.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+        else:
+            put(_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        # Lets the producer exit if the consumer stops early
+        stop.set()
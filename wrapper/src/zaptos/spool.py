@@ -0,0 +1,120 @@
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b"ZSPOOL1\n"
+_LENGTH = struct.Struct("<I")
+_SEPARATOR = b"\x00"
+# Offsets are flushed to the index file in blocks of this many records
+_INDEX_BLOCK = 8192
+
+Record = Tuple[str, str]
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+class SpoolWriter:
+    """Writes pre-rendered (number, text) records to an append-only spool.
+
+    Records are length-prefixed in the data file; a companion `.idx` file
+    holds each record's offset as a native-order uint64 (spools never leave
+    the machine that wrote them). Both are written to temporary files and
+    moved into place on close, so a spool is never seen half-written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = open(path + ".tmp", "wb", buffering=1 << 20)
+        self._index = open(index_path(path) + ".tmp", "wb")
+        self._offsets = array("Q")
+        self._offset = len(MAGIC)
+        self.count = 0
+        self._data.write(MAGIC)
+
+    def append(self, number: str, text: str) -> None:
+        payload = number.encode("utf-8") + _SEPARATOR + text.encode("utf-8")
+        self._data.write(_LENGTH.pack(len(payload)))
+        self._data.write(payload)
+        self._offsets.append(self._offset)
+        self._offset += _LENGTH.size + len(payload)
+        self.count += 1
+        if len(self._offsets) >= _INDEX_BLOCK:
+            self._flush_index()
+
+    def _flush_index(self) -> None:
+        self._offsets.tofile(self._index)
+        self._offsets = array("Q")
+
+    def close(self) -> None:
+        self._flush_index()
+        self._data.close()
+        self._index.close()
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(index_path(self.path) + ".tmp", index_path(self.path))
+
+    def abort(self) -> None:
+        self._data.close()
+        self._index.close()
+        for tmp in (self.path + ".tmp", index_path(self.path) + ".tmp"):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def __enter__(self) -> "SpoolWriter":
+        return self
+
+    def __exit__(self, exc_type: Optional[type], *exc_info: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SpoolReader:
+    """Memory-mapped view of a spool: record i is found through the index
+    without reading anything before it, so resuming is just an offset."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._maps: List[mmap.mmap] = []
+        with open(path, "rb") as data, open(index_path(path), "rb") as index:
+            self._data = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(self._data)
+            if os.fstat(index.fileno()).st_size:
+                self._maps.append(mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ))
+        self._offsets = memoryview(self._maps[1] if len(self._maps) > 1 else b"").cast("Q")
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a campaign spool")
+
+    def close(self) -> None:
+        # The view has to go before the map it points into
+        self._offsets.release()
+        for m in self._maps:
+            m.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> Record:
+        offset = self._offsets[i]
+        (length,) = _LENGTH.unpack_from(self._data, offset)
+        start = offset + _LENGTH.size
+        payload = self._data[start:start + length]
+        number, _, text = payload.partition(_SEPARATOR)
+        return number.decode("utf-8"), text.decode("utf-8")
+
+    def iter_from(self, start: int = 0) -> Iterator[Tuple[int, str, str]]:
+        """(seq, number, text) for every record from `start` on."""
+        for i in range(start, len(self._offsets)):
+            number, text = self[i]
+            yield i, number, text
+
+    def __enter__(self) -> "SpoolReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
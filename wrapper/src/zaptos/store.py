@@ -0,0 +1,377 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Set, Tuple
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+_MIGRATIONS = [
+    """
+    CREATE TABLE campaigns (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        status TEXT NOT NULL,
+        template TEXT NOT NULL,
+        source TEXT NOT NULL,
+        source_config TEXT,
+        total INTEGER NOT NULL DEFAULT 0,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX idx_campaigns_status ON campaigns(status);
+    CREATE TABLE recipients (
+        campaign_id TEXT NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE,
+        number TEXT NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (campaign_id, number)
+    );
+    CREATE INDEX idx_recipients_status ON recipients(campaign_id, status);
+    """,
+    """
+    ALTER TABLE campaigns ADD COLUMN checkpoint INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE recipients ADD COLUMN seq INTEGER;
+    ALTER TABLE recipients ADD COLUMN message_id TEXT;
+    ALTER TABLE recipients ADD COLUMN idempotency_key TEXT;
+    """,
+    """
+    ALTER TABLE campaigns ADD COLUMN engine TEXT NOT NULL DEFAULT 'local';
+    CREATE TABLE folders (
+        folder_id TEXT PRIMARY KEY,
+        campaign_id TEXT NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE,
+        count INTEGER NOT NULL,
+        status TEXT,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        submitted_at TEXT NOT NULL
+    );
+    CREATE INDEX idx_folders_campaign ON folders(campaign_id, status);
+    """,
+    """
+    ALTER TABLE campaigns ADD COLUMN spool TEXT;
+    """,
+    """
+    ALTER TABLE campaigns ADD COLUMN weight REAL NOT NULL DEFAULT 1;
+    """,
+    """
+    ALTER TABLE folders ADD COLUMN misses INTEGER NOT NULL DEFAULT 0;
+    """,
+]
+
+# Recipient states with a matching counter column on campaigns
+_COUNTED = ("sent", "failed")
+
+# Folder statuses after which the counters no longer change: the server's
+# own, plus "missing" for folders the listing stopped reporting
+FOLDER_DONE_STATUSES = ("done", "missing")
+
+_IDEMPOTENCY_NAMESPACE = uuid.UUID("5f0c2b1e-8d4a-4c55-9a55-3f1f6c1b7e21")
+
+
+def idempotency_key(campaign_id: str, number: str) -> str:
+    """Stable key for one campaign message, identical across restarts."""
+    return str(uuid.uuid5(_IDEMPOTENCY_NAMESPACE, f"{campaign_id}:{number}"))
+
+
+def message_id_of(result: Any) -> Optional[str]:
+    """Pull the provider message id out of a send response, if present."""
+    if not isinstance(result, dict):
+        return None
+    return result.get("messageid") or result.get("messageId") or result.get("id")
+
+
+class Watermark:
+    """Lowest sequence number whose job has not finished yet.
+
+    Jobs finish out of order when sent concurrently; everything below the
+    watermark is known to be done, so a restart can begin right there.
+    """
+
+    def __init__(self, start: int = 0):
+        self.value = start
+        self._done: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def complete(self, seq: int) -> Optional[int]:
+        """Mark `seq` done. Returns the new watermark if it moved, else None."""
+        with self._lock:
+            if seq < self.value:
+                return None
+            self._done.add(seq)
+            old = self.value
+            while self.value in self._done:
+                self._done.remove(self.value)
+                self.value += 1
+            return self.value if self.value != old else None
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a SQLite database in WAL mode, shareable across threads."""
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection, lock: threading.Lock) -> Iterator[None]:
+    """Serialize writers on `lock` and run the block in one write transaction."""
+    with lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def migrate(conn: sqlite3.Connection, migrations: List[str]) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(migrations[version:], start=version + 1):
+        conn.executescript(f"BEGIN; {script}; PRAGMA user_version = {number}; COMMIT;")
+
+
+class CampaignStore:
+    """Campaigns and per-recipient delivery status in a local SQLite database.
+
+    Progress updates touch one recipient row and one campaign row, so their
+    cost does not grow with the number of campaigns or recipients.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _transaction(self) -> ContextManager[None]:
+        return transaction(self.conn, self._lock)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "created_at": row["created_at"],
+            "status": row["status"],
+            "template": row["template"],
+            "source": row["source"],
+            "source_config": row["source_config"],
+            "stats": {"total": row["total"], "sent": row["sent"], "failed": row["failed"]},
+            "checkpoint": row["checkpoint"],
+            "engine": row["engine"],
+            "spool": row["spool"],
+            "weight": row["weight"],
+        }
+
+    def create_campaign(self, campaign: Dict[str, Any]) -> None:
+        stats = campaign.get("stats", {})
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO campaigns (id, name, created_at, status, template, source, source_config, total, sent, failed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    campaign["id"], campaign["name"], campaign["created_at"], campaign["status"],
+                    campaign["template"], campaign["source"], campaign.get("source_config"),
+                    stats.get("total", 0), stats.get("sent", 0), stats.get("failed", 0),
+                ),
+            )
+
+    def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_campaigns(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if status:
+            rows = self.conn.execute(
+                "SELECT * FROM campaigns WHERE status = ? ORDER BY created_at", (status,)
+            )
+        else:
+            rows = self.conn.execute("SELECT * FROM campaigns ORDER BY created_at")
+        return [self._to_dict(row) for row in rows]
+
+    def set_status(self, campaign_id: str, status: str) -> bool:
+        with self._lock:
+            cur = self.conn.execute("UPDATE campaigns SET status = ? WHERE id = ?", (status, campaign_id))
+        return cur.rowcount > 0
+
+    def set_total(self, campaign_id: str, total: int) -> None:
+        with self._lock:
+            self.conn.execute("UPDATE campaigns SET total = ? WHERE id = ?", (total, campaign_id))
+
+    def set_engine(self, campaign_id: str, engine: str) -> None:
+        with self._lock:
+            self.conn.execute("UPDATE campaigns SET engine = ? WHERE id = ?", (engine, campaign_id))
+
+    def set_weight(self, campaign_id: str, weight: float) -> None:
+        """Share of the instance a scheduled campaign gets relative to the others."""
+        with self._lock:
+            self.conn.execute("UPDATE campaigns SET weight = ? WHERE id = ?", (weight, campaign_id))
+
+    def set_spool(self, campaign_id: str, path: Optional[str], total: int) -> None:
+        """Point the campaign at a prepared spool of `total` records."""
+        with self._lock:
+            self.conn.execute("UPDATE campaigns SET spool = ?, total = ? WHERE id = ?", (path, total, campaign_id))
+
+    def delete_campaign(self, campaign_id: str) -> bool:
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM campaigns WHERE id = ?", (campaign_id,))
+        return cur.rowcount > 0
+
+    def set_checkpoint(self, campaign_id: str, checkpoint: int) -> None:
+        with self._lock:
+            self._advance_checkpoint(campaign_id, checkpoint)
+
+    def _advance_checkpoint(self, campaign_id: str, checkpoint: int) -> None:
+        # Writers may race; the checkpoint only ever moves forward
+        self.conn.execute(
+            "UPDATE campaigns SET checkpoint = MAX(checkpoint, ?) WHERE id = ?", (checkpoint, campaign_id)
+        )
+
+    def record_result(
+        self,
+        campaign_id: str,
+        number: str,
+        status: str,
+        error: Optional[str] = None,
+        seq: Optional[int] = None,
+        message_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        checkpoint: Optional[int] = None,
+    ) -> None:
+        """Store a recipient's state (pending/sent/failed) and adjust the
+        campaign counters, optionally advancing the resume checkpoint."""
+        with self._transaction():
+            self._upsert_recipient(campaign_id, number, status, error, seq, message_id, idempotency_key)
+            if checkpoint is not None:
+                self._advance_checkpoint(campaign_id, checkpoint)
+
+    def _upsert_recipient(
+        self,
+        campaign_id: str,
+        number: str,
+        status: str,
+        error: Optional[str],
+        seq: Optional[int],
+        message_id: Optional[str],
+        idempotency_key: Optional[str],
+    ) -> None:
+        # Must run inside a transaction
+        row = self.conn.execute(
+            "SELECT status FROM recipients WHERE campaign_id = ? AND number = ?",
+            (campaign_id, number),
+        ).fetchone()
+        previous = row["status"] if row else None
+        self.conn.execute(
+            "INSERT INTO recipients (campaign_id, number, status, error, updated_at, seq, message_id, idempotency_key)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (campaign_id, number) DO UPDATE SET"
+            " status = excluded.status, error = excluded.error, updated_at = excluded.updated_at,"
+            " seq = COALESCE(excluded.seq, seq),"
+            " message_id = COALESCE(excluded.message_id, message_id),"
+            " idempotency_key = COALESCE(excluded.idempotency_key, idempotency_key)",
+            (campaign_id, number, status, error, datetime.now().isoformat(), seq, message_id, idempotency_key),
+        )
+        if previous != status:
+            if previous in _COUNTED:
+                self.conn.execute(f"UPDATE campaigns SET {previous} = {previous} - 1 WHERE id = ?", (campaign_id,))
+            if status in _COUNTED:
+                self.conn.execute(f"UPDATE campaigns SET {status} = {status} + 1 WHERE id = ?", (campaign_id,))
+
+    def record_folder(
+        self,
+        campaign_id: str,
+        folder_id: str,
+        recipients: List[Tuple[int, str, str]],
+        checkpoint: Optional[int] = None,
+    ) -> None:
+        """Store a chunk submitted to the server-side sender: the folder it
+        created and its (seq, number, idempotency_key) recipients, now queued."""
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO folders (folder_id, campaign_id, count, submitted_at) VALUES (?, ?, ?, ?)",
+                (folder_id, campaign_id, len(recipients), datetime.now().isoformat()),
+            )
+            for seq, number, key in recipients:
+                self._upsert_recipient(campaign_id, number, 'queued', None, seq, None, key)
+            if checkpoint is not None:
+                self._advance_checkpoint(campaign_id, checkpoint)
+
+    def pending_folders(self, campaign_id: str) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" for _ in FOLDER_DONE_STATUSES)
+        rows = self.conn.execute(
+            f"SELECT * FROM folders WHERE campaign_id = ? AND (status IS NULL OR status NOT IN ({placeholders}))",
+            (campaign_id, *FOLDER_DONE_STATUSES),
+        )
+        return [dict(row) for row in rows]
+
+    def update_folder(self, folder_id: str, status: Optional[str], sent: int, failed: int) -> None:
+        """Store a folder's latest server-side counts, moving the campaign
+        counters by the difference from the previous poll."""
+        with self._transaction():
+            row = self.conn.execute(
+                "SELECT campaign_id, sent, failed FROM folders WHERE folder_id = ?", (folder_id,)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE folders SET status = ?, sent = ?, failed = ?, misses = 0 WHERE folder_id = ?",
+                    (status, sent, failed, folder_id),
+                )
+                self.conn.execute(
+                    "UPDATE campaigns SET sent = sent + ?, failed = failed + ? WHERE id = ?",
+                    (sent - row["sent"], failed - row["failed"], row["campaign_id"]),
+                )
+
+    def miss_folder(self, folder_id: str) -> int:
+        """Count a poll whose listing left the folder out; returns how many
+        polls in a row have now missed it."""
+        with self._transaction():
+            self.conn.execute("UPDATE folders SET misses = misses + 1 WHERE folder_id = ?", (folder_id,))
+            row = self.conn.execute("SELECT misses FROM folders WHERE folder_id = ?", (folder_id,)).fetchone()
+        return row["misses"] if row else 0
+
+    def recipient_status(self, campaign_id: str, number: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT status FROM recipients WHERE campaign_id = ? AND number = ?", (campaign_id, number)
+        ).fetchone()
+        return row["status"] if row else None
+
+    def failed_seqs(self, campaign_id: str, below: int, except_error: Optional[str] = None) -> Set[int]:
+        """Sequence numbers below `below` whose send failed, for a resumed run
+        to retry; failures with `except_error` are final and left out."""
+        rows = self.conn.execute(
+            "SELECT seq FROM recipients WHERE campaign_id = ? AND status = 'failed' AND seq < ?"
+            " AND (error IS NULL OR error != ?)",
+            (campaign_id, below, except_error or ""),
+        )
+        return {row["seq"] for row in rows}
+
+    def get_recipient(self, campaign_id: str, number: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT * FROM recipients WHERE campaign_id = ? AND number = ?", (campaign_id, number)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def import_json(self, filepath: str) -> int:
+        """One-off import of a legacy campaigns.json file. Returns campaigns added."""
+        if not os.path.exists(filepath):
+            return 0
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        imported = 0
+        for campaign in data.values():
+            if self.get_campaign(campaign["id"]) is None:
+                self.create_campaign(campaign)
+                imported += 1
+        return imported
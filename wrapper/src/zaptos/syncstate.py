@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .store import connect, migrate, transaction
+
+_MIGRATIONS = [
+    """
+    CREATE TABLE marks (
+        scope TEXT PRIMARY KEY,
+        high_water TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE TABLE synced (
+        ghl_id TEXT PRIMARY KEY,
+        digest TEXT NOT NULL,
+        synced_at TEXT NOT NULL
+    );
+    """,
+]
+
+
+def content_hash(fields: Dict[str, Any]) -> str:
+    """Digest of the fields pushed to Zaptos; equal digests mean nothing changed."""
+    encoded = json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class SyncState:
+    """What contacts sync-ghl has already pushed to Zaptos.
+
+    Holds a high-water mark (the newest GHL `dateUpdated` fully synced) per
+    scope and the digest of the synced fields per GHL contact, so unchanged
+    contacts can be skipped without a Zaptos call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def high_water(self, scope: str) -> Optional[str]:
+        row = self.conn.execute("SELECT high_water FROM marks WHERE scope = ?", (scope,)).fetchone()
+        return row["high_water"] if row else None
+
+    def set_high_water(self, scope: str, value: str) -> None:
+        with transaction(self.conn, self._lock):
+            self.conn.execute(
+                "INSERT INTO marks (scope, high_water, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (scope) DO UPDATE SET high_water = excluded.high_water, updated_at = excluded.updated_at",
+                (scope, value, datetime.now().isoformat()),
+            )
+
+    def is_unchanged(self, ghl_id: str, digest: str) -> bool:
+        row = self.conn.execute("SELECT digest FROM synced WHERE ghl_id = ?", (ghl_id,)).fetchone()
+        return row is not None and row["digest"] == digest
+
+    def record(self, ghl_id: str, digest: str) -> None:
+        with transaction(self.conn, self._lock):
+            self.conn.execute(
+                "INSERT INTO synced (ghl_id, digest, synced_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (ghl_id) DO UPDATE SET digest = excluded.digest, synced_at = excluded.synced_at",
+                (ghl_id, digest, datetime.now().isoformat()),
+            )
@@ -0,0 +1,102 @@
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+_PLACEHOLDER = re.compile(r"\{\{(.*?)\}\}", re.S)
+_FIELD = re.compile(r"^[A-Za-z_][\w.-]*$")
+
+Filter = Callable[[str, Optional[str]], str]
+
+FILTERS: Dict[str, Filter] = {
+    "default": lambda value, arg: value or (arg or ""),
+    "upper": lambda value, arg: value.upper(),
+    "lower": lambda value, arg: value.lower(),
+    "title": lambda value, arg: value.title(),
+    "capitalize": lambda value, arg: value.capitalize(),
+    "strip": lambda value, arg: value.strip(),
+    "first": lambda value, arg: value.split(None, 1)[0] if value.strip() else "",
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _unquote(arg: str) -> str:
+    arg = arg.strip()
+    if len(arg) >= 2 and arg[0] == arg[-1] and arg[0] in "\"'":
+        return arg[1:-1]
+    return arg
+
+
+def _lookup(field: str) -> Callable[[Mapping[str, Any]], Any]:
+    if "." not in field:
+        return lambda contact: contact.get(field)
+    path = field.split(".")
+
+    def nested(contact: Mapping[str, Any]) -> Any:
+        value: Any = contact
+        for part in path:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(part)
+        return value
+
+    return nested
+
+
+def _compile_placeholder(expression: str) -> Tuple[str, Callable[[Mapping[str, Any]], str]]:
+    field, *filter_specs = expression.split("|")
+    field = field.strip()
+    if not _FIELD.match(field):
+        raise TemplateError(f"Invalid field name: {field!r}")
+
+    filters: List[Tuple[Filter, Optional[str]]] = []
+    for spec in filter_specs:
+        name, sep, arg = spec.partition(":")
+        name = name.strip()
+        if name not in FILTERS:
+            raise TemplateError(f"Unknown filter {name!r} in {{{{{expression}}}}}")
+        filters.append((FILTERS[name], _unquote(arg) if sep else None))
+
+    get = _lookup(field)
+
+    def render(contact: Mapping[str, Any]) -> str:
+        value = get(contact)
+        text = "" if value is None else str(value)
+        for apply, arg in filters:
+            text = apply(text, arg)
+        return text
+
+    return field, render
+
+
+class Template:
+    """A message template parsed once into literal and field segments.
+
+    Placeholders are `{{field}}` with optional filters, e.g.
+    `{{firstName|default:"there"|title}}`; any column of the contact (or
+    dotted path into nested values) can be used. Rendering is a single join.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._segments: List[Union[str, Callable[[Mapping[str, Any]], str]]] = []
+        fields = set()
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            if match.start() > position:
+                self._segments.append(source[position:match.start()])
+            field, render = _compile_placeholder(match.group(1))
+            fields.add(field.split(".")[0])
+            self._segments.append(render)
+            position = match.end()
+        if position < len(source):
+            self._segments.append(source[position:])
+        self.fields: FrozenSet[str] = frozenset(fields)
+
+    def render(self, contact: Mapping[str, Any]) -> str:
+        return "".join([s if isinstance(s, str) else s(contact) for s in self._segments])
+
+
+def compile_template(source: str) -> Template:
+    return Template(source)
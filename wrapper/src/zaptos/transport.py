@@ -0,0 +1,192 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Deque, Iterable, List, Optional, Tuple
+
+import httpx
+
+if TYPE_CHECKING:
+    from .ratelimit import TokenBucket
+
+# The request never reached the server, so retrying cannot duplicate it
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# The request may or may not have been processed
+_AMBIGUOUS_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+
+    Waits use exponential backoff with full jitter, unless the response
+    carries a Retry-After header, which is honored (capped at backoff_max).
+    Failures that show the request was not processed are retried for every
+    method: connection failures, 429, and 503 with Retry-After. Timeouts
+    after the request was sent and the other listed statuses are retried
+    only for `retry_methods`. POST is left out by default: the Zaptos API
+    does not promise to honor Idempotency-Key, so a send that timed out
+    after delivery would go out twice. Add it to opt in.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_statuses: Iterable[int] = (429, 502, 503, 504),
+        retry_methods: Iterable[str] = ("GET", "PUT", "DELETE"),
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+
+    def retry_on_response(self, method: str, response: httpx.Response) -> bool:
+        status = response.status_code
+        if status not in self.retry_statuses:
+            return False
+        if method in self.retry_methods:
+            return True
+        # Turned away before processing, so safe to send again
+        return status == 429 or (status == 503 and "Retry-After" in response.headers)
+
+    def retry_on_error(self, method: str, error: Exception) -> bool:
+        if isinstance(error, _NOT_SENT_ERRORS):
+            return True
+        return isinstance(error, _AMBIGUOUS_ERRORS) and method in self.retry_methods
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait after the given (1-based) failed attempt."""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds; it may be given as seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+# (seconds, status) of one request attempt; status 0 when no response came back
+Sample = Tuple[float, int]
+
+
+class ResponseTimings:
+    """Latency and status of a client's recent request attempts.
+
+    Kept in a bounded ring. Readers follow it with a cursor (`count` at
+    their last look), so any number of them can watch one client.
+    """
+
+    def __init__(self, size: int = 4096):
+        self._samples: Deque[Sample] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float, status: int) -> None:
+        with self._lock:
+            self._samples.append((seconds, status))
+            self.count += 1
+
+    def since(self, cursor: int) -> Tuple[List[Sample], int]:
+        """Samples recorded after `cursor` (those still held) and the new cursor."""
+        with self._lock:
+            new = min(self.count - cursor, len(self._samples))
+            samples = list(self._samples)[len(self._samples) - new:] if new > 0 else []
+            return samples, self.count
+
+
+def new_idempotency_key() -> str:
+    return str(uuid.uuid4())
+
+
+def send_with_retry(
+    client: httpx.Client,
+    request: httpx.Request,
+    policy: RetryPolicy,
+    limiter: Optional["TokenBucket"] = None,
+    timings: Optional[ResponseTimings] = None,
+) -> httpx.Response:
+    """Send `request` through `client`, retrying according to `policy`.
+
+    Every attempt first takes a token from `limiter`, if given, and has its
+    latency and status recorded in `timings`. Returns the last response
+    (whatever its status) or raises the last transport error once attempts
+    run out.
+    """
+    attempt = 1
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = client.send(request)
+        except httpx.TransportError as e:
+            if timings is not None:
+                timings.record(time.monotonic() - started, 0)
+            if attempt >= policy.max_attempts or not policy.retry_on_error(request.method, e):
+                raise
+            time.sleep(policy.delay(attempt))
+        else:
+            if timings is not None:
+                timings.record(time.monotonic() - started, response.status_code)
+            if attempt >= policy.max_attempts or not policy.retry_on_response(request.method, response):
+                return response
+            response.close()
+            time.sleep(policy.delay(attempt, response))
+        attempt += 1
+
+
+async def asend_with_retry(
+    client: httpx.AsyncClient,
+    request: httpx.Request,
+    policy: RetryPolicy,
+    limiter: Optional["TokenBucket"] = None,
+    timings: Optional[ResponseTimings] = None,
+) -> httpx.Response:
+    """Async counterpart of send_with_retry."""
+    attempt = 1
+    while True:
+        if limiter is not None:
+            await limiter.acquire_async()
+        started = time.monotonic()
+        try:
+            response = await client.send(request)
+        except httpx.TransportError as e:
+            if timings is not None:
+                timings.record(time.monotonic() - started, 0)
+            if attempt >= policy.max_attempts or not policy.retry_on_error(request.method, e):
+                raise
+            await asyncio.sleep(policy.delay(attempt))
+        else:
+            if timings is not None:
+                timings.record(time.monotonic() - started, response.status_code)
+            if attempt >= policy.max_attempts or not policy.retry_on_response(request.method, response):
+                return response
+            await response.aclose()
+            await asyncio.sleep(policy.delay(attempt, response))
+        attempt += 1
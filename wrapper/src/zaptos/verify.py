@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .engine import SendEngine
+from .phone import phone_key
+from .store import connect, migrate, transaction
+
+_MIGRATIONS = [
+    """
+    CREATE TABLE checks (
+        number TEXT PRIMARY KEY,
+        valid INTEGER NOT NULL,
+        jid TEXT,
+        checked_at REAL NOT NULL
+    );
+    """,
+]
+
+# Stay well under SQLite's bound-parameter limit
+_LOOKUP_BATCH = 500
+
+Check = Tuple[str, bool, Optional[str]]
+
+
+def parse_checks(items: Any) -> List[Check]:
+    """(number, is on WhatsApp, jid) for each definite answer of /chat/check;
+    entries that carry an error are left out."""
+    checks = []
+    for item in items if isinstance(items, list) else []:
+        number = phone_key(item.get("query"))
+        if number and not item.get("error") and "isInWhatsapp" in item:
+            checks.append((number, bool(item["isInWhatsapp"]), item.get("jid")))
+    return checks
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CheckCache:
+    """Which numbers are on WhatsApp, as last answered by /chat/check.
+
+    Answers older than the caller's TTL are ignored, so a number is checked
+    again once in a while.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.Lock()
+        migrate(self.conn, _MIGRATIONS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(self, numbers: List[str], ttl: float) -> Dict[str, bool]:
+        oldest = time.time() - ttl
+        known: Dict[str, bool] = {}
+        for batch in chunked(numbers, _LOOKUP_BATCH):
+            rows = self.conn.execute(
+                f"SELECT number, valid FROM checks WHERE checked_at > ? AND number IN ({', '.join('?' * len(batch))})",
+                (oldest, *batch),
+            )
+            known.update((row["number"], bool(row["valid"])) for row in rows)
+        return known
+
+    def put_many(self, checks: Iterable[Check]) -> None:
+        now = time.time()
+        with transaction(self.conn, self._lock):
+            self.conn.executemany(
+                "INSERT INTO checks (number, valid, jid, checked_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (number) DO UPDATE SET valid = excluded.valid, jid = excluded.jid,"
+                " checked_at = excluded.checked_at",
+                [(number, int(valid), jid, now) for number, valid, jid in checks],
+            )
+
+
+class NumberVerifier:
+    """Checks numbers against /chat/check in chunks, answering from the
+    cache where it can.
+
+    Numbers the API gives no definite answer for are reported as unknown
+    and are not cached.
+    """
+
+    def __init__(self, client: Any, cache: CheckCache, ttl: float, chunk_size: int = 500):
+        self.client = client
+        self.cache = cache
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.stats = {"valid": 0, "invalid": 0, "unknown": 0, "cached": 0, "checked": 0}
+
+    def check(self, numbers: List[str]) -> Dict[str, bool]:
+        """Verdicts for one chunk of normalized numbers; at most one API call."""
+        verdicts = self.cache.get_many(numbers, self.ttl)
+        cached = len(verdicts)
+        pending = [n for n in numbers if n not in verdicts]
+        if pending:
+            checks = parse_checks(self.client.check_numbers(pending))
+            self.cache.put_many(checks)
+            verdicts.update((number, valid) for number, valid, _ in checks)
+
+        valid = sum(1 for n in numbers if verdicts.get(n) is True)
+        invalid = sum(1 for n in numbers if verdicts.get(n) is False)
+        with self._lock:
+            self.stats["cached"] += cached
+            self.stats["checked"] += len(pending)
+            self.stats["valid"] += valid
+            self.stats["invalid"] += invalid
+            self.stats["unknown"] += len(numbers) - valid - invalid
+        return verdicts
+
+    def check_all(self, numbers: Iterable[str], concurrency: int = 4) -> List[str]:
+        """Check every number, `concurrency` chunks at a time. Returns the
+        errors of chunks that failed; their numbers count as unknown."""
+        errors: List[str] = []
+
+        def on_result(chunk: List[str], result: Any, error: Optional[BaseException]) -> None:
+            if error is not None:
+                with self._lock:
+                    self.stats["unknown"] += len(chunk)
+                    errors.append(str(error))
+
+        jobs = ((str(i), chunk) for i, chunk in enumerate(chunked(numbers, self.chunk_size)))
+        SendEngine(workers=concurrency).run(jobs, self.check, on_result)
+        return errors
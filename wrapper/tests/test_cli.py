@@ -1,10 +1,15 @@
 from click.testing import CliRunner
 from zaptos.cli import cli
+from zaptos.endpoints import campaigns as campaigns_module
 from zaptos.config import config as zaptos_config
+from zaptos.store import CampaignStore
+from zaptos.transport import ResponseTimings
+import csv
 import json
+import itertools
 import os
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import click
 from contextlib import contextmanager
 
@@ -43,6 +48,18 @@ def temporary_command(group, name):
     if name in group.commands:
         del group.commands[name]
 
+@contextmanager
+def temporary_client_command(group, name):
+    """Context manager to add a temporary command that uses both clients."""
+    @group.command(name=name)
+    @click.pass_context
+    def cmd(ctx):
+        assert ctx.obj.client is ctx.obj.client
+        assert ctx.obj.ghl_client is ctx.obj.ghl_client
+    yield
+    if name in group.commands:
+        del group.commands[name]
+
 @contextmanager
 def temporary_noop_command(group, name):
     """Context manager to add a temporary no-op command."""
@@ -68,7 +85,7 @@ def test_messages_help():
 def test_campaigns_create():
     runner = CliRunner()
     with runner.isolated_filesystem():
-        with patch('zaptos.endpoints.campaigns.get_campaigns_file', return_value='zaptos_campaigns.json'):
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'):
             result = runner.invoke(cli, [
                 'campaigns', 'create',
                 '--name', 'Test Campaign',
@@ -80,11 +97,280 @@ def test_campaigns_create():
             assert output['status'] == 'created'
             assert output['id'] is not None
 
-            # Check if file created
-            assert os.path.exists('zaptos_campaigns.json')
-            with open('zaptos_campaigns.json', 'r') as f:
-                data = json.load(f)
-                assert data[output['id']]['name'] == 'Test Campaign'
+            # Check if stored
+            assert os.path.exists('zaptos_campaigns.db')
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(output['id'])
+            assert campaign['name'] == 'Test Campaign'
+
+def test_campaigns_start_csv():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n,NoNumber\n5511999999993,Caio\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            def fake_send(number, text, idempotency_key=None):
+                if number.endswith("2"):
+                    raise RuntimeError("boom")
+                return {"messageId": number}
+
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.side_effect = fake_send
+
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--workers', '2', '--rate', '0'
+            ])
+
+            assert result.exit_code == 0, result.output
+            sent = {c.args for c in mock_client.send_text.call_args_list}
+            assert sent == {
+                ("5511999999991", "Hi Ana"),
+                ("5511999999992", "Hi Bia"),
+                ("5511999999993", "Hi Caio"),
+            }
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)
+            assert campaign['status'] == 'completed'
+            assert campaign['stats'] == {"total": 4, "sent": 2, "failed": 1}
+
+@pytest.mark.parametrize("engine", ["local", "server"])
+def test_campaigns_start_fails_campaign_on_source_error(engine):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n5511999999991\n5511999999992\n")
+        real_iter_csv = campaigns_module.iter_csv_projected
+
+        def iter_csv(path, projection):
+            for i, row in enumerate(real_iter_csv(path, projection)):
+                if i == 1:
+                    raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+                yield row
+
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.iter_csv_projected', side_effect=iter_csv), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value.send_text.return_value = {"messageId": "m"}
+            MockZaptosClient.return_value._post.return_value = {"folder_id": "f1"}
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--rate', '0', '--engine', engine
+            ])
+
+            assert result.exit_code == 0, result.output
+            assert "Error reading source: 'utf-8' codec can't decode" in result.stderr
+            assert CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)['status'] == 'failed'
+
+def test_campaigns_start_resumes_from_ledger():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n5511999999993,Caio\n5511999999994,Duda\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageid": "m"}
+
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            # A previous run got through row 0, and row 2 finished out of order, before crashing
+            store = CampaignStore('zaptos_campaigns.db')
+            store.record_result(campaign_id, "5511999999991", "sent", seq=0, checkpoint=1)
+            store.record_result(campaign_id, "5511999999993", "sent", seq=2)
+            store.record_result(campaign_id, "5511999999992", "pending", seq=1)
+            store.set_status(campaign_id, 'running')
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--rate', '0'
+            ])
+
+            assert result.exit_code == 0, result.output
+            sent = sorted(c.args[0] for c in mock_client.send_text.call_args_list)
+            assert sent == ["5511999999992", "5511999999994"]
+            campaign = store.get_campaign(campaign_id)
+            assert campaign['stats']['sent'] == 4
+            assert campaign['checkpoint'] == 4
+            assert store.get_recipient(campaign_id, "5511999999994")['message_id'] == "m"
+
+def test_campaigns_failures_do_not_hold_the_checkpoint_back():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n5511999999993,Caio\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.side_effect = [RuntimeError("boom"), {"messageid": "m2"}, {"messageid": "m3"}]
+
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+            args = ['--instance', 'inst', '--token', 'tok', 'campaigns', 'start', campaign_id, '--workers', '1', '--rate', '0']
+
+            assert runner.invoke(cli, args).exit_code == 0
+            store = CampaignStore('zaptos_campaigns.db')
+            assert store.get_campaign(campaign_id)['checkpoint'] == 3
+            assert store.failed_seqs(campaign_id, 3) == {0}
+
+            # Starting again retries only the failed recipient
+            mock_client.send_text.side_effect = None
+            mock_client.send_text.return_value = {"messageid": "m1"}
+            store.set_status(campaign_id, 'running')
+            mock_client.send_text.reset_mock()
+            assert runner.invoke(cli, args).exit_code == 0
+            assert [c.args[0] for c in mock_client.send_text.call_args_list] == ["5511999999991"]
+            assert store.get_campaign(campaign_id)['stats'] == {"total": 3, "sent": 3, "failed": 0}
+
+def test_campaigns_start_server_engine():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n5511999999993,Caio\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            folders = iter(["f1", "f2"])
+            mock_client._post.side_effect = lambda endpoint, json, idempotency_key: {"folder_id": next(folders), "status": "queued"}
+            mock_client._get.return_value = [
+                {"id": "f1", "status": "sending", "log_sucess": 1, "log_failed": 0},
+                {"id": "other", "status": "done", "log_sucess": 50, "log_failed": 0},
+            ]
+
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'Bulk', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--engine', 'server', '--chunk-size', '2',
+                '--delay-min', '3', '--delay-max', '6'
+            ])
+            assert result.exit_code == 0, result.output
+
+            payloads = [c.kwargs['json'] for c in mock_client._post.call_args_list]
+            assert [c.args[0] for c in mock_client._post.call_args_list] == ["/sender/advanced"] * 2
+            assert payloads[0]['messages'] == [
+                {"number": "5511999999991", "type": "text", "text": "Hi Ana"},
+                {"number": "5511999999992", "type": "text", "text": "Hi Bia"},
+            ]
+            assert (payloads[0]['delayMin'], payloads[0]['delayMax']) == (3, 6)
+            assert len(payloads[1]['messages']) == 1
+            mock_client.send_text.assert_not_called()
+
+            store = CampaignStore('zaptos_campaigns.db')
+            campaign = store.get_campaign(campaign_id)
+            assert (campaign['status'], campaign['engine'], campaign['checkpoint']) == ('running', 'server', 3)
+            assert campaign['stats']['sent'] == 1
+            assert store.recipient_status(campaign_id, "5511999999993") == 'queued'
+
+            # Later polls only move the counters by what changed
+            mock_client._get.return_value = [
+                {"id": "f1", "status": "done", "log_sucess": 2, "log_failed": 0},
+                {"id": "f2", "status": "done", "log_sucess": 0, "log_failed": 1},
+            ]
+            status = json.loads(runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', 'campaigns', 'status', campaign_id
+            ]).output)
+            assert status['status'] == 'completed'
+            assert status['stats'] == {"total": 3, "sent": 2, "failed": 1}
+
+def test_campaigns_start_server_wait_finishes_by_counts_and_missing_folders():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n5511999999991\n5511999999992\n5511999999993\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.time.sleep'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            folders = iter(["f1", "f2"])
+            mock_client._post.side_effect = lambda endpoint, json, idempotency_key: {"folder_id": next(folders)}
+            # f1 never reports "done" but has settled every message; f2 drops out of the listing
+            listings = iter([
+                [{"id": "f1", "status": "sending", "log_sucess": 1, "log_failed": 0, "log_total": 2},
+                 {"id": "f2", "status": "sending", "log_sucess": 1, "log_failed": 0, "log_total": 1}],
+            ])
+            mock_client._get.side_effect = lambda endpoint: next(listings, [
+                {"id": "f1", "status": "sending", "log_sucess": 1, "log_failed": 1, "log_total": 2},
+            ])
+
+            created = runner.invoke(cli, ['campaigns', 'create', '--name', 'Bulk', '--contacts', 'contacts.csv', '--template', 'Hi'])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--engine', 'server', '--chunk-size', '2', '--wait'
+            ])
+            assert result.exit_code == 0, result.output
+            assert mock_client._get.call_count == 1 + campaigns_module.MISSING_FOLDER_POLLS
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)
+            assert campaign['status'] == 'completed'
+            assert campaign['stats'] == {"total": 3, "sent": 2, "failed": 1}
+
+def test_campaigns_start_server_wait_timeout():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n5511999999991\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.time.monotonic', side_effect=itertools.count(0, 25)), \
+             patch('zaptos.endpoints.campaigns.time.sleep') as mock_sleep, \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client._post.return_value = {"folder_id": "f1"}
+            mock_client._get.return_value = [{"id": "f1", "status": "scheduled", "log_sucess": 0, "log_failed": 0}]
+
+            created = runner.invoke(cli, ['campaigns', 'create', '--name', 'Bulk', '--contacts', 'contacts.csv', '--template', 'Hi'])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--engine', 'server', '--wait', '--timeout', '60'
+            ])
+            assert result.exit_code == 0, result.output
+            assert "Still sending after 60s" in result.output
+            assert mock_sleep.call_count == 2  # at 25s and 50s; 75s is past the deadline
+            assert CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)['status'] == 'running'
+
+def test_campaigns_list_pause_delete():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('campaigns.json', 'w') as f:
+            json.dump({"old1": {
+                "id": "old1", "name": "Legacy", "created_at": "2024-01-01T00:00:00",
+                "status": "completed", "template": "Hi", "source": "ghl", "source_config": "vip",
+                "stats": {"total": 3, "sent": 3, "failed": 0}
+            }}, f)
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='campaigns.db'):
+            created = runner.invoke(cli, ['campaigns', 'create', '--name', 'New', '--ghl-tag', 't', '--template', 'Hi'])
+            new_id = json.loads(created.output)['id']
+
+            listed = json.loads(runner.invoke(cli, ['campaigns', 'list']).output)
+            assert [c['id'] for c in listed] == ['old1', new_id]
+            completed = json.loads(runner.invoke(cli, ['campaigns', 'list', '--status', 'completed']).output)
+            assert [c['stats'] for c in completed] == [{"total": 3, "sent": 3, "failed": 0}]
+
+            assert json.loads(runner.invoke(cli, ['campaigns', 'pause', new_id]).output) == {"status": "paused"}
+            assert json.loads(runner.invoke(cli, ['campaigns', 'status', new_id]).output)['status'] == 'paused'
+
+            assert json.loads(runner.invoke(cli, ['campaigns', 'delete', 'old1']).output) == {"status": "deleted"}
+            assert 'Campaign not found' in runner.invoke(cli, ['campaigns', 'status', 'old1']).output
 
 def test_flows_simulator():
     runner = CliRunner()
@@ -96,7 +382,7 @@ def test_config_overrides():
     runner = CliRunner()
 
     with temporary_command(cli, 'test-config'):
-        with patch('zaptos.cli.ZaptosClient') as MockZaptosClient:
+        with patch('zaptos.client.ZaptosClient') as MockZaptosClient:
             result = runner.invoke(cli, [
                 '--instance', 'inst1',
                 '--token', 'tok1',
@@ -114,13 +400,14 @@ def test_config_overrides():
             assert data['ghl_location'] == 'loc1'
             assert data['output'] == 'text'
 
-            MockZaptosClient.assert_called_with(instance='inst1', token='tok1')
+            # Clients are only built when a command uses them
+            MockZaptosClient.assert_not_called()
 
 def test_client_initialization_partial():
     runner = CliRunner()
 
     with temporary_noop_command(cli, 'test-partial'):
-        with patch('zaptos.cli.ZaptosClient') as MockZaptosClient:
+        with patch('zaptos.client.ZaptosClient') as MockZaptosClient:
              # Ensure clean state for config before invocation (handled by fixture)
              # But reset_config restores AFTER test, we need clean start too if env polluted config initially
              # We can manually reset config fields here to ensure no carry over from environment
@@ -139,8 +426,8 @@ def test_client_initialization_partial():
 def test_ghl_client_initialization():
     runner = CliRunner()
 
-    with temporary_noop_command(cli, 'test-ghl'):
-        with patch('zaptos.cli.GHLClient') as MockGHLClient:
+    with temporary_client_command(cli, 'test-ghl'):
+        with patch('zaptos.ghl.GHLClient') as MockGHLClient, patch('zaptos.client.ZaptosClient') as MockZaptosClient:
             # Clear existing config
             zaptos_config.ghl_api_key = ""
             zaptos_config.ghl_location_id = ""
@@ -151,5 +438,491 @@ def test_ghl_client_initialization():
                 'test-ghl'
             ])
 
-            assert result.exit_code == 0
-            MockGHLClient.assert_called_with(api_key='ghl_key_1', location_id='ghl_loc_1')
+            assert result.exit_code == 0, result.output
+            MockGHLClient.assert_called_once_with(api_key='ghl_key_1', location_id='ghl_loc_1')
+
+            zaptos_config.zaptos_rate_limit, original_rate = 2.0, zaptos_config.zaptos_rate_limit
+            try:
+                result = runner.invoke(cli, ['--instance', 'inst1', '--token', 'tok1', 'test-ghl'])
+            finally:
+                zaptos_config.zaptos_rate_limit = original_rate
+            assert result.exit_code == 0, result.output
+            MockZaptosClient.assert_called_once_with(instance='inst1', token='tok1')
+            MockZaptosClient.return_value.set_rate_limit.assert_called_once_with(2.0)
+
+def test_contacts_list_served_from_index():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._get.return_value = [
+                {"jid": "5511999990001@s.whatsapp.net", "contactName": "Ana Maria"},
+                {"jid": "5511999990002@s.whatsapp.net", "contactName": "Bia"},
+            ]
+            args = ['--instance', 'inst', '--token', 'tok', 'contacts', 'list', '--query', 'ana']
+            first = runner.invoke(cli, args)
+            second = runner.invoke(cli, args)
+            runner.invoke(cli, args + ['--refresh'])
+
+        assert first.exit_code == 0, first.output
+        assert [c["number"] for c in json.loads(first.stdout)] == ["5511999990001"]
+        assert json.loads(second.stdout) == json.loads(first.stdout)
+        # Loaded once, then again only when forced
+        assert MockZaptosClient.return_value._get.call_count == 2
+
+def test_contacts_list_reloads_after_a_partial_answer():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._get.return_value = {
+                "contacts": [{"jid": "5511999990001@s.whatsapp.net", "contactName": "Ana"}], "total": 2,
+            }
+            args = ['--instance', 'inst', '--token', 'tok', 'contacts', 'list']
+            first = runner.invoke(cli, args)
+            runner.invoke(cli, args)
+
+        assert [c["number"] for c in json.loads(first.stdout)] == ["5511999990001"]
+        assert "part of the address book" in first.stderr
+        # Not marked fresh, so the second list asks again
+        assert MockZaptosClient.return_value._get.call_count == 2
+
+def test_contacts_get_fetches_details_once():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._post.return_value = {"wa_chatid": "5511999990001@s.whatsapp.net", "name": "Ana"}
+            args = ['--instance', 'inst', '--token', 'tok', 'contacts', 'get', '+5511999990001']
+            first = runner.invoke(cli, args)
+            second = runner.invoke(cli, args)
+
+        assert json.loads(first.stdout)["name"] == "Ana"
+        assert json.loads(second.stdout)["name"] == "Ana"
+        MockZaptosClient.return_value._post.assert_called_once_with("/chat/details", json={"number": "+5511999990001"})
+
+def test_campaigns_start_fills_missing_names_from_index():
+    from zaptos.contactindex import ContactIndex
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,\n5511999999992,Bia\n")
+        ContactIndex('contacts.db').upsert([{"number": "+55 11 99999-9991", "name": "Ana"}], 'zaptos')
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', json.loads(created.output)['id'], '--rate', '0'
+            ])
+
+        assert result.exit_code == 0, result.output
+        sent = {c.args for c in mock_client.send_text.call_args_list}
+        assert sent == {("5511999999991", "Hi Ana"), ("5511999999992", "Hi Bia")}
+
+def test_campaigns_start_normalizes_and_dedups_numbers():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write('number,name\n"(11) 99999-9991",Ana\n+55 11 99999-9991,Ana again\n123,Bad\n5511999999992,Bia\n')
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', json.loads(created.output)['id'], '--rate', '0', '--default-country', '55'
+            ])
+
+        assert result.exit_code == 0, result.output
+        sent = {c.args for c in mock_client.send_text.call_args_list}
+        assert sent == {("5511999999991", "Hi Ana"), ("5511999999992", "Hi Bia")}
+        assert "'invalid': 1, 'duplicate': 1" in result.stderr
+
+def test_campaigns_validate_then_start_skips_unregistered_numbers():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n5511999999993,Caio\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.get_checks_db', return_value='checks.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.check_numbers.side_effect = lambda numbers: [
+                {"query": n, "isInWhatsapp": not n.endswith("2")} for n in numbers
+            ]
+            mock_client.send_text.return_value = {"messageId": "m"}
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            validated = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'campaigns', 'validate', campaign_id])
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--rate', '0', '--validate'
+            ])
+
+        assert validated.exit_code == 0, validated.output
+        summary = json.loads(validated.stdout)
+        assert (summary["valid"], summary["invalid"], summary["checked"]) == (2, 1, 3)
+
+        assert result.exit_code == 0, result.output
+        # Answered from the cache filled by validate
+        assert mock_client.check_numbers.call_count == 1
+        assert {c.args[0] for c in mock_client.send_text.call_args_list} == {"5511999999991", "5511999999993"}
+        store = CampaignStore('zaptos_campaigns.db')
+        assert store.get_recipient(campaign_id, "5511999999992")["error"] == "Number is not on WhatsApp"
+        campaign = store.get_campaign(campaign_id)
+        assert campaign['stats'] == {"total": 3, "sent": 2, "failed": 1}
+        assert campaign['checkpoint'] == 3
+
+def test_campaigns_template_uses_any_column():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name,city\n5511999999991,ana,Rio\n5511999999992,,\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            bad = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name|shout}}'
+            ])
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv',
+                '--template', 'Hi {{name|default:"friend"|title}} in {{city|default:"town"}}'
+            ])
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', json.loads(created.output)['id'], '--rate', '0'
+            ])
+
+        assert "Unknown filter 'shout'" in bad.stderr
+        assert result.exit_code == 0, result.output
+        sent = {c.args for c in mock_client.send_text.call_args_list}
+        assert sent == {("5511999999991", "Hi Ana in Rio"), ("5511999999992", "Hi Friend in town")}
+
+def test_campaigns_prepare_then_start_from_spool():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n5511999999991,Ana\n5511999999992,Bia\n5511999999992,Bia again\n5511999999993,Caio\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.get_spool_path', side_effect=lambda cid: f'{cid}.spool'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            prepared = runner.invoke(cli, ['campaigns', 'prepare', campaign_id])
+            assert prepared.exit_code == 0, prepared.output
+            assert json.loads(prepared.stdout)["records"] == 3
+
+            # The source is no longer needed; resume the spool after its first record
+            os.remove('contacts.csv')
+            CampaignStore('zaptos_campaigns.db').set_checkpoint(campaign_id, 1)
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', 'campaigns', 'start', campaign_id, '--rate', '0'
+            ])
+            again = runner.invoke(cli, ['campaigns', 'prepare', campaign_id])
+
+            assert result.exit_code == 0, result.output
+            sent = {c.args for c in mock_client.send_text.call_args_list}
+            assert sent == {("5511999999992", "Hi Bia"), ("5511999999993", "Hi Caio")}
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)
+            assert (campaign['status'], campaign['checkpoint'], campaign['stats']['total']) == ('completed', 3, 3)
+            assert "already been started" in again.stderr
+
+            runner.invoke(cli, ['campaigns', 'delete', campaign_id])
+            assert not os.path.exists(f'{campaign_id}.spool')
+
+def test_campaigns_pause_stops_start_and_resume_continues():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number,name\n" + "".join(f"551199999999{i},N{i}\n" for i in range(1, 6)))
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.STATUS_TICK', 0), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi {{name}}'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            # Paused from "another terminal" while the second message goes out
+            def fake_send(number, text, idempotency_key=None):
+                if number.endswith("2"):
+                    runner.invoke(cli, ['campaigns', 'pause', campaign_id])
+                return {"messageId": number}
+
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.side_effect = fake_send
+
+            args = ['--instance', 'inst', '--token', 'tok', 'campaigns', 'start', campaign_id, '--workers', '1', '--rate', '0']
+            paused = runner.invoke(cli, args)
+            assert paused.exit_code == 0, paused.output
+            assert "stopped sending" in paused.stderr
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)
+            assert (campaign['status'], campaign['checkpoint']) == ('paused', 2)
+            assert mock_client.send_text.call_count == 2
+
+            assert json.loads(runner.invoke(cli, ['campaigns', 'resume', campaign_id]).stdout) == {"status": "running"}
+            mock_client.send_text.side_effect = None
+            mock_client.send_text.return_value = {"messageId": "m"}
+            resumed = runner.invoke(cli, args)
+
+            assert resumed.exit_code == 0, resumed.output
+            assert [c.args[0][-1] for c in mock_client.send_text.call_args_list] == ["1", "2", "3", "4", "5"]
+            assert json.loads(resumed.stdout)['status'] == 'completed'
+
+            assert json.loads(runner.invoke(cli, ['campaigns', 'cancel', campaign_id]).stdout) == {"status": "cancelled"}
+            assert "already cancelled" in runner.invoke(cli, args).stderr
+
+def test_campaigns_run_scheduler_interleaves_detached_campaigns_by_weight():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('a.csv', 'w') as f:
+            f.write("number\n" + "".join(f"551190000000{i}\n" for i in range(1, 5)))
+        with open('b.csv', 'w') as f:
+            f.write("number\n" + "".join(f"551180000000{i}\n" for i in range(1, 5)))
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            ids = []
+            for name, weight in (('a', '2'), ('b', '1')):
+                created = runner.invoke(cli, [
+                    'campaigns', 'create', '--name', name, '--contacts', f'{name}.csv', '--template', 'Hi'
+                ])
+                ids.append(json.loads(created.output)['id'])
+                detached = runner.invoke(cli, ['campaigns', 'start', ids[-1], '--detach', '--weight', weight])
+                assert json.loads(detached.stdout)['status'] == 'running'
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'run-scheduler', '--workers', '1', '--rate', '0', '--tick', '0', '--exit-when-idle'
+            ])
+
+            assert result.exit_code == 0, result.output
+            order = ["a" if c.args[0].startswith("551190") else "b" for c in mock_client.send_text.call_args_list]
+            assert order == ["a", "b", "a", "a", "b", "a", "b", "b"]
+            store = CampaignStore('zaptos_campaigns.db')
+            for campaign_id in ids:
+                campaign = store.get_campaign(campaign_id)
+                assert (campaign['status'], campaign['stats']['sent']) == ('completed', 4)
+
+def test_campaigns_run_scheduler_fails_only_the_broken_campaign():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('good.csv', 'w') as f:
+            f.write("number\n" + "".join(f"551190000000{i}\n" for i in range(1, 5)))
+        with open('bad.csv', 'w') as f:
+            f.write("number\n5511800000001\n5511800000002\n")
+        real_iter_csv = campaigns_module.iter_csv_projected
+
+        def iter_csv(path, projection):
+            for i, row in enumerate(real_iter_csv(path, projection)):
+                if path == 'bad.csv' and i == 1:
+                    raise csv.Error("malformed row")
+                yield row
+
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.endpoints.campaigns.iter_csv_projected', side_effect=iter_csv), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.return_value = {"messageId": "m"}
+            ids = {}
+            for name in ('bad', 'good'):
+                created = runner.invoke(cli, [
+                    'campaigns', 'create', '--name', name, '--contacts', f'{name}.csv', '--template', 'Hi'
+                ])
+                ids[name] = json.loads(created.output)['id']
+                runner.invoke(cli, ['campaigns', 'start', ids[name], '--detach'])
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'run-scheduler', '--workers', '1', '--rate', '0', '--tick', '0', '--exit-when-idle'
+            ])
+
+            assert result.exit_code == 0, result.output
+            assert f"Campaign {ids['bad']} failed: malformed row" in result.stderr
+            assert result.stderr.count("Scheduling campaign") == 2
+            store = CampaignStore('zaptos_campaigns.db')
+            assert store.get_campaign(ids['bad'])['status'] == 'failed'
+            good = store.get_campaign(ids['good'])
+            assert (good['status'], good['stats']['sent']) == ('completed', 4)
+
+def test_campaigns_start_refuses_campaign_running_under_scheduler():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n5511999999991\n")
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            created = runner.invoke(cli, ['campaigns', 'create', '--name', 'Bulk', '--contacts', 'contacts.csv', '--template', 'Hi'])
+            campaign_id = json.loads(created.output)['id']
+            runner.invoke(cli, ['campaigns', 'start', campaign_id, '--detach'])
+
+            result = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'campaigns', 'start', campaign_id, '--rate', '0'])
+            assert f"run `zaptos campaigns pause {campaign_id}` first" in result.stderr
+            MockZaptosClient.return_value.send_text.assert_not_called()
+
+            runner.invoke(cli, ['campaigns', 'pause', campaign_id])
+            result = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'campaigns', 'start', campaign_id, '--rate', '0'])
+            assert result.exit_code == 0, result.output
+            MockZaptosClient.return_value.send_text.assert_called_once()
+            campaign = CampaignStore('zaptos_campaigns.db').get_campaign(campaign_id)
+            assert (campaign['status'], campaign['engine']) == ('completed', 'local')
+
+def test_campaigns_start_spreads_recipients_over_pool():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n" + "".join(f"55119000000{i:02d}\n" for i in range(20)))
+        sent = {}
+
+        def make_client(instance, token):
+            client = MagicMock()
+            client.instance = instance
+            client.instance_status.return_value = {"status": {"connected": instance != "down"}}
+            client.send_text.side_effect = lambda number, text, idempotency_key=None: sent.setdefault(number, instance)
+            return client
+
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.pool.ZaptosClient', side_effect=make_client):
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'Pool', '--contacts', 'contacts.csv', '--template', 'Hi'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                'campaigns', 'start', campaign_id, '--rate', '0', '--pool', 'a:t1,b:t2', '--pool', 'down:t3'
+            ])
+
+            assert result.exit_code == 0, result.output
+            assert json.loads(result.stdout)['stats']['sent'] == 20
+            assert set(sent.values()) == {"a", "b"}
+            assert "not connected" in result.stderr and "down" in result.stderr
+
+def test_campaigns_start_adaptive_concurrency():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('contacts.csv', 'w') as f:
+            f.write("number\n" + "".join(f"55119000000{i:02d}\n" for i in range(30)))
+        with patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value='zaptos_campaigns.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            mock_client = MockZaptosClient.return_value
+            mock_client.timings = ResponseTimings()
+
+            def fake_send(number, text, idempotency_key=None):
+                mock_client.timings.record(0.01, 200)
+                return {"messageId": number}
+
+            mock_client.send_text.side_effect = fake_send
+            created = runner.invoke(cli, [
+                'campaigns', 'create', '--name', 'CSV', '--contacts', 'contacts.csv', '--template', 'Hi'
+            ])
+            campaign_id = json.loads(created.output)['id']
+
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok',
+                'campaigns', 'start', campaign_id, '--workers', '8', '--rate', '0', '--adaptive'
+            ])
+
+            assert result.exit_code == 0, result.output
+            assert json.loads(result.stdout)['stats']['sent'] == 30
+            assert "Concurrency ended at" in result.stderr and "of 8" in result.stderr
+
+def test_messages_send_async_then_outbox_drain():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with patch('zaptos.endpoints.outbox.get_outbox_db', return_value='outbox.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            # Queuing needs no credentials and sends nothing
+            queued = [
+                json.loads(runner.invoke(cli, ['messages', 'send', number, '--text', 'Hi', '--async']).stdout)
+                for number in ('5511999990001', '5511999990002')
+            ]
+            image = runner.invoke(cli, ['messages', 'send', '5511999990003', '--image', 'http://x/a.png', '--async'])
+            assert [q['status'] for q in queued] == ['pending', 'pending']
+            assert MockZaptosClient.call_count == 0
+            bad = runner.invoke(cli, ['messages', 'send', '5511999990004', '--async'])
+            assert "No message content provided" in bad.stderr
+
+            mock_client = MockZaptosClient.return_value
+            mock_client.send_text.side_effect = [{"messageId": "m1"}, RuntimeError("timeout")]
+            mock_client.send_image.return_value = {"messageId": "m3"}
+            drained = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'outbox', 'drain', '--workers', '1'])
+
+            assert drained.exit_code == 0, drained.output
+            assert json.loads(drained.stdout) == {"sent": 2, "retrying": 1, "failed": 0, "pending": 1}
+            mock_client.send_image.assert_called_once()
+            assert mock_client.send_image.call_args.kwargs['url'] == 'http://x/a.png'
+            first = json.loads(runner.invoke(cli, ['outbox', 'status', queued[0]['id']]).stdout)
+            assert (first['status'], first['result']) == ('sent', {"messageId": "m1"})
+            second = json.loads(runner.invoke(cli, ['outbox', 'status', queued[1]['id']]).stdout)
+            assert (second['status'], second['error'], second['attempts']) == ('pending', 'timeout', 1)
+            assert json.loads(image.stdout)['status'] == 'pending'
+
+def test_messages_send_batch_streams_ndjson_results():
+    runner = CliRunner()
+    jobs = "\n".join([
+        json.dumps({"id": "a", "number": "5511999990001", "text": "Hi"}),
+        json.dumps({"number": "5511999990002", "buttons": {"title": "Vote", "buttons": [{"id": "1", "text": "Up"}]}}),
+        "not json",
+        json.dumps({"number": "5511999990003"}),
+        "",
+        json.dumps({"id": "b", "number": "5511999990004", "image": "http://x/a.png", "idempotency_key": "k-4"}),
+    ]) + "\n"
+    with patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+        mock_client = MockZaptosClient.return_value
+        mock_client.send_text.return_value = {"messageId": "m1"}
+        mock_client.send_buttons.return_value = {"messageId": "m2"}
+        mock_client.send_image.side_effect = RuntimeError("boom")
+
+        result = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'messages', 'send-batch'], input=jobs)
+
+        assert result.exit_code == 0, result.output
+        lines = {line['line']: line for line in map(json.loads, result.stdout.splitlines())}
+        assert lines[1] == {"line": 1, "id": "a", "number": "5511999990001", "ok": True, "result": {"messageId": "m1"}}
+        assert lines[2]['ok'] and lines[2]['result'] == {"messageId": "m2"}
+        assert not lines[3]['ok'] and lines[4]['error'] == "No message content provided. Use --text, --image, etc."
+        assert lines[6] == {"line": 6, "id": "b", "number": "5511999990004", "ok": False, "error": "boom"}
+        assert sorted(lines) == [1, 2, 3, 4, 6]
+        mock_client.send_buttons.assert_called_once_with(
+            "5511999990002", title="Vote", buttons=[{"id": "1", "text": "Up"}], description=None, idempotency_key=None
+        )
+        assert mock_client.send_image.call_args.kwargs['idempotency_key'] == "k-4"
+        assert "Sent 2, failed 3" in result.stderr
+
+def test_messages_send_batch_reports_wrongly_typed_lines():
+    runner = CliRunner()
+    jobs = "\n".join([
+        json.dumps({"number": "2", "buttons": "5"}),
+        json.dumps({"number": "1", "location": 5}),
+        json.dumps({"number": "3", "text": "Hi"}),
+    ]) + "\n"
+    with patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+        MockZaptosClient.return_value.send_text.return_value = {"messageId": "m3"}
+
+        result = runner.invoke(cli, ['--instance', 'inst', '--token', 'tok', 'messages', 'send-batch'], input=jobs)
+
+    assert result.exit_code == 0, result.output
+    lines = {line['line']: line for line in map(json.loads, result.stdout.splitlines())}
+    assert lines[1]['error'] == "Buttons JSON must contain 'title' and 'buttons' array"
+    assert lines[2]['error'] == "'location' must be a string"
+    assert lines[3]['ok'] and lines[3]['result'] == {"messageId": "m3"}
+    assert "Sent 1, failed 2" in result.stderr
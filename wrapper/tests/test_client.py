@@ -2,7 +2,9 @@ import pytest
 import respx
 import httpx
 import json
-from zaptos.client import ZaptosClient
+import asyncio
+from zaptos.client import ZaptosClient, AsyncZaptosClient, _ZaptosBase
+from zaptos.ghl import AsyncGHLClient
 
 @pytest.fixture
 def client():
@@ -25,6 +27,23 @@ def test_send_text(client):
     }
     assert respx.calls.last.request.headers["token"] == "test_token"
 
+@respx.mock
+def test_check_numbers(client):
+    respx.post("https://api.zaptoswpp.com/test_instance/chat/check").mock(
+        return_value=httpx.Response(200, json=[{"query": "5511999990001", "isInWhatsapp": True}])
+    )
+
+    assert client.check_numbers(["5511999990001"]) == [{"query": "5511999990001", "isInWhatsapp": True}]
+    assert json.loads(respx.calls.last.request.content) == {"numbers": ["5511999990001"]}
+
+@respx.mock
+def test_instance_status(client):
+    respx.get("https://api.zaptoswpp.com/test_instance/instance/status").mock(
+        return_value=httpx.Response(200, json={"status": {"connected": True, "loggedIn": True}})
+    )
+
+    assert client.instance_status() == {"status": {"connected": True, "loggedIn": True}}
+
 @respx.mock
 def test_send_image(client):
     respx.post("https://api.zaptoswpp.com/test_instance/send-image").mock(
@@ -284,3 +303,80 @@ def test_generic_methods(client):
         return_value=httpx.Response(200, json={"deleted": True})
     )
     assert client._delete("/some-endpoint") == {"deleted": True}
+
+@respx.mock
+def test_generic_put(client):
+    respx.put("https://api.zaptoswpp.com/test_instance/templates/promo").mock(
+        return_value=httpx.Response(200, json={"updated": True})
+    )
+    assert client._put("/templates/promo", json={"name": "promo"}) == {"updated": True}
+
+@respx.mock
+def test_async_send_text():
+    respx.post("https://api.zaptoswpp.com/test_instance/send-text").mock(
+        return_value=httpx.Response(200, json={"status": "success", "messageId": "123"})
+    )
+
+    async def run():
+        async with AsyncZaptosClient(instance="test_instance", token="test_token") as client:
+            return await asyncio.gather(*(client.send_text(number=str(n), text="Hello") for n in range(5)))
+
+    responses = asyncio.run(run())
+
+    assert [r["messageId"] for r in responses] == ["123"] * 5
+    assert respx.calls.call_count == 5
+    assert respx.calls.last.request.headers["token"] == "test_token"
+
+@respx.mock
+def test_async_send_document_and_error():
+    respx.post("https://api.zaptoswpp.com/test_instance/send-document").mock(
+        return_value=httpx.Response(200, json={"status": "success"})
+    )
+    respx.post("https://api.zaptoswpp.com/test_instance/send-sticker").mock(
+        return_value=httpx.Response(403, json={"error": "Forbidden"})
+    )
+
+    async def run():
+        client = AsyncZaptosClient(instance="test_instance", token="test_token")
+        try:
+            await client.send_document(number="123", url="http://example.com/doc.pdf", filename="doc.pdf")
+            assert json.loads(respx.calls.last.request.content) == {
+                "number": "123",
+                "url": "http://example.com/doc.pdf",
+                "filename": "doc.pdf"
+            }
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.send_sticker(number="123", url="http://example.com/s.webp")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+@respx.mock
+def test_async_ghl_client():
+    route = respx.get("https://rest.gohighlevel.com/v1/contacts").mock(
+        return_value=httpx.Response(200, json={"contacts": [{"id": "c1", "phone": "+5511999999999"}]})
+    )
+
+    async def run():
+        ghl = AsyncGHLClient(api_key="key", location_id="loc")
+        try:
+            return await ghl.get_contacts_by_tag("vip")
+        finally:
+            await ghl.aclose()
+
+    contacts = asyncio.run(run())
+
+    assert contacts == [{"id": "c1", "phone": "+5511999999999"}]
+    params = route.calls.last.request.url.params
+    assert params["query"] == "vip"
+    assert params["locationId"] == "loc"
+    assert route.calls.last.request.headers["Authorization"] == "Bearer key"
+
+def test_client_without_transport_fails_at_construction():
+    class Incomplete(_ZaptosBase):
+        def _get(self, endpoint, params=None):
+            return {}
+
+    with pytest.raises(TypeError):
+        Incomplete(instance="test_instance", token="test_token")
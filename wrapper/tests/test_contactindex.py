@@ -0,0 +1,47 @@
+import pytest
+from zaptos.contactindex import ContactIndex, zaptos_contact
+
+@pytest.fixture
+def index(tmp_path):
+    index = ContactIndex(str(tmp_path / "contacts.db"))
+    yield index
+    index.close()
+
+def test_upsert_and_get_by_any_format(index):
+    index.upsert([{"number": "+55 (11) 99999-0001", "name": "Ana Maria"}], 'zaptos')
+    contact = index.get("5511999990001")
+    assert (contact["number"], contact["name"], contact["source"]) == ("+55 (11) 99999-0001", "Ana Maria", "zaptos")
+    assert index.get("5511999990002") is None
+
+def test_upsert_keeps_known_fields(index):
+    index.upsert([{"number": "5511999990001", "name": "Ana", "ghl_id": "g1"}], 'ghl')
+    index.upsert([{"number": "5511999990001", "name": None}], 'zaptos')
+    contact = index.get("5511999990001")
+    assert (contact["name"], contact["ghl_id"]) == ("Ana", "g1")
+
+def test_search_by_name_prefix_and_digits(index):
+    index.upsert([
+        {"number": "5511999990001", "name": "Ana Maria"},
+        {"number": "5521988880002", "name": "Mariana Souza"},
+        {"number": "5511977770003", "name": 'Bob "the" Builder'},
+    ], 'zaptos')
+    assert sorted(c["name"] for c in index.search("mari")) == ["Ana Maria", "Mariana Souza"]
+    assert [c["name"] for c in index.search("ana mar")] == ["Ana Maria"]
+    assert [c["name"] for c in index.search('"the')] == ['Bob "the" Builder']
+    assert [c["name"] for c in index.search("5521")] == ["Mariana Souza"]
+
+def test_renamed_contact_is_searchable_by_new_name(index):
+    index.upsert([{"number": "5511999990001", "name": "Ana"}], 'zaptos')
+    index.upsert([{"number": "5511999990001", "name": "Beatriz"}], 'zaptos')
+    assert index.search("ana") == []
+    assert [c["name"] for c in index.search("bea")] == ["Beatriz"]
+
+def test_freshness(index):
+    assert not index.is_fresh('zaptos', 60)
+    index.mark_refreshed('zaptos')
+    assert index.is_fresh('zaptos', 60)
+    assert not index.is_fresh('zaptos', 0)
+
+def test_zaptos_contact_shapes():
+    assert zaptos_contact({"jid": "5511999990001@s.whatsapp.net", "contactName": "Ana"}) == {"number": "5511999990001", "name": "Ana"}
+    assert zaptos_contact({"wa_chatid": "5511999990001@s.whatsapp.net", "wa_name": "Ana"}) == {"number": "5511999990001", "name": "Ana"}
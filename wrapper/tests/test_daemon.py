@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import threading
+import pytest
+from unittest.mock import patch
+from zaptos.config import config as zaptos_config
+from zaptos.daemon import Daemon, DaemonServer
+from zaptos.frontend import command_path, forward, runs_direct
+
+@pytest.fixture
+def server():
+    # AF_UNIX paths are short; pytest's tmp_path can exceed the limit
+    directory = tempfile.mkdtemp(prefix="zd")
+    path = os.path.join(directory, "d.sock")
+    saved = {name: getattr(zaptos_config, name) for name in type(zaptos_config).model_fields}
+    server = DaemonServer(path, Daemon(http2=False))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    os.rmdir(directory)
+    for name, value in saved.items():
+        setattr(zaptos_config, name, value)
+
+def test_command_path_skips_global_options():
+    assert command_path(["--instance", "i", "--debug", "messages", "send", "5511"]) == ("messages", "send")
+    assert command_path(["--output", "json", "campaigns", "start", "c1"]) == ("campaigns", "start")
+    assert command_path(["--help"]) == ()
+
+def test_runs_direct():
+    assert runs_direct(["campaigns", "start", "c1"])
+    assert runs_direct(["--token", "outbox", "outbox", "drain"])
+    # Prompts for button choices
+    assert runs_direct(["flows", "test", "welcome", "--simulate"])
+    assert not runs_direct(["outbox", "status"])
+    assert not runs_direct(["messages", "send", "5511", "--text", "hi"])
+
+def test_forward_without_daemon():
+    assert forward(["--help"], path=os.path.join(tempfile.gettempdir(), "zaptosd-missing.sock")) is None
+
+def test_socket_is_private(server):
+    assert os.stat(server.path).st_mode & 0o777 == 0o600
+
+def test_clients_stay_warm_between_commands(server):
+    env = {"ZAPTOS_INSTANCE": "inst1", "ZAPTOS_TOKEN": "tok1"}
+    with patch.dict(os.environ, env), patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+        MockZaptosClient.return_value.send_text.return_value = {"messageId": "m1"}
+        for _ in range(2):
+            response = forward(["messages", "send", "5511999999999", "--text", "hi"], path=server.path)
+            assert response["exit_code"] == 0, response["stderr"]
+            assert json.loads(response["stdout"]) == {"messageId": "m1"}
+
+    MockZaptosClient.assert_called_once_with(instance="inst1", token="tok1")
+    assert MockZaptosClient.return_value.send_text.call_count == 2
+
+def test_commands_use_the_callers_environment(server):
+    with patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+        with patch.dict(os.environ, {"ZAPTOS_INSTANCE": "inst1", "ZAPTOS_TOKEN": "tok1"}):
+            forward(["messages", "send", "5511", "--text", "hi"], path=server.path)
+        with patch.dict(os.environ, {"ZAPTOS_INSTANCE": "inst2", "ZAPTOS_TOKEN": "tok2"}):
+            forward(["messages", "send", "5511", "--text", "hi"], path=server.path)
+
+    assert [c.kwargs["instance"] for c in MockZaptosClient.call_args_list] == ["inst1", "inst2"]
+    assert len(server.daemon.clients) == 2
+
+def test_usage_errors_keep_their_exit_code(server):
+    response = forward(["messages", "no-such-command"], path=server.path)
+    assert response["exit_code"] == 2
+    assert "No such command" in response["stderr"]
+    assert response["stdout"] == ""
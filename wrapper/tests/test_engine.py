@@ -0,0 +1,129 @@
+import threading
+import time
+import pytest
+from zaptos.engine import AdaptiveLimit, SendEngine
+from zaptos.transport import ResponseTimings
+
+def test_per_key_ordering_and_concurrency():
+    seen = {}
+    lock = threading.Lock()
+    threads = set()
+
+    def send(payload):
+        key, seq = payload
+        threads.add(threading.get_ident())
+        time.sleep(0.001)
+        return seq
+
+    def on_result(payload, result, error):
+        with lock:
+            seen.setdefault(payload[0], []).append(result)
+
+    jobs = [(f"55{k}", (f"55{k}", seq)) for seq in range(20) for k in range(8)]
+    SendEngine(workers=4).run(jobs, send, on_result)
+
+    assert sorted(seen) == sorted({f"55{k}" for k in range(8)})
+    for results in seen.values():
+        assert results == list(range(20))
+    assert len(threads) > 1
+
+def test_errors_are_reported_per_job():
+    results = []
+
+    def send(payload):
+        if payload == "bad":
+            raise RuntimeError("boom")
+        return {"ok": payload}
+
+    SendEngine(workers=2).run(
+        [("a", "good"), ("b", "bad")],
+        send,
+        lambda payload, result, error: results.append((payload, result, error))
+    )
+
+    by_payload = {p: (r, e) for p, r, e in results}
+    assert by_payload["good"] == ({"ok": "good"}, None)
+    assert isinstance(by_payload["bad"][1], RuntimeError)
+
+def test_callback_error_stops_engine():
+    def on_result(payload, result, error):
+        raise ValueError("callback failed")
+
+    engine = SendEngine(workers=1)
+    with pytest.raises(ValueError):
+        engine.run(((str(i), i) for i in range(1000)), lambda p: p, on_result)
+    assert engine.stopped
+
+def test_invalid_workers():
+    with pytest.raises(ValueError):
+        SendEngine(workers=0)
+
+def fill(limit, timings, latency, status=200):
+    # One window's worth of responses, sent with the window full
+    for _ in range(limit.window):
+        limit.acquire()
+    for _ in range(limit.window):
+        timings.record(latency, status)
+    for _ in range(limit.window):
+        limit.release()
+
+def test_adaptive_limit_grows_additively_and_halves():
+    timings = ResponseTimings()
+    limit = AdaptiveLimit(timings, maximum=10)
+    for _ in range(7):
+        fill(limit, timings, 0.1)
+    assert limit.window == 8
+
+    fill(limit, timings, 0.1, status=429)
+    assert limit.window == 4
+    fill(limit, timings, 0.1, status=503)
+    assert limit.window == 2
+    for _ in range(20):
+        fill(limit, timings, 0.1)
+    assert limit.window == 10
+
+def test_adaptive_limit_backs_off_on_latency_spike_and_adapts_to_it():
+    timings = ResponseTimings()
+    limit = AdaptiveLimit(timings, maximum=16, initial=8)
+    fill(limit, timings, 0.1)
+    assert limit.window == 9
+
+    fill(limit, timings, 0.5)
+    assert limit.window == 4
+    # A lasting slowdown becomes the new baseline and growth resumes
+    for _ in range(30):
+        fill(limit, timings, 0.5)
+    assert limit.window > 4
+
+def test_adaptive_limit_only_grows_when_full():
+    timings = ResponseTimings()
+    limit = AdaptiveLimit(timings, maximum=8, initial=4)
+    for _ in range(10):
+        limit.acquire()
+        timings.record(0.1, 200)
+        limit.release()
+    assert limit.window == 4
+
+def test_engine_window_tracks_server_capacity():
+    # The server answers quickly up to 4 concurrent requests, then throttles
+    timings = ResponseTimings()
+    limit = AdaptiveLimit(timings, maximum=16)
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def send(payload):
+        with lock:
+            in_flight[0] += 1
+            busy = in_flight[0]
+        time.sleep(0.002)
+        with lock:
+            in_flight[0] -= 1
+            peak[0] = max(peak[0], busy)
+        timings.record(0.002, 429 if busy > 4 else 200)
+
+    SendEngine(workers=16, limit=limit).run(((str(i), i) for i in range(600)), send, lambda *args: None)
+
+    assert limit.decreases and limit.increases
+    assert limit.window <= 8
+    assert peak[0] <= 16
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import threading
+import time
+import httpx
+import respx
+from unittest.mock import patch
+from click.testing import CliRunner
+from zaptos.cli import cli
+from zaptos.ghl import GHLClient, AsyncGHLClient
+
+CONTACTS_URL = "https://rest.gohighlevel.com/v1/contacts"
+
+def paged_contacts(total, page_size, max_limit=100):
+    """respx side effect serving `total` contacts with GHL cursor pagination;
+    like GHL, it never returns more than `max_limit` per page."""
+    contacts = [{"id": f"c{i}", "phone": f"+55119999{i:05d}", "firstName": f"N{i}"} for i in range(total)]
+
+    def handler(request):
+        after = request.url.params.get("startAfterId")
+        start = int(after[1:]) + 1 if after else 0
+        limit = min(int(request.url.params["limit"]), max_limit)
+        page = contacts[start:start + limit]
+        meta = {"total": total}
+        if page:
+            meta.update(startAfterId=page[-1]["id"], startAfter=1700000000000 + start + len(page))
+        return httpx.Response(200, json={"contacts": page, "meta": meta})
+
+    return handler
+
+@respx.mock
+def test_iter_contacts_follows_pagination():
+    route = respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(250, 100))
+    ghl = GHLClient(api_key="key", location_id="loc")
+
+    contacts = list(ghl.iter_contacts(query="vip"))
+
+    assert [c["id"] for c in contacts] == [f"c{i}" for i in range(250)]
+    assert route.call_count == 3
+    second = route.calls[1].request.url.params
+    assert (second["startAfterId"], second["query"], second["locationId"]) == ("c99", "vip", "loc")
+    assert second["startAfter"] == "1700000000100"
+
+@respx.mock
+def test_iter_contacts_exact_page_multiple():
+    route = respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(40, 20))
+    assert len(list(GHLClient(api_key="key").iter_contacts(page_size=20))) == 40
+    # Two full pages, then an empty one ends the iteration
+    assert route.call_count == 3
+
+@respx.mock
+def test_iter_contacts_page_size_above_ghl_maximum():
+    route = respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(300, 100))
+    assert len(list(GHLClient(api_key="key").iter_contacts(page_size=200))) == 300
+    assert route.calls[0].request.url.params["limit"] == "100"
+
+@respx.mock
+def test_async_iter_contacts():
+    respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(45, 10))
+
+    async def run():
+        ghl = AsyncGHLClient(api_key="key")
+        try:
+            return [c["id"] async for c in ghl.iter_contacts(page_size=10)]
+        finally:
+            await ghl.aclose()
+
+    assert asyncio.run(run()) == [f"c{i}" for i in range(45)]
+
+@respx.mock
+def test_sync_ghl_processes_every_page():
+    respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(30, 10))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_sync_db', return_value='sync.db'), \
+             patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', '--ghl-key', 'key',
+                'contacts', 'sync-ghl', '--page-size', '10'
+            ])
+    assert result.exit_code == 0, result.output
+    assert MockZaptosClient.return_value._post.call_count == 30
+    assert json.loads(result.stdout) == {"synced": 30, "unchanged": 0, "failed": 0, "total_ghl": 30, "dropped": {"missing": 0, "invalid": 0, "duplicate": 0}, "errors": []}
+
+def run_sync(*args):
+    with patch('zaptos.endpoints.contacts.get_sync_db', return_value='sync.db'), \
+         patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+         patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+        result = CliRunner().invoke(cli, [
+            '--instance', 'inst', '--token', 'tok', '--ghl-key', 'key', '--ghl-location', 'loc',
+            'contacts', 'sync-ghl', *args
+        ])
+    assert result.exit_code == 0, result.output
+    posted = sorted(c.kwargs['json']['number'] for c in MockZaptosClient.return_value._post.call_args_list)
+    return json.loads(result.stdout), posted
+
+@respx.mock
+def test_sync_ghl_is_incremental():
+    contacts = [
+        {"id": "a", "phone": "+551100000001", "name": "Ana", "dateUpdated": "2024-01-01T10:00:00.000Z"},
+        {"id": "b", "phone": "+551100000002", "name": "Bia", "dateUpdated": "2024-01-02T10:00:00.000Z"},
+    ]
+    respx.get(CONTACTS_URL).mock(side_effect=lambda request: httpx.Response(200, json={"contacts": contacts}))
+    with CliRunner().isolated_filesystem():
+        summary, posted = run_sync()
+        assert posted == ["551100000001", "551100000002"]
+
+        # Nothing changed since the saved mark
+        summary, posted = run_sync()
+        assert posted == []
+        assert summary == {"synced": 0, "unchanged": 2, "failed": 0, "total_ghl": 2, "dropped": {"missing": 0, "invalid": 0, "duplicate": 0}, "errors": []}
+
+        # One contact is edited in GHL, and one is touched without changing synced fields
+        contacts[0] = dict(contacts[0], name="Ana Maria", dateUpdated="2024-01-03T10:00:00.000Z")
+        contacts[1] = dict(contacts[1], email="b@x.com", dateUpdated="2024-01-03T11:00:00.000Z")
+        summary, posted = run_sync()
+        assert posted == ["551100000001"]
+        assert summary == {"synced": 1, "unchanged": 1, "failed": 0, "total_ghl": 2, "dropped": {"missing": 0, "invalid": 0, "duplicate": 0}, "errors": []}
+
+        summary, posted = run_sync('--full')
+        assert len(posted) == 2
+
+@respx.mock
+def test_sync_ghl_keeps_mark_when_a_contact_fails():
+    contacts = [{"id": "a", "phone": "+551100000001", "name": "Ana", "dateUpdated": "2024-01-01T10:00:00.000Z"}]
+    respx.get(CONTACTS_URL).mock(side_effect=lambda request: httpx.Response(200, json={"contacts": contacts}))
+    with CliRunner().isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_sync_db', return_value='sync.db'), \
+             patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._post.side_effect = Exception("boom")
+            result = CliRunner().invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', '--ghl-key', 'key', '--ghl-location', 'loc',
+                'contacts', 'sync-ghl'
+            ])
+        summary = json.loads(result.stdout)
+        assert (summary["synced"], summary["failed"]) == (0, 1)
+        assert summary["errors"] == [{"id": "a", "number": "551100000001", "error": "boom"}]
+        summary, posted = run_sync()
+        assert posted == ["551100000001"]
+
+@respx.mock
+def test_sync_ghl_since_overrides_mark():
+    contacts = [
+        {"id": "a", "phone": "+551100000001", "name": "Ana", "dateUpdated": "2023-06-01T00:00:00.000Z"},
+        {"id": "b", "phone": "+551100000002", "name": "Bia", "dateUpdated": "2024-02-01T00:00:00.000Z"},
+    ]
+    respx.get(CONTACTS_URL).mock(side_effect=lambda request: httpx.Response(200, json={"contacts": contacts}))
+    with CliRunner().isolated_filesystem():
+        summary, posted = run_sync('--since', '2024-01-01')
+        assert posted == ["551100000002"]
+
+@respx.mock
+def test_sync_ghl_upserts_concurrently():
+    respx.get(CONTACTS_URL).mock(side_effect=paged_contacts(20, 10))
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_post(endpoint, json):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.pop()
+        return {}
+
+    with CliRunner().isolated_filesystem():
+        with patch('zaptos.endpoints.contacts.get_sync_db', return_value='sync.db'), \
+             patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._post.side_effect = slow_post
+            result = CliRunner().invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', '--ghl-key', 'key',
+                'contacts', 'sync-ghl', '--page-size', '10', '--concurrency', '4'
+            ])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout)["synced"] == 20
+    assert 1 < max(peak) <= 4
+
+@respx.mock
+def test_phone_index():
+    respx.get(CONTACTS_URL).mock(return_value=httpx.Response(200, json={"contacts": [
+        {"id": "a", "phone": "+55 (11) 9999-0001"},
+        {"id": "b"},
+        {"id": "c", "phone": "(11) 99999-0002"},
+    ]}))
+    assert GHLClient(api_key="key").phone_index() == {"551199990001": "a", "11999990002": "c"}
+    # National numbers get the same default country as the numbers looked up
+    assert GHLClient(api_key="key").phone_index(default_country="55") == {
+        "551199990001": "a", "5511999990002": "c"
+    }
+
+@respx.mock
+def test_push_ghl_bulk_creates_or_updates():
+    index_route = respx.get(CONTACTS_URL).mock(return_value=httpx.Response(200, json={"contacts": [
+        {"id": "ghl-1", "phone": "+5511999990001"},
+        {"id": "ghl-4", "phone": "(11) 99999-0004"},
+    ]}))
+    create_route = respx.post(CONTACTS_URL).mock(return_value=httpx.Response(200, json={"contact": {}}))
+    update_route = respx.put(f"{CONTACTS_URL}/ghl-1").mock(return_value=httpx.Response(200, json={"contact": {}}))
+    national_route = respx.put(f"{CONTACTS_URL}/ghl-4").mock(return_value=httpx.Response(200, json={"contact": {}}))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open('numbers.csv', 'w') as f:
+            f.write("number,name\n5511999990001,Ana\n+5511999990002,Bia\n+55 11 99999-0001,Ana again\n11999990004,Duda\n")
+        with patch('zaptos.endpoints.contacts.get_contact_index_db', return_value='contacts.db'), \
+             patch('zaptos.client.ZaptosClient') as MockZaptosClient:
+            MockZaptosClient.return_value._get.return_value = [{"number": "+5511999990003", "name": "Caio"}]
+            result = runner.invoke(cli, [
+                '--instance', 'inst', '--token', 'tok', '--ghl-key', 'key',
+                'contacts', 'push-ghl', '--file', 'numbers.csv', '--default-country', '55', '+5511999990003'
+            ])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout) == {
+        "created": 2, "updated": 2, "failed": 0,
+        "dropped": {"missing": 0, "invalid": 0, "duplicate": 1}, "errors": []
+    }
+    assert index_route.call_count == 1
+    assert update_route.call_count == 1
+    # Stored in GHL without a country code, still matched
+    assert national_route.call_count == 1
+    assert json.loads(update_route.calls[0].request.content) == {"name": "Ana", "phone": "+5511999990001"}
+    created = sorted(json.loads(c.request.content)["name"] for c in create_route.calls)
+    assert created == ["Bia", "Caio"]
+    # Only the number without a name needed a Zaptos lookup
+    MockZaptosClient.return_value._get.assert_called_once_with("/contacts", params={"number": "5511999990003"})
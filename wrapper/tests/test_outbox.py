@@ -0,0 +1,85 @@
+import time
+import httpx
+import pytest
+from unittest.mock import MagicMock
+from zaptos.outbox import Outbox, deliver, is_permanent, retry_delay
+
+@pytest.fixture
+def box(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.db"))
+    yield box
+    box.close()
+
+def test_enqueue_and_claim_in_order(box):
+    first = box.enqueue("text", "5511999990001", {"text": "Hi"})
+    second = box.enqueue("image", "5511999990002", {"url": "http://x/y.png", "caption": None})
+
+    claimed = box.claim(10)
+
+    assert [m["id"] for m in claimed] == [first, second]
+    assert claimed[0]["args"] == {"text": "Hi"} and claimed[0]["attempts"] == 1
+    assert box.get(first)["status"] == "sending"
+    # Claimed messages are not handed out twice
+    assert box.claim(10) == []
+    with pytest.raises(ValueError):
+        box.enqueue("fax", "1", {})
+
+def test_expired_lease_is_claimed_again(box):
+    message_id = box.enqueue("text", "1", {"text": "Hi"})
+    box.claim(1)
+    assert box.claim(1, lease=300) == []
+    reclaimed = box.claim(1, lease=0)
+    assert [m["id"] for m in reclaimed] == [message_id]
+    assert reclaimed[0]["attempts"] == 2
+
+def test_only_the_latest_claim_sends(box):
+    message_id = box.enqueue("text", "1", {"text": "Hi"})
+    stale = box.claim(1)[0]
+    # Still queued behind other sends when its lease runs out
+    fresh = box.claim(1, lease=0)[0]
+
+    assert not box.start(stale)
+    assert box.start(fresh)
+    box.fail(message_id, "timeout", time.time(), claim=stale["claim"])
+    assert box.get(message_id)["status"] == "sending"
+    box.complete(message_id, {"messageId": "m1"}, fresh["claim"])
+    assert box.get(message_id)["status"] == "sent"
+    assert not box.start(fresh)
+
+def test_outcomes_retries_and_counts(box):
+    sent, later, dead = (box.enqueue("text", str(i), {"text": "Hi"}) for i in range(3))
+    box.claim(3)
+    box.complete(sent, {"messageId": "m1"})
+    box.fail(later, "timeout", time.time() + 60)
+    box.fail(dead, "bad number")
+
+    assert box.get(sent)["result"] == {"messageId": "m1"}
+    assert box.counts() == {"pending": 1, "sending": 0, "sent": 1, "failed": 1}
+    # The retry is not due yet
+    assert box.claim(3) == []
+    assert box.retry(dead) and not box.retry(sent)
+    assert [m["id"] for m in box.claim(3)] == [dead]
+    assert [m["id"] for m in box.list("pending")] == [later]
+
+def test_deliver_uses_send_method_with_stable_key(box):
+    box.enqueue("location", "1", {"latitude": "1", "longitude": "2", "address": None, "name": "HQ"})
+    message = box.claim(1)[0]
+    client = MagicMock()
+
+    deliver(client, message)
+
+    client.send_location.assert_called_once_with(
+        "1", latitude="1", longitude="2", address=None, name="HQ", idempotency_key=message["idempotency_key"]
+    )
+
+def test_is_permanent_and_backoff():
+    def status_error(code):
+        request = httpx.Request("POST", "https://x")
+        return httpx.HTTPStatusError("x", request=request, response=httpx.Response(code, request=request))
+
+    assert is_permanent(status_error(400))
+    assert not is_permanent(status_error(429))
+    assert not is_permanent(status_error(503))
+    assert not is_permanent(httpx.ConnectError("down"))
+    assert [retry_delay(n) for n in (1, 2, 3)] == [2, 4, 8]
+    assert retry_delay(20) == 600
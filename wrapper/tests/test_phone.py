@@ -0,0 +1,37 @@
+import pytest
+from zaptos.phone import PhoneNormalizer, normalize, phone_key, to_jid
+
+@pytest.mark.parametrize("raw, country, expected", [
+    ("+55 (11) 99999-0001", None, "5511999990001"),
+    ("5511999990001", None, "5511999990001"),
+    ("005511999990001", None, "5511999990001"),
+    ("5511999990001@s.whatsapp.net", None, "5511999990001"),
+    ("(11) 99999-0001", "55", "5511999990001"),
+    ("011 99999-0001", "55", "5511999990001"),
+    ("5511999990001", "55", "5511999990001"),
+    ("+1 415 555 0100", "55", "14155550100"),
+    (5511999990001, None, "5511999990001"),
+])
+def test_normalize(raw, country, expected):
+    assert normalize(raw, country) == (expected, None)
+
+@pytest.mark.parametrize("raw, reason", [
+    (None, "missing"),
+    ("  ", "missing"),
+    ("12345", "invalid"),
+    ("+55 11 99999 0001 2345", "invalid"),
+    ("120363025246125486@g.us", "invalid"),
+    ("abc", "invalid"),
+])
+def test_normalize_rejects(raw, reason):
+    assert normalize(raw) == (None, reason)
+
+def test_normalizer_dedups_formatting_variants():
+    normalizer = PhoneNormalizer(default_country="+55")
+    numbers = ["+55 11 99999-0001", "(11) 99999-0001", "5511999990001@s.whatsapp.net", "5511999990002", "", "x"]
+    assert [normalizer(n) for n in numbers] == ["5511999990001", None, None, "5511999990002", None, None]
+    assert normalizer.report() == {"kept": 2, "dropped": {"missing": 1, "invalid": 1, "duplicate": 2}}
+
+def test_helpers():
+    assert phone_key("+55 (11) 9999-0000") == "551199990000"
+    assert to_jid("5511999990001") == "5511999990001@s.whatsapp.net"
@@ -0,0 +1,121 @@
+import httpx
+import pytest
+from unittest.mock import MagicMock
+from zaptos.pool import HashRing, InstancePool, PoolUnavailable, is_connected, parse_pool
+
+NUMBERS = [f"55119{i:08d}" for i in range(2000)]
+
+def fake_client(instance, connected=True):
+    client = MagicMock()
+    client.instance = instance
+    client.connected = connected
+
+    def send_text(number, text, idempotency_key=None):
+        if not client.connected:
+            raise RuntimeError("session closed")
+        return {"messageId": f"{instance}:{number}"}
+
+    client.send_text.side_effect = send_text
+    client.instance_status.side_effect = lambda: {"status": {"connected": client.connected}}
+    return client
+
+def test_parse_pool():
+    assert parse_pool(["a:tok1,b:tok2", " c:tok:3 "]) == [("a", "tok1"), ("b", "tok2"), ("c", "tok:3")]
+    with pytest.raises(ValueError):
+        parse_pool(["a"])
+    with pytest.raises(ValueError):
+        parse_pool(["a:1,a:2"])
+
+def test_is_connected_shapes():
+    assert is_connected({"status": {"connected": True, "loggedIn": True}})
+    assert not is_connected({"status": {"connected": False}})
+    assert is_connected({"instance": {"status": "connected"}})
+    assert not is_connected({"instance": {"status": "disconnected"}})
+    assert not is_connected({"error": "not found"})
+
+def test_hash_ring_spreads_and_moves_only_lost_keys():
+    ring = HashRing(["a", "b", "c", "d"])
+    owners = {n: ring.owner(n) for n in NUMBERS}
+    counts = {node: list(owners.values()).count(node) for node in "abcd"}
+    assert all(350 < count < 650 for count in counts.values()), counts
+
+    smaller = HashRing(["a", "b", "c"])
+    moved = [n for n in NUMBERS if smaller.owner(n) != owners[n]]
+    assert moved and all(owners[n] == "d" for n in moved)
+    assert list(ring.preference(NUMBERS[0]))[0] == owners[NUMBERS[0]]
+    assert sorted(ring.preference(NUMBERS[0])) == ["a", "b", "c", "d"]
+
+def test_pool_sends_each_number_from_its_instance():
+    clients = [fake_client("a"), fake_client("b")]
+    pool = InstancePool(clients)
+
+    first = [pool.send_text(n, "hi")["messageId"] for n in NUMBERS[:50]]
+    again = [pool.send_text(n, "hi")["messageId"] for n in NUMBERS[:50]]
+
+    assert first == again
+    assert {m.split(":")[0] for m in first} == {"a", "b"}
+    assert pool.stats["a"]["sent"] + pool.stats["b"]["sent"] == 100
+
+def test_pool_moves_numbers_off_disconnected_instance():
+    a, b = fake_client("a"), fake_client("b")
+    pool = InstancePool([a, b], recheck_interval=3600)
+    number = next(n for n in NUMBERS if pool.instance_for(n) == "a")
+
+    # The failed message may have been accepted, so it is not resent from b
+    a.connected = False
+    with pytest.raises(RuntimeError, match="session closed"):
+        pool.send_text(number, "hi")
+    b.send_text.assert_not_called()
+    assert pool.stats["a"] == {"healthy": False, "sent": 0, "failed": 1, "failovers": 0}
+    # Later sends go to b without trying a again until the recheck is due
+    assert pool.send_text(number, "hi")["messageId"] == f"b:{number}"
+    assert a.send_text.call_count == 1
+
+    b.connected = False
+    with pytest.raises(RuntimeError):
+        pool.send_text(number, "hi")
+    with pytest.raises(PoolUnavailable):
+        pool.send_text(number, "hi")
+
+def test_pool_fails_over_when_the_request_never_left():
+    a, b = fake_client("a"), fake_client("b")
+    a.send_text.side_effect = httpx.ConnectError("connection refused")
+    pool = InstancePool([a, b], recheck_interval=3600)
+    number = next(n for n in NUMBERS if pool.instance_for(n) == "a")
+
+    assert pool.send_text(number, "hi", idempotency_key="k1")["messageId"] == f"b:{number}"
+    b.send_text.assert_called_once_with(number, "hi", idempotency_key="k1")
+    assert pool.stats["a"] == {"healthy": False, "sent": 0, "failed": 1, "failovers": 1}
+
+    b.send_text.side_effect = httpx.ConnectError("connection refused")
+    other = next(n for n in NUMBERS if pool.ring.owner(n) == "b")
+    with pytest.raises(PoolUnavailable):
+        pool.send_text(other, "hi")
+
+def test_pool_reraises_failures_of_a_connected_instance():
+    a = fake_client("a")
+    a.send_text.side_effect = RuntimeError("invalid number")
+    pool = InstancePool([a, fake_client("b")])
+    number = next(n for n in NUMBERS if pool.instance_for(n) == "a")
+
+    with pytest.raises(RuntimeError, match="invalid number"):
+        pool.send_text(number, "hi")
+    assert pool.stats["a"]["healthy"]
+
+def test_pool_takes_instance_back_once_reconnected():
+    a, b = fake_client("a", connected=False), fake_client("b")
+    pool = InstancePool([a, b], recheck_interval=0)
+    assert pool.refresh() == {"a": False, "b": True}
+    number = next(n for n in NUMBERS if pool.ring.owner(n) == "a")
+    pool.recheck_interval = 3600
+    assert pool.instance_for(number) == "b"
+
+    a.connected = True
+    pool.recheck_interval = 0
+    assert pool.instance_for(number) == "a"
+
+def test_pool_rate_limit_is_per_instance():
+    clients = [fake_client("a"), fake_client("b")]
+    InstancePool(clients).set_rate_limit(2)
+    for client in clients:
+        client.set_rate_limit.assert_called_once_with(2, None)
@@ -0,0 +1,53 @@
+import httpx
+import pytest
+import respx
+from unittest.mock import patch
+from zaptos.client import ZaptosClient
+from zaptos.ratelimit import TokenBucket
+
+def test_burst_then_wait(tmp_path):
+    bucket = TokenBucket(str(tmp_path / "rl.db"), "zaptos:inst", rate=2, burst=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    wait = bucket.try_acquire()
+    assert 0.4 < wait <= 0.5
+
+def test_budget_is_shared_between_connections(tmp_path):
+    # Two connections to one file behave like two processes
+    path = str(tmp_path / "rl.db")
+    first = TokenBucket(path, "zaptos:inst", rate=1, burst=2)
+    second = TokenBucket(path, "zaptos:inst", rate=1, burst=2)
+    other_instance = TokenBucket(path, "zaptos:other", rate=1, burst=2)
+
+    assert first.try_acquire() == 0
+    assert second.try_acquire() == 0
+    assert first.try_acquire() > 0
+    assert second.try_acquire() > 0
+    assert other_instance.try_acquire() == 0
+
+def test_acquire_blocks_until_refilled(tmp_path, monkeypatch):
+    bucket = TokenBucket(str(tmp_path / "rl.db"), "k", rate=10, burst=1)
+    sleeps = []
+    monkeypatch.setattr("zaptos.ratelimit.time.sleep", sleeps.append)
+    bucket.acquire()
+    waits = iter([0.1, 0])
+    monkeypatch.setattr(bucket, "try_acquire", lambda tokens=1.0: next(waits))
+    bucket.acquire()
+    assert sleeps == [0.1]
+
+def test_invalid_rate(tmp_path):
+    with pytest.raises(ValueError):
+        TokenBucket(str(tmp_path / "rl.db"), "k", rate=0)
+
+@respx.mock
+def test_client_takes_a_token_per_request(tmp_path):
+    respx.post("https://api.zaptoswpp.com/inst/send-text").mock(return_value=httpx.Response(200, json={}))
+    with patch("zaptos.client.get_data_file", return_value=str(tmp_path / "rl.db")):
+        client = ZaptosClient(instance="inst", token="tok", rate_limit=100)
+    with patch.object(client.limiter, "acquire", wraps=client.limiter.acquire) as acquire:
+        client.send_text("551", "a")
+        client.send_text("551", "b")
+    assert acquire.call_count == 2
+    assert client.limiter.key == "zaptos:inst"
+
+    client.set_rate_limit(0)
+    assert client.limiter is None
@@ -0,0 +1,39 @@
+import sys
+from zaptos.recipients import Projection, iter_csv_projected
+from zaptos.templating import compile_template
+
+def test_projection_keeps_only_used_fields():
+    projection = Projection(["number", "name", "number"])
+    recipient = projection({"number": "5511999990001", "name": "Ana", "email": "a@x.com", "notes": "x" * 1000})
+    assert dict(recipient) == {"number": "5511999990001", "name": "Ana"}
+    assert recipient.get("email") is None
+    assert recipient.get("email", "-") == "-"
+    assert recipient["name"] == "Ana"
+    assert dict(recipient, name="Bia")["name"] == "Bia"
+
+def test_recipient_is_compact():
+    projection = Projection(["number", "name"])
+    recipient = projection({"number": "5511999990001", "name": "Ana"})
+    assert not hasattr(recipient, "__dict__")
+    assert sys.getsizeof(recipient) + sys.getsizeof(recipient._values) < 150
+
+def test_repeated_values_are_shared():
+    projection = Projection(["city"])
+    a = projection({"city": "".join(["Rio", " de Janeiro"])})
+    b = projection({"city": "".join(["Rio de", " Janeiro"])})
+    assert a["city"] is b["city"]
+
+def test_iter_csv_projected(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,number,city,notes\nAna,5511999990001,Rio,long\n\nBia,5511999990002\n")
+    projection = Projection(["number", "phone", "name", "city"])
+    rows = [dict(r) for r in iter_csv_projected(str(path), projection)]
+    assert rows == [
+        {"number": "5511999990001", "phone": None, "name": "Ana", "city": "Rio"},
+        {"number": "5511999990002", "phone": None, "name": "Bia", "city": None},
+    ]
+
+def test_templates_render_recipients():
+    template = compile_template("Hi {{name|default:there}} from {{city}}")
+    recipient = Projection(["name", "city"])({"city": "Rio"})
+    assert template.render(recipient) == "Hi there from Rio"
@@ -0,0 +1,70 @@
+from zaptos.scheduler import FairQueue, StreamError
+import pytest
+
+
+def drain(queue):
+    order = []
+    while (item := queue.pop()) is not None:
+        order.append(item[0])
+    return order
+
+
+def test_fair_queue_shares_by_weight():
+    queue = FairQueue()
+    queue.add("a", range(6), weight=2)
+    queue.add("b", range(3))
+
+    order = drain(queue)
+
+    assert order == ["a", "b", "a", "a", "b", "a", "a", "b", "a"]
+    assert len(queue) == 0
+
+
+def test_fair_queue_late_stream_starts_at_current_turn():
+    queue = FairQueue()
+    queue.add("a", range(10))
+    for _ in range(5):
+        queue.pop()
+
+    # "b" gets its fair share from now on rather than five turns in a row
+    queue.add("b", range(10))
+    assert [queue.pop()[0] for _ in range(4)] == ["a", "b", "a", "b"]
+
+
+def test_fair_queue_weight_changes_and_removal():
+    queue = FairQueue()
+    queue.add("a", range(10))
+    queue.add("b", range(10))
+    queue.set_weight("b", 3)
+    assert [queue.pop()[0] for _ in range(5)] == ["a", "b", "b", "b", "a"]
+
+    queue.remove("a")
+    assert "a" not in queue
+    assert queue.pop() == ("b", 3)
+
+    with pytest.raises(ValueError):
+        queue.add("c", [], weight=0)
+
+
+def test_fair_queue_drops_a_stream_that_raises():
+    def broken():
+        yield 1
+        raise OSError("source gone")
+
+    queue = FairQueue()
+    queue.add("a", broken())
+    queue.add("b", range(3))
+
+    order = []
+    while True:
+        try:
+            item = queue.pop()
+        except StreamError as e:
+            assert e.key == "a" and isinstance(e.error, OSError)
+            order.append("error")
+            continue
+        if item is None:
+            break
+        order.append(item[0])
+
+    assert order == ["a", "b", "error", "b", "b"]
@@ -0,0 +1,50 @@
+import threading
+import pytest
+from zaptos.sources import count_csv_rows, iter_csv, prefetch
+
+def test_count_csv_rows(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("number,name\n551,Ana\n552,Bia\n")
+    assert count_csv_rows(str(path)) == 2
+
+    # No trailing newline
+    path.write_text("number,name\n551,Ana\n552,Bia")
+    assert count_csv_rows(str(path)) == 2
+
+    path.write_text("")
+    assert count_csv_rows(str(path)) == 0
+
+def test_iter_csv_streams_rows(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("number,name\n551,Ana\n552,\"Bia, B\"\n")
+    rows = iter_csv(str(path))
+    assert next(rows) == {"number": "551", "name": "Ana"}
+    assert list(rows) == [{"number": "552", "name": "Bia, B"}]
+
+def test_prefetch_is_bounded():
+    produced = []
+
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    items = prefetch(source(), size=10)
+    assert next(items) == 0
+    # The producer runs at most `size` items (plus the one it is holding) ahead
+    for _ in range(50):
+        if len(produced) >= 12:
+            break
+        threading.Event().wait(0.01)
+    assert len(produced) <= 12
+    assert list(items) == list(range(1, 1000))
+
+def test_prefetch_reraises_source_errors():
+    def source():
+        yield 1
+        raise ValueError("bad row")
+
+    items = prefetch(source())
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="bad row"):
+        next(items)
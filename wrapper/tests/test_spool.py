@@ -0,0 +1,42 @@
+import os
+import pytest
+from zaptos.spool import SpoolReader, SpoolWriter, index_path
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "c.spool")
+    with SpoolWriter(path) as spool:
+        for i in range(10000):
+            spool.append(f"55119999{i:05d}", f"Olá {i} 🎉")
+    assert spool.count == 10000
+
+    with SpoolReader(path) as reader:
+        assert len(reader) == 10000
+        assert reader[0] == ("5511999900000", "Olá 0 🎉")
+        assert reader[9999] == ("5511999909999", "Olá 9999 🎉")
+        assert list(reader.iter_from(9998)) == [
+            (9998, "5511999909998", "Olá 9998 🎉"),
+            (9999, "5511999909999", "Olá 9999 🎉"),
+        ]
+
+def test_empty_spool(tmp_path):
+    path = str(tmp_path / "c.spool")
+    with SpoolWriter(path):
+        pass
+    with SpoolReader(path) as reader:
+        assert len(reader) == 0
+        assert list(reader.iter_from(0)) == []
+
+def test_failed_write_leaves_nothing(tmp_path):
+    path = str(tmp_path / "c.spool")
+    with pytest.raises(RuntimeError):
+        with SpoolWriter(path) as spool:
+            spool.append("5511999990001", "hi")
+            raise RuntimeError("source broke")
+    assert os.listdir(tmp_path) == []
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "c.spool"
+    path.write_bytes(b"number,name\n")
+    open(index_path(str(path)), "wb").close()
+    with pytest.raises(ValueError):
+        SpoolReader(str(path))
@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+# Modules that only some subcommands need; none of them may load for --help
+HEAVY = ("httpx", "yaml", "sqlite3", "zaptos.client", "zaptos.ghl", "zaptos.endpoints.")
+
+HELP = """
+import json, sys
+from zaptos.cli import cli
+try:
+    cli(['--help'])
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# Local bookkeeping commands need the store, but no HTTP client
+CAMPAIGNS_LIST = """
+import json, os, sys, tempfile
+from unittest.mock import patch
+from zaptos.cli import cli
+with tempfile.TemporaryDirectory() as tmp, \
+        patch('zaptos.endpoints.campaigns.get_campaigns_db', return_value=os.path.join(tmp, 'campaigns.db')):
+    try:
+        cli(['campaigns', 'list'])
+    except SystemExit:
+        pass
+print(json.dumps(sorted(sys.modules)))
+"""
+NETWORK = ("httpx", "zaptos.client", "zaptos.ghl", "zaptos.pool", "zaptos.verify")
+
+# Queueing a message only writes to the outbox
+SEND_ASYNC = """
+import json, os, sys, tempfile
+from unittest.mock import patch
+from zaptos.cli import cli
+with tempfile.TemporaryDirectory() as tmp, \
+        patch('zaptos.endpoints.outbox.get_outbox_db', return_value=os.path.join(tmp, 'outbox.db')):
+    try:
+        cli(['messages', 'send', '5511999999999', '--text', 'hi', '--async'])
+    except SystemExit:
+        pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+def run(code):
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+def test_help_imports_no_subcommand_modules():
+    output = run(HELP)
+    help_text, modules = output[:output.rindex("\n[")], json.loads(output[output.rindex("\n[") + 1:])
+
+    loaded = [m for m in modules if m.startswith(HEAVY)]
+    assert loaded == []
+    for name in ("campaigns", "contacts", "messages", "outbox"):
+        assert name in help_text
+
+def test_campaigns_list_imports_no_http_client():
+    output = run(CAMPAIGNS_LIST)
+    modules = json.loads(output[output.rindex("\n[") + 1:])
+    assert [m for m in modules if m.startswith(NETWORK)] == []
+    assert "zaptos.endpoints.campaigns" in modules
+
+def test_send_async_imports_no_http_client():
+    output = run(SEND_ASYNC)
+    assert '"status": "pending"' in output
+    modules = json.loads(output[output.rindex("\n[") + 1:])
+    assert [m for m in modules if m.startswith(NETWORK)] == []
+    assert "zaptos.outbox" in modules
+
+def test_lazy_help_matches_commands():
+    from zaptos.cli import cli
+    for name, (_, short_help) in cli.lazy_subcommands.items():
+        assert cli.get_command(None, name).get_short_help_str(limit=200) == short_help
@@ -0,0 +1,86 @@
+import pytest
+from zaptos.store import CampaignStore, Watermark, idempotency_key, message_id_of
+
+@pytest.fixture
+def store(tmp_path):
+    store = CampaignStore(str(tmp_path / "campaigns.db"))
+    store.create_campaign({
+        "id": "c1",
+        "name": "Promo",
+        "created_at": "2024-01-01T00:00:00",
+        "status": "created",
+        "template": "Hi {{name}}",
+        "source": "csv",
+        "source_config": "contacts.csv",
+        "stats": {"total": 0, "sent": 0, "failed": 0}
+    })
+    yield store
+    store.close()
+
+def test_wal_mode(store):
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_record_result_updates_counters(store):
+    store.record_result("c1", "5511999999991", "sent")
+    store.record_result("c1", "5511999999992", "failed", "boom")
+    assert store.get_campaign("c1")["stats"] == {"total": 0, "sent": 1, "failed": 1}
+
+    # A retried recipient moves between counters instead of being double counted
+    store.record_result("c1", "5511999999992", "sent")
+    assert store.get_campaign("c1")["stats"] == {"total": 0, "sent": 2, "failed": 0}
+    assert store.get_recipient("c1", "5511999999992")["error"] is None
+
+def test_delete_cascades_to_recipients(store):
+    store.record_result("c1", "5511999999991", "sent")
+    assert store.delete_campaign("c1")
+    assert store.get_campaign("c1") is None
+    assert store.get_recipient("c1", "5511999999991") is None
+    assert not store.delete_campaign("c1")
+
+def test_reopen_keeps_data(store):
+    store.set_status("c1", "running")
+    reopened = CampaignStore(store.path)
+    assert reopened.get_campaign("c1")["status"] == "running"
+    assert [c["id"] for c in reopened.list_campaigns(status="running")] == ["c1"]
+    reopened.close()
+
+def test_ledger_and_checkpoint(store):
+    key = idempotency_key("c1", "5511999999991")
+    store.record_result("c1", "5511999999991", "pending", seq=0, idempotency_key=key)
+    store.record_result("c1", "5511999999991", "sent", message_id="m1", checkpoint=1)
+
+    recipient = store.get_recipient("c1", "5511999999991")
+    assert (recipient["status"], recipient["seq"], recipient["message_id"]) == ("sent", 0, "m1")
+    assert recipient["idempotency_key"] == key
+    assert store.recipient_status("c1", "5511999999991") == "sent"
+
+    # The checkpoint never moves backwards
+    store.set_checkpoint("c1", 5)
+    store.set_checkpoint("c1", 3)
+    assert store.get_campaign("c1")["checkpoint"] == 5
+
+def test_failed_seqs(store):
+    store.record_result("c1", "5511999999991", "failed", "boom", seq=0)
+    store.record_result("c1", "5511999999992", "sent", seq=1)
+    store.record_result("c1", "5511999999993", "failed", "Not on WhatsApp", seq=2)
+    store.record_result("c1", "5511999999994", "failed", "boom", seq=3)
+
+    assert store.failed_seqs("c1", 3) == {0, 2}
+    assert store.failed_seqs("c1", 4, except_error="Not on WhatsApp") == {0, 3}
+
+def test_idempotency_key_is_stable():
+    assert idempotency_key("c1", "551") == idempotency_key("c1", "551")
+    assert idempotency_key("c1", "551") != idempotency_key("c2", "551")
+
+def test_message_id_of():
+    assert message_id_of({"messageid": "abc"}) == "abc"
+    assert message_id_of({"id": "r123"}) == "r123"
+    assert message_id_of(None) is None
+
+def test_watermark_out_of_order():
+    mark = Watermark(10)
+    assert mark.complete(12) is None
+    assert mark.complete(11) is None
+    assert mark.complete(10) == 13
+    assert mark.complete(5) is None
+    assert mark.value == 13
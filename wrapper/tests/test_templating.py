@@ -0,0 +1,30 @@
+import pytest
+from zaptos.templating import TemplateError, compile_template
+
+def test_plain_text_and_fields():
+    template = compile_template("Hi {{name}}, your code is {{ code }}.")
+    assert template.render({"name": "Ana", "code": 42}) == "Hi Ana, your code is 42."
+    assert template.fields == {"name", "code"}
+    assert compile_template("No placeholders").render({}) == "No placeholders"
+
+def test_missing_fields_render_empty():
+    assert compile_template("Hi {{name}}!").render({}) == "Hi !"
+    assert compile_template("Hi {{name}}!").render({"name": None}) == "Hi !"
+
+def test_filters():
+    template = compile_template('Hi {{firstName|default:"there"|title}} from {{city|upper}}')
+    assert template.render({"firstName": "ana maria", "city": "rio"}) == "Hi Ana Maria from RIO"
+    assert template.render({"city": "rio"}) == "Hi There from RIO"
+    assert compile_template("{{name|first}}").render({"name": "Ana Maria"}) == "Ana"
+    assert compile_template("{{name|default:amigo}}").render({"name": ""}) == "amigo"
+
+def test_nested_fields():
+    template = compile_template("{{customFields.plan|default:basic}}")
+    assert template.render({"customFields": {"plan": "pro"}}) == "pro"
+    assert template.render({"customFields": "oops"}) == "basic"
+    assert template.fields == {"customFields"}
+
+@pytest.mark.parametrize("source", ["{{name|shout}}", "{{ }}", "{{first name}}"])
+def test_invalid_templates(source):
+    with pytest.raises(TemplateError):
+        compile_template(source)
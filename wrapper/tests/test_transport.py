@@ -0,0 +1,144 @@
+import asyncio
+import httpx
+import pytest
+import respx
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from zaptos.client import ZaptosClient, AsyncZaptosClient
+from zaptos.ghl import GHLClient
+from zaptos.transport import ResponseTimings, RetryPolicy, parse_retry_after
+
+URL = "https://api.zaptoswpp.com/test_instance/send-text"
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr("zaptos.transport.time.sleep", recorded.append)
+    return recorded
+
+@respx.mock
+def test_retries_then_succeeds_with_same_idempotency_key(sleeps):
+    route = respx.post(URL).mock(side_effect=[
+        httpx.Response(429),
+        httpx.Response(503, headers={"Retry-After": "7"}),
+        httpx.Response(200, json={"messageid": "m1"}),
+    ])
+    client = ZaptosClient(instance="test_instance", token="tok")
+
+    assert client.send_text("551", "Hi", idempotency_key="key-1") == {"messageid": "m1"}
+
+    assert route.call_count == 3
+    assert {c.request.headers["Idempotency-Key"] for c in route.calls} == {"key-1"}
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5
+    assert sleeps[1] == 7
+
+@respx.mock
+def test_generated_idempotency_key_survives_retries(sleeps):
+    route = respx.post(URL).mock(side_effect=[httpx.Response(429), httpx.Response(200, json={})])
+    ZaptosClient(instance="test_instance", token="tok").send_text("551", "Hi")
+    keys = [c.request.headers["Idempotency-Key"] for c in route.calls]
+    assert len(keys) == 2 and keys[0] == keys[1]
+
+@respx.mock
+def test_gives_up_after_max_attempts(sleeps):
+    route = respx.post(URL).mock(return_value=httpx.Response(503, headers={"Retry-After": "1"}))
+    client = ZaptosClient(instance="test_instance", token="tok", retry=RetryPolicy(max_attempts=4))
+    with pytest.raises(httpx.HTTPStatusError):
+        client.send_text("551", "Hi")
+    assert route.call_count == 4
+
+@respx.mock
+def test_non_retryable_status_fails_immediately(sleeps):
+    route = respx.post(URL).mock(return_value=httpx.Response(500))
+    with pytest.raises(httpx.HTTPStatusError):
+        ZaptosClient(instance="test_instance", token="tok").send_text("551", "Hi")
+    assert route.call_count == 1
+    assert sleeps == []
+
+@respx.mock
+def test_connect_errors_retry_even_when_method_excluded(sleeps):
+    route = respx.post(URL).mock(side_effect=[httpx.ConnectTimeout("Timeout"), httpx.Response(200, json={})])
+    policy = RetryPolicy(retry_methods=("GET",))
+    assert ZaptosClient(instance="test_instance", token="tok", retry=policy).send_text("551", "Hi") == {}
+    assert route.call_count == 2
+
+@respx.mock
+def test_ambiguous_errors_respect_retry_methods(sleeps):
+    route = respx.post(URL).mock(side_effect=httpx.ReadTimeout("Timeout"))
+    policy = RetryPolicy(retry_methods=("GET",))
+    with pytest.raises(httpx.ReadTimeout):
+        ZaptosClient(instance="test_instance", token="tok", retry=policy).send_text("551", "Hi")
+    assert route.call_count == 1
+
+@pytest.mark.parametrize("outcome", [
+    httpx.Response(502), httpx.Response(504), httpx.Response(503), httpx.ReadTimeout("Timeout"),
+])
+@respx.mock
+def test_post_is_not_retried_when_it_may_have_been_processed(sleeps, outcome):
+    route = respx.post(URL).mock(side_effect=[outcome, httpx.Response(200, json={})])
+    with pytest.raises((httpx.HTTPStatusError, httpx.ReadTimeout)):
+        ZaptosClient(instance="test_instance", token="tok").send_text("551", "Hi")
+    assert route.call_count == 1
+
+@respx.mock
+def test_post_retry_on_ambiguous_failures_is_opt_in(sleeps):
+    route = respx.post(URL).mock(side_effect=[httpx.ReadTimeout("Timeout"), httpx.Response(502), httpx.Response(200, json={})])
+    policy = RetryPolicy(retry_methods=("GET", "PUT", "DELETE", "POST"))
+    assert ZaptosClient(instance="test_instance", token="tok", retry=policy).send_text("551", "Hi") == {}
+    assert route.call_count == 3
+
+@respx.mock
+def test_ghl_put_is_retried(sleeps):
+    route = respx.put("https://rest.gohighlevel.com/v1/contacts/c1").mock(
+        side_effect=[httpx.Response(429), httpx.Response(200, json={"id": "c1"})]
+    )
+    assert GHLClient(api_key="key").update_contact("c1", {"name": "Ana"}) == {"id": "c1"}
+    assert route.call_count == 2
+
+@respx.mock
+def test_async_client_retries(monkeypatch):
+    async def no_sleep(delay):
+        pass
+    monkeypatch.setattr("zaptos.transport.asyncio.sleep", no_sleep)
+    route = respx.post(URL).mock(side_effect=[httpx.Response(504), httpx.Response(200, json={"ok": True})])
+    policy = RetryPolicy(retry_methods=("GET", "POST"))
+
+    async def run():
+        async with AsyncZaptosClient(instance="test_instance", token="tok", retry=policy) as client:
+            return await client.send_text("551", "Hi")
+
+    assert asyncio.run(run()) == {"ok": True}
+    assert route.call_count == 2
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(future) <= 30
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(backoff_base=1, backoff_max=5)
+    assert all(0 <= policy.delay(10) <= 5 for _ in range(20))
+    response = httpx.Response(429, headers={"Retry-After": "120"})
+    assert policy.delay(1, response) == 5
+
+@respx.mock
+def test_client_records_every_attempt(sleeps):
+    respx.post(URL).mock(side_effect=[httpx.Response(429), httpx.ConnectError("down"), httpx.Response(200, json={})])
+    client = ZaptosClient(instance="test_instance", token="t", retry=RetryPolicy(max_attempts=3))
+
+    client.send_text("1", "hi")
+
+    samples, cursor = client.timings.since(0)
+    assert [status for _, status in samples] == [429, 0, 200]
+    assert cursor == 3 and all(seconds >= 0 for seconds, _ in samples)
+
+def test_response_timings_cursor():
+    timings = ResponseTimings(size=3)
+    for i in range(5):
+        timings.record(i, 200)
+    assert timings.since(1) == ([(2, 200), (3, 200), (4, 200)], 5)
+    assert timings.since(4) == ([(4, 200)], 5)
+    assert timings.since(5) == ([], 5)
@@ -0,0 +1,83 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from zaptos.verify import CheckCache, NumberVerifier, chunked, parse_checks
+
+def fake_check(numbers):
+    # Even numbers are on WhatsApp
+    return [{"query": n, "jid": f"{n}@s.whatsapp.net", "isInWhatsapp": int(n) % 2 == 0} for n in numbers]
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CheckCache(str(tmp_path / "checks.db"))
+    yield cache
+    cache.close()
+
+def test_parse_checks_skips_errors():
+    items = [
+        {"query": "+55 11 99999-0001", "jid": "5511999990001@s.whatsapp.net", "isInWhatsapp": True},
+        {"query": "5511999990002", "isInWhatsapp": False},
+        {"query": "5511999990003", "error": "timeout"},
+        {"query": "5511999990004"},
+    ]
+    assert parse_checks(items) == [
+        ("5511999990001", True, "5511999990001@s.whatsapp.net"),
+        ("5511999990002", False, None),
+    ]
+    assert parse_checks({"error": "No session"}) == []
+
+def test_cache_ttl(cache):
+    cache.put_many([("5511999990001", True, None), ("5511999990002", False, None)])
+    assert cache.get_many(["5511999990001", "5511999990002", "5511999990003"], ttl=60) == {
+        "5511999990001": True, "5511999990002": False,
+    }
+    assert cache.get_many(["5511999990001"], ttl=0) == {}
+
+def test_cache_lookup_beyond_parameter_limit(cache):
+    numbers = [str(5511000000000 + i) for i in range(1200)]
+    cache.put_many((n, True, None) for n in numbers)
+    assert len(cache.get_many(numbers, ttl=60)) == 1200
+
+def test_verifier_uses_cache(cache):
+    client = MagicMock()
+    client.check_numbers.side_effect = fake_check
+    verifier = NumberVerifier(client, cache, ttl=60)
+
+    assert verifier.check(["5511999990001", "5511999990002"]) == {"5511999990001": False, "5511999990002": True}
+    assert verifier.check(["5511999990002", "5511999990004"]) == {"5511999990002": True, "5511999990004": True}
+    # Only the number not seen before was sent the second time
+    assert client.check_numbers.call_args.args == (["5511999990004"],)
+    assert verifier.stats == {"valid": 3, "invalid": 1, "unknown": 0, "cached": 1, "checked": 3}
+
+def test_check_all_runs_chunks_concurrently(cache):
+    in_flight, peak = [], []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def slow_check(numbers):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            if len(in_flight) >= 2:
+                release.set()
+        release.wait(1)
+        with lock:
+            in_flight.pop()
+        if "5511000000010" in numbers:
+            raise RuntimeError("boom")
+        return fake_check(numbers)
+
+    client = MagicMock()
+    client.check_numbers.side_effect = slow_check
+    verifier = NumberVerifier(client, cache, ttl=60, chunk_size=5)
+    numbers = [str(5511000000000 + i) for i in range(20)]
+
+    errors = verifier.check_all(numbers, concurrency=4)
+
+    assert errors == ["boom"]
+    assert client.check_numbers.call_count == 4
+    assert max(peak) >= 2
+    assert verifier.stats == {"valid": 7, "invalid": 8, "unknown": 5, "cached": 0, "checked": 15}
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]